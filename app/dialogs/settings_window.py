@@ -6,13 +6,18 @@ from PyQt5.QtWidgets import (
     QComboBox, QLabel, QPushButton, QLineEdit,
     QVBoxLayout, QHBoxLayout, QFrame, QDialog, QGroupBox, QFormLayout
 )
-from PyQt5.QtGui import QGuiApplication
+from PyQt5.QtGui import QGuiApplication, QIntValidator
 
 from app.utils.settings import (
     load_name, save_name, load_api_key, save_api_key, load_theme, load_hotkey, save_hotkey,
     load_context_setting, save_context_setting, load_max_context, save_max_context,
-    resource_path
+    load_stream_setting, save_stream_setting, load_rate_limit_rpm, save_rate_limit_rpm,
+    load_rate_limit_tpm, save_rate_limit_tpm, load_action_hotkeys, save_action_hotkeys,
+    load_speculative_prefetch_enabled, save_speculative_prefetch_enabled, DIRECT_ACTIONS, resource_path
 )
+from app.utils.speculative_prefetch import get_speculation_store
+from app.listeners.hotkeys import is_valid_hotkey, convert_hotkey
+from app.utils.rate_scheduler import apply_rate_limit_settings
 from app.utils.helpers import show_custom_message
 from app import __version__
 
@@ -22,6 +27,7 @@ class SettingsWindow(QDialog):
     api_key_updated = pyqtSignal(str)
     theme_updated = pyqtSignal(str)
     hotkey_updated = pyqtSignal(str)
+    action_hotkeys_updated = pyqtSignal(dict)
 
     def __init__(self):
         super().__init__()
@@ -87,6 +93,19 @@ class SettingsWindow(QDialog):
 
         settings_layout.addRow(self.context_checkbox, self.max_context_combo)
 
+        # Checkbox para exibir as respostas conforme são geradas (streaming)
+        self.stream_checkbox = QtWidgets.QCheckBox("Exibir respostas em tempo real")
+        self.stream_checkbox.setObjectName("stream_checkbox")
+        self.stream_checkbox.setChecked(load_stream_setting())
+        settings_layout.addRow(self.stream_checkbox)
+
+        # Checkbox para antecipar a ação mais usada ao copiar um texto (as estatísticas ficam na dica)
+        self.speculation_checkbox = QtWidgets.QCheckBox("Antecipar a ação mais usada ao copiar texto")
+        self.speculation_checkbox.setObjectName("speculation_checkbox")
+        self.speculation_checkbox.setChecked(load_speculative_prefetch_enabled())
+        self.speculation_checkbox.setToolTip(get_speculation_store().summary())
+        settings_layout.addRow(self.speculation_checkbox)
+
         # Campo para inserir o nome do usuário
         name_label = QLabel("Seu nome:")
         self.name_input = QLineEdit()
@@ -108,6 +127,25 @@ class SettingsWindow(QDialog):
         self.api_input.setText(current_api_key)
         settings_layout.addRow(api_label, self.api_input)
 
+        # Campos para os limites de uso da API (vazio = usar os limites informados pela API)
+        rpm_label = QLabel("Requisições por minuto:")
+        self.rpm_input = QLineEdit()
+        self.rpm_input.setPlaceholderText("Automático")
+        self.rpm_input.setObjectName("rpm_input")
+        self.rpm_input.setValidator(QIntValidator(0, 1000000))
+        current_rpm = load_rate_limit_rpm()
+        self.rpm_input.setText(str(current_rpm) if current_rpm else "")
+        settings_layout.addRow(rpm_label, self.rpm_input)
+
+        tpm_label = QLabel("Tokens por minuto:")
+        self.tpm_input = QLineEdit()
+        self.tpm_input.setPlaceholderText("Automático")
+        self.tpm_input.setObjectName("tpm_input")
+        self.tpm_input.setValidator(QIntValidator(0, 100000000))
+        current_tpm = load_rate_limit_tpm()
+        self.tpm_input.setText(str(current_tpm) if current_tpm else "")
+        settings_layout.addRow(tpm_label, self.tpm_input)
+
         # Adicionar campo para escolher o tema
         theme_label = QLabel("Tema:")
         self.theme_combo = QComboBox()
@@ -147,6 +185,18 @@ class SettingsWindow(QDialog):
 
         settings_layout.addRow(hotkey_label, self.hotkey_combo)
 
+        # Teclas de atalho das ações diretas (copiar, enviar e colar sem abrir o widget flutuante)
+        settings_layout.addRow(QLabel("Atalhos das ações (ex.: Ctrl+Alt+R):"))
+        current_action_hotkeys = load_action_hotkeys()
+        self.action_hotkey_inputs = {}
+        for action, action_label in DIRECT_ACTIONS.items():
+            action_input = QLineEdit()
+            action_input.setPlaceholderText("Nenhum")
+            action_input.setObjectName("action_hotkey_input")
+            action_input.setText(current_action_hotkeys.get(action, ""))
+            self.action_hotkey_inputs[action] = action_input
+            settings_layout.addRow(QLabel(f"{action_label}:"), action_input)
+
         # Adicionar campo de versão do aplicativo - versao
         version_label = QLabel("Versão:")
         version_text = QLabel(__version__)
@@ -242,12 +292,17 @@ class SettingsWindow(QDialog):
                     background-color: #ffffff;
                 }
             """)
+            # Limites da API usam o mesmo estilo dos outros campos
+            self.rpm_input.setStyleSheet(self.api_input.styleSheet())
+            self.tpm_input.setStyleSheet(self.api_input.styleSheet())
+            for action_input in self.action_hotkey_inputs.values():
+                action_input.setStyleSheet(self.api_input.styleSheet())
             # Aplicar o estilo aos ComboBoxes
             self.theme_combo.setStyleSheet(combo_style)
             self.max_context_combo.setStyleSheet(combo_style)
             self.hotkey_combo.setStyleSheet(combo_style)
-            # Estilo para o checkbox
-            self.context_checkbox.setStyleSheet("""
+            # Estilo para os checkboxes
+            checkbox_style = """
                 QCheckBox {
                     color: white;
                     margin-top: 10px;
@@ -256,7 +311,10 @@ class SettingsWindow(QDialog):
                     width: 20px;
                     height: 20px;
                 }
-            """)
+            """
+            self.context_checkbox.setStyleSheet(checkbox_style)
+            self.stream_checkbox.setStyleSheet(checkbox_style)
+            self.speculation_checkbox.setStyleSheet(checkbox_style)
                                 
             # Botão Salvar
             self.save_button.setStyleSheet("""
@@ -349,12 +407,17 @@ class SettingsWindow(QDialog):
                     background-color: #ffffff;
                 }
             """)
+            # Limites da API usam o mesmo estilo dos outros campos
+            self.rpm_input.setStyleSheet(self.api_input.styleSheet())
+            self.tpm_input.setStyleSheet(self.api_input.styleSheet())
+            for action_input in self.action_hotkey_inputs.values():
+                action_input.setStyleSheet(self.api_input.styleSheet())
             # Aplicar o estilo aos ComboBoxes
             self.theme_combo.setStyleSheet(combo_style)
             self.max_context_combo.setStyleSheet(combo_style)
             self.hotkey_combo.setStyleSheet(combo_style)
-            # Estilo para o checkbox
-            self.context_checkbox.setStyleSheet("""
+            # Estilo para os checkboxes
+            checkbox_style = """
                 QCheckBox {
                     color: black;
                     margin-top: 10px;
@@ -363,7 +426,10 @@ class SettingsWindow(QDialog):
                     width: 20px;
                     height: 20px;
                 }
-            """)
+            """
+            self.context_checkbox.setStyleSheet(checkbox_style)
+            self.stream_checkbox.setStyleSheet(checkbox_style)
+            self.speculation_checkbox.setStyleSheet(checkbox_style)
    
             # Botão Salvar
             self.save_button.setStyleSheet("""
@@ -433,6 +499,22 @@ class SettingsWindow(QDialog):
             show_custom_message('Alerta', 'A chave da API não pode estar vazia')
             return
 
+        # Validar as teclas de atalho das ações: formato válido e sem repetição
+        action_hotkeys = {}
+        used_hotkeys = {convert_hotkey(selected_hotkey or "Ctrl+Shift+S")}
+        for action, action_input in self.action_hotkey_inputs.items():
+            action_hotkey = action_input.text().strip()
+            if not action_hotkey:
+                continue
+            if not is_valid_hotkey(action_hotkey):
+                show_custom_message('Alerta', f'Tecla de atalho inválida para {DIRECT_ACTIONS[action]}: {action_hotkey}')
+                return
+            if convert_hotkey(action_hotkey) in used_hotkeys:
+                show_custom_message('Alerta', f'A tecla de atalho {action_hotkey} já está em uso')
+                return
+            used_hotkeys.add(convert_hotkey(action_hotkey))
+            action_hotkeys[action] = action_hotkey
+
         # Salvar nome
         save_name(name)
 
@@ -456,6 +538,10 @@ class SettingsWindow(QDialog):
             save_hotkey(default_hotkey)
             self.hotkey_updated.emit(default_hotkey)
 
+        # Salvar as teclas de atalho das ações diretas
+        save_action_hotkeys(action_hotkeys)
+        self.action_hotkeys_updated.emit(action_hotkeys)
+
         # Salvar a configuração do "Manter contexto"
         maintain_context = self.context_checkbox.isChecked()
         save_context_setting(maintain_context)
@@ -463,6 +549,19 @@ class SettingsWindow(QDialog):
         max_context_value = self.max_context_combo.currentData()
         save_max_context(max_context_value)
 
+        # Salvar a configuração de streaming
+        save_stream_setting(self.stream_checkbox.isChecked())
+        # Salvar a configuração de antecipação de ações
+        save_speculative_prefetch_enabled(self.speculation_checkbox.isChecked())
+        if not self.speculation_checkbox.isChecked():
+            # Cancela a antecipação que estiver rodando em segundo plano
+            get_speculation_store().discard()
+
+        # Salvar os limites de uso da API e aplicá-los ao agendador de requisições
+        save_rate_limit_rpm(int(self.rpm_input.text() or 0))
+        save_rate_limit_tpm(int(self.tpm_input.text() or 0))
+        apply_rate_limit_settings()
+
         self.accept()
 
     # Função para habilitar o combo de máximo de mensagens
@@ -1,54 +1,91 @@
 # app/listeners/hotkey_listener.py
 
 import threading
+import functools
 from pynput import keyboard
 from PyQt5 import QtCore
 from PyQt5.QtCore import pyqtSignal
-from pynput import keyboard
+from app.listeners.hotkeys import convert_hotkey
 
 
 # Classe para ouvir hotkeys
 class HotkeyListener(QtCore.QObject):
     hotkey_pressed = pyqtSignal()
+    # Ação direta (review, casual...) cuja tecla de atalho foi usada
+    action_triggered = pyqtSignal(str)
 
-    def __init__(self, hotkey="Ctrl+Shift+S"):
+    def __init__(self, hotkey="Ctrl+Shift+S", action_hotkeys=None):
         super().__init__()
         self.current_hotkey = hotkey
+        self.action_hotkeys = dict(action_hotkeys or {})
         self.listener = None
         self.listener_thread = None
+        self.hotkeys = []
+        self._pressed = set()
+        self._pending_action = None
         self.start_listener(self.current_hotkey)
 
     def start_listener(self, hotkey):
-        # Converter a string da hotkey para o formato esperado pelo pynput
-        hotkey_pynput = self.convert_hotkey(hotkey)
-        # Definir as ações para a hotkey
-        self.listener = keyboard.GlobalHotKeys({
-            hotkey_pynput: self.on_hotkey
-        })
+        # Registro de hotkeys: captura de tela + uma por ação direta
+        bindings = {convert_hotkey(hotkey): self.on_hotkey}
+        for action, action_hotkey in self.action_hotkeys.items():
+            combination = convert_hotkey(action_hotkey)
+            if combination in bindings:
+                print(f"Tecla de atalho '{action_hotkey}' já está em uso; ação '{action}' ignorada.")
+                continue
+            bindings[combination] = functools.partial(self.on_action_hotkey, action)
+
+        self.hotkeys = []
+        for combination, callback in bindings.items():
+            try:
+                self.hotkeys.append(keyboard.HotKey(keyboard.HotKey.parse(combination), callback))
+            except ValueError:
+                print(f"Tecla de atalho inválida: {combination}")
+
+        self._pressed = set()
+        self._pending_action = None
+        self.listener = keyboard.Listener(on_press=self._on_press, on_release=self._on_release)
         # Iniciar o listener em um thread separado
         self.listener_thread = threading.Thread(target=self.listener.run)
         self.listener_thread.daemon = True
         self.listener_thread.start()
 
     def convert_hotkey(self, hotkey_str):
-        """
-        Converte uma string de hotkey no formato 'Ctrl+Shift+S' para o formato esperado pelo pynput,
-        que é '<ctrl>+<shift>+s'.
-        """
-        parts = hotkey_str.lower().split('+')
-        return '+'.join(f"<{part}>" if part in ["ctrl", "shift", "alt", "cmd"] else part for part in parts)
+        return convert_hotkey(hotkey_str)
+
+    def _on_press(self, key):
+        canonical = self.listener.canonical(key)
+        self._pressed.add(canonical)
+        for hotkey in self.hotkeys:
+            hotkey.press(canonical)
+
+    def _on_release(self, key):
+        canonical = self.listener.canonical(key)
+        self._pressed.discard(canonical)
+        for hotkey in self.hotkeys:
+            hotkey.release(canonical)
+        # A ação só começa com todas as teclas soltas, para o Ctrl+C simulado não se misturar com o atalho
+        if self._pending_action and not self._pressed:
+            action, self._pending_action = self._pending_action, None
+            self.action_triggered.emit(action)
 
     def on_hotkey(self):
         # Emitir o sinal para notificar o thread principal
         self.hotkey_pressed.emit()
 
+    def on_action_hotkey(self, action):
+        self._pending_action = action
+
     def update_hotkey(self, new_hotkey):
-        if self.listener:
-            self.listener.stop()
-            self.listener_thread.join()
+        self.stop()
         self.current_hotkey = new_hotkey
         self.start_listener(self.current_hotkey)
 
+    def update_action_hotkeys(self, action_hotkeys):
+        self.stop()
+        self.action_hotkeys = dict(action_hotkeys)
+        self.start_listener(self.current_hotkey)
+
     def stop(self):
         if self.listener:
             self.listener.stop()
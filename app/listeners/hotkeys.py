@@ -0,0 +1,25 @@
+# app/listeners/hotkeys.py
+
+# Teclas modificadoras, escritas entre <> no formato do pynput
+MODIFIERS = ("ctrl", "shift", "alt", "cmd")
+
+
+def convert_hotkey(hotkey_str):
+    """
+    Converte uma string de hotkey no formato 'Ctrl+Shift+S' para o formato esperado pelo pynput,
+    que é '<ctrl>+<shift>+s'.
+    """
+    parts = hotkey_str.lower().replace(' ', '').split('+')
+    return '+'.join(f"<{part}>" if part in MODIFIERS else part for part in parts)
+
+
+def is_valid_hotkey(hotkey_str):
+    """
+    Indica se a string de hotkey pode ser usada pelo pynput: cada parte é uma modificadora
+    ou um único caractere, sem repetições. Não importa o pynput (que exige um servidor
+    gráfico no Linux), para que as configurações possam ser validadas em qualquer ambiente.
+    """
+    parts = hotkey_str.lower().replace(' ', '').split('+')
+    if not all(part in MODIFIERS or len(part) == 1 for part in parts):
+        return False
+    return len(set(parts)) == len(parts)
@@ -1,25 +1,35 @@
 # app/main_app.py
 
 from PyQt5.QtWidgets import QApplication
-from app.utils.settings import load_hotkey
+from app.utils.settings import load_hotkey, load_action_hotkeys
 from app.listeners.hotkey_listener import HotkeyListener
 from app.main_window import MainWindow
+from app.utils.http_client import warm_up_client
+from app.utils.request_engine import submit_request, shutdown_engine
 
 #MainApp é a classe principal da aplicação, responsável por inicializar a janela principal e o listener de hotkey.
 class MainApp(QApplication):
     def __init__(self, sys_argv):
         super().__init__(sys_argv)
         saved_hotkey = load_hotkey()
-        self.hotkey_listener = HotkeyListener(hotkey=saved_hotkey)
+        self.hotkey_listener = HotkeyListener(hotkey=saved_hotkey, action_hotkeys=load_action_hotkeys())
         self.main_window = MainWindow()
         self.hotkey_listener.hotkey_pressed.connect(self.main_window.start_screenshot)
+        # Atalhos das ações diretas: copiar -> requisição -> colar, sem abrir o widget flutuante
+        self.hotkey_listener.action_triggered.connect(self.main_window.floating_widget.run_direct_action)
         self.main_window.show()
+        # Abrir a conexão com a API antes da primeira ação do usuário
+        submit_request(warm_up_client(), name="warm_up")
 
 
     def update_hotkey(self, new_hotkey):
         self.hotkey_listener.update_hotkey(new_hotkey)
         print(f"Hotkey atualizada para: {new_hotkey}")
 
+    def update_action_hotkeys(self, action_hotkeys):
+        self.hotkey_listener.update_action_hotkeys(action_hotkeys)
+
     def quit(self):
         self.hotkey_listener.stop()
+        shutdown_engine()
         super().quit()
@@ -1,17 +1,14 @@
 # app/main_window.py
 
-import io
-import base64
-import threading
+import time
 
 from PyQt5.QtCore import Qt, QTimer, QRect, pyqtSignal, pyqtSlot, QPropertyAnimation, QEasingCurve, QParallelAnimationGroup, QSize
 from PyQt5.QtWidgets import (
     QMenu, QAction, QLabel, QPushButton, QLineEdit, QSizePolicy, QShortcut,
-    QVBoxLayout, QHBoxLayout, QWidget, QScrollArea, QFrame, QApplication,QSystemTrayIcon 
+    QVBoxLayout, QHBoxLayout, QWidget, QScrollArea, QFrame, QApplication,QSystemTrayIcon, QInputDialog
 )
 
-from PyQt5.QtGui import QIcon, QPixmap, QKeySequence, QGuiApplication
-from PIL import ImageGrab
+from PyQt5.QtGui import QIcon, QPixmap, QImage, QKeySequence, QGuiApplication
 
 from app.widgets.taskbar import Taskbar
 from app.widgets.floating_widget import FloatingWidget
@@ -20,20 +17,28 @@ from app.widgets.chat_bubble import ChatBubble
 from app.widgets.screenshot_widget import ScreenshotWidget
 from app.dialogs.settings_window import SettingsWindow
 from app.utils.settings import load_theme, save_theme, resource_path, load_api_key
-from app.utils.api_calls import process_question, sidemenu_action
+from app.utils.api_calls import process_question, sidemenu_action, start_request, cancel_request
+from app.utils.conversation_compactor import schedule_compaction
+from app.utils.context_index import ConversationIndex
+from app.utils.conversation_store import open_conversation_store
+from app.utils.image_pipeline import submit_capture
+from app.utils.response_bus import get_response_bus
+from app.utils.speculative_prefetch import get_speculation_store
 from app.utils.helpers import set_button_icon_with_hover, show_custom_message
-
-#Resolver problema de icone
-import ctypes
-ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID('company.app.echo')
+from app.platform.backend import get_backend
 
 # Classe principal da janela
 class MainWindow(QFrame):
-    response_received = pyqtSignal(str)
-    is_to_copy = False
+    # Captura de tela processada no pool de imagens: ID da captura, resultado (ou exceção)
+    image_captured = pyqtSignal(str, object)
 
     def __init__(self):
         super().__init__()
+        #Resolver problema de icone
+        get_backend().set_app_id('company.app.echo')
+        # Cria o barramento de respostas aqui, na thread da interface: requisições antecipadas
+        # rodam no engine e não podem ser as primeiras a chamá-lo
+        get_response_bus()
         self.setWindowTitle('Echo')
         self.setObjectName("main_window")
         self.setWindowFlags(Qt.Window | Qt.FramelessWindowHint) #retira a barra de título
@@ -84,9 +89,28 @@ class MainWindow(QFrame):
         #Fim Tray Icon -----------------------------------
 
 
-        # Inicia o histórico de conversas
-        self.conversation_history = []
-        self.conversation_lock = threading.Lock()
+        # Inicia o histórico de conversas (SQLite; só o fim da sessão atual fica em memória)
+        self.conversation_store = open_conversation_store()
+        # Paginação das conversas anteriores exibidas ao rolar o chat para cima
+        self.history_cursor = None
+        self.history_exhausted = False
+        self.history_top_session = None
+        self.history_top_header = None
+        # Resumo das conversas antigas: {"text": resumo, "covered": mensagens do início já resumidas,
+        # "last_id": ID da última mensagem resumida, "session": sessão resumida}
+        self.conversation_summary = None
+        # Índice BM25 das conversas, usado para enviar as mais relevantes como contexto
+        self.context_index = ConversationIndex()
+        # Capturas de tela em processamento: ID -> rótulo da miniatura
+        self.pending_captures = {}
+        self.capture_counter = 0
+        self.image_captured.connect(self.on_image_captured)
+        # Bolhas das respostas que estão chegando em streaming, por ID da requisição
+        self.streaming_bubbles = {}
+        # Requisições do chat e do menu lateral em andamento: ID -> tipo ('question' ou 'sidemenu')
+        self.chat_requests = {}
+        # Bolhas de progresso das requisições em várias etapas (ex.: resumo de textos longos)
+        self.progress_bubbles = {}
 
         self.settings_window = None
         # Layout principal horizontal
@@ -159,6 +183,8 @@ class MainWindow(QFrame):
         self.chat_widget.setLayout(self.chat_layout)
         self.chat_scroll.setWidget(self.chat_widget)
         self.content_layout.addWidget(self.chat_scroll)
+        # Carregar conversas anteriores quando o chat chegar ao topo
+        self.chat_scroll.verticalScrollBar().valueChanged.connect(self.on_chat_scrolled)
 
         # Linha horizontal
         line = QFrame()
@@ -200,6 +226,17 @@ class MainWindow(QFrame):
         self.send_button.clicked.connect(self.send_question)
         self.input_layout.addWidget(self.send_button)
 
+        # Botão de cancelar, exibido enquanto houver requisições em andamento
+        self.stop_button = QPushButton()
+        set_button_icon_with_hover(self.stop_button, 'mdi.stop-circle-outline', '#b4b4b4', '#171717')
+        self.stop_button.setIconSize(QSize(24, 24))
+        self.stop_button.setFixedSize(36, 36)
+        self.stop_button.setObjectName("stop_button")
+        self.stop_button.setToolTip("Cancelar")
+        self.stop_button.clicked.connect(self.cancel_chat_requests)
+        self.stop_button.hide()
+        self.input_layout.addWidget(self.stop_button)
+
         self.content_layout.addLayout(self.input_layout)
 
         # Adicionar os containers ao layout principal
@@ -208,14 +245,14 @@ class MainWindow(QFrame):
 
 
 
-        # Conectar o sinal ao slot
-        self.response_received.connect(self.update_response)
-
         # Conectar o sinal do SideMenuWindow para acoes
-        self.side_menu_window.sidemenu_action_triggered.connect(lambda prompt: sidemenu_action(self, prompt))
+        self.side_menu_window.sidemenu_action_triggered.connect(self.handle_sidemenu_action)
         # Atalho para Ctrl+Enter acionar o botão "Enviar"
         shortcut = QShortcut(QKeySequence("Ctrl+Return"), self.text_edit)
         shortcut.activated.connect(self.send_question)
+        # Atalho para Ctrl+F buscar no histórico de conversas
+        search_shortcut = QShortcut(QKeySequence("Ctrl+F"), self)
+        search_shortcut.activated.connect(self.search_history)
         #Procura o tema atual e aplica
         self.current_theme = load_theme()
         self.apply_theme(self.current_theme)
@@ -223,6 +260,9 @@ class MainWindow(QFrame):
         # Mostrar a janela
         self.show()
 
+        # Exibir o fim da última conversa salva
+        QTimer.singleShot(0, self.load_older_messages)
+
         # Verificar se a chave da API está configurada
         self.check_api_key_on_startup()
 
@@ -233,12 +273,14 @@ class MainWindow(QFrame):
             set_button_icon_with_hover(self.capture_button, 'fa.camera', '#b4b4b4', '#171717')
             #Botao de enviar
             set_button_icon_with_hover(self.send_button, 'mdi.send','#b4b4b4', '#171717')
+            #Botao de cancelar
+            set_button_icon_with_hover(self.stop_button, 'mdi.stop-circle-outline', '#b4b4b4', '#171717')
             self.setStyleSheet("""                        
-                QPushButton#send_button, QPushButton#capture_button{
+                QPushButton#send_button, QPushButton#capture_button, QPushButton#stop_button{
                     border: none;
                     background-color: transparent;
                 }
-                QPushButton#send_button:hover, QPushButton#capture_button:hover {
+                QPushButton#send_button:hover, QPushButton#capture_button:hover, QPushButton#stop_button:hover {
                     background-color: #e0e0e0;
                     border-radius: 18px;
                 }
@@ -277,12 +319,14 @@ class MainWindow(QFrame):
             set_button_icon_with_hover(self.capture_button, 'fa.camera', '#171717', '#171717')
             #Botao de enviar
             set_button_icon_with_hover(self.send_button, 'mdi.send', '#171717', '#171717')
+            #Botao de cancelar
+            set_button_icon_with_hover(self.stop_button, 'mdi.stop-circle-outline', '#171717', '#171717')
             self.setStyleSheet("""
-                QPushButton#send_button, QPushButton#capture_button{
+                QPushButton#send_button, QPushButton#capture_button, QPushButton#stop_button{
                     border: none;
                     background-color: transparent;
                 }
-                QPushButton#send_button:hover, QPushButton#capture_button:hover {
+                QPushButton#send_button:hover, QPushButton#capture_button:hover, QPushButton#stop_button:hover {
                     background-color: #b4b4b4;
                     border-radius: 18px;
                 }
@@ -321,6 +365,7 @@ class MainWindow(QFrame):
         self.settings_window.api_key_updated.connect(self.update_api_key)
         self.settings_window.theme_updated.connect(self.change_theme)
         self.settings_window.hotkey_updated.connect(self.update_hotkey)
+        self.settings_window.action_hotkeys_updated.connect(self.update_action_hotkeys)
 
         self.settings_window.exec_()
 
@@ -352,6 +397,11 @@ class MainWindow(QFrame):
         else:
             print("Erro: A instância do aplicativo não possui o método 'update_hotkey'.")
 
+    def update_action_hotkeys(self, action_hotkeys):
+        app = QApplication.instance()
+        if hasattr(app, 'update_action_hotkeys'):
+            app.update_action_hotkeys(action_hotkeys)
+
     def start_screenshot(self):
         self.screenshot_widget = ScreenshotWidget()
         self.screenshot_widget.selection_made.connect(self.update_image)
@@ -364,30 +414,11 @@ class MainWindow(QFrame):
             show_custom_message('Alerta', 'A seleção de captura de tela é muito pequena. Por favor, selecione uma área maior')
             return
 
-        # Capturar a imagem da área selecionada
-        img = ImageGrab.grab(bbox=(rect.left(), rect.top(), rect.right(), rect.bottom()))
-
-        # Armazenar a imagem capturada
-        self.captured_image = img
-
-        # Converter a imagem para bytes
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        image_data = buffer.getvalue()
-
-        # Armazenar os dados da imagem codificados em base64
-        self.image_data_base64 = base64.b64encode(image_data).decode('utf-8')
-
-        # Exibir a imagem na área de chat
-        pixmap = QPixmap()
-        pixmap.loadFromData(image_data)
-        pixmap = pixmap.scaledToWidth(200, Qt.SmoothTransformation)
-        image_label = QLabel()
+        # Exibir um espaço reservado enquanto a captura é processada
+        image_label = QLabel("Processando imagem...")
         image_label.setObjectName("image_label")
-        image_label.setPixmap(pixmap)
-        image_label.setFixedWidth(200)
-
+        image_label.setAlignment(Qt.AlignCenter)
+        image_label.setFixedSize(200, max(40, round(rect.height() * 200 / rect.width())))
 
         bubble_widget = QWidget()
         bubble_layout = QHBoxLayout()
@@ -397,16 +428,49 @@ class MainWindow(QFrame):
         bubble_widget.setLayout(bubble_layout)
         self.chat_layout.insertWidget(self.chat_layout.count() - 1, bubble_widget)
 
+        # Captura, PNG e miniatura são feitos no pool de imagens; o resultado chega em on_image_captured
+        self.capture_counter += 1
+        capture_id = str(self.capture_counter)
+        self.pending_captures[capture_id] = image_label
+        submit_capture((rect.left(), rect.top(), rect.right(), rect.bottom()), self.image_captured, capture_id)
+
         # Autoscroll para a última mensagem
         self.autoscroll_chat()
 
-        # Trazer a janela principal para o primeiro plano
+    @pyqtSlot(str, object)
+    def on_image_captured(self, capture_id, result):
+        """
+        Recebe a captura processada fora da thread da interface e exibe a miniatura.
+        """
+        image_label = self.pending_captures.pop(capture_id, None)
+        if image_label is None:
+            return
+        # Trazer a janela principal para o primeiro plano só depois da captura,
+        # para que ela não apareça na imagem quando estiver sobre a área selecionada
         self.raise_()
         self.activateWindow()
+        if isinstance(result, Exception):
+            image_label.setText("Falha na captura")
+            show_custom_message('Alerta', f'Não foi possível capturar a imagem: {result}')
+            return
+
+        # Armazenar a imagem capturada; o histórico guarda só a referência ao armazenamento de imagens
+        self.captured_image = result["image"]
+        self.image_part = result["ref"]
+
+        data, width, height = result["thumbnail"]
+        thumbnail = QImage(data, width, height, width * 4, QImage.Format_RGBA8888).copy()
+        image_label.setText("")
+        image_label.setFixedSize(width, height)
+        image_label.setPixmap(QPixmap.fromImage(thumbnail))
+        self.autoscroll_chat()
 
     def send_question(self):
         question = self.text_edit.text().strip()
-        if not question and not hasattr(self, 'image_data_base64'):
+        if self.pending_captures:
+            show_custom_message('Alerta', 'Aguarde o processamento da imagem capturada')
+            return
+        if not question and not hasattr(self, 'image_part'):
             show_custom_message('Alerta', 'Por favor, digite uma mensagem ou capture uma imagem')
             return
 
@@ -426,45 +490,161 @@ class MainWindow(QFrame):
         # Desabilitar o botão enquanto processa
         self.send_button.setEnabled(False)
 
-        # Iniciar thread para não bloquear a interface
-        threading.Thread(target=process_question, args=(self, question)).start()
+        # A imagem capturada vai junto com a pergunta (e some com ela se a pergunta for cancelada)
+        image_part = getattr(self, 'image_part', None)
+        if image_part is not None:
+            del self.image_part
+            del self.captured_image
 
+        # Enviar para o engine de requisições para não bloquear a interface
+        request_id = start_request(
+            process_question, self, (question, image_part), self.handle_question_response, name="question"
+        )
+        self.track_chat_request(request_id, 'question')
 
-    @pyqtSlot(str)
-    def update_response(self, answer):
+    def handle_sidemenu_action(self, data):
+        """
+        Envia a ação do menu lateral e acompanha a requisição para que possa ser cancelada.
+        """
+        request_id = sidemenu_action(self, data)
+        if request_id:
+            self.track_chat_request(request_id, 'sidemenu')
+        else:
+            self.side_menu_window.reactivate_buttons()
+
+    def track_chat_request(self, request_id, kind):
+        self.chat_requests[request_id] = kind
+        self.stop_button.show()
+
+    def finish_chat_request(self, request_id):
+        self.chat_requests.pop(request_id, None)
+        if not self.chat_requests:
+            self.stop_button.hide()
+
+    def handle_question_response(self, request_id, answer):
+        """
+        Recebe a resposta de uma pergunta enviada pelo chat.
+        """
+        self.finish_chat_request(request_id)
         # Habilitar o botão "Enviar" novamente
         self.send_button.setEnabled(True)
+        self.update_response(request_id, answer)
+
+    def handle_sidemenu_response(self, request_id, answer):
+        """
+        Recebe a resposta de uma ação do menu lateral, que também é copiada para o clipboard.
+        """
+        self.finish_chat_request(request_id)
+        self.update_response(request_id, answer, copy_to_clipboard=True)
+        #Reativar botoes do sidemenu
+        self.side_menu_window.reactivate_buttons()
+
+    def cancel_chat_requests(self):
+        """
+        Cancela as requisições do chat e do menu lateral em andamento e libera os botões imediatamente.
+        """
+        for request_id, kind in list(self.chat_requests.items()):
+            cancel_request(request_id)
+            self.mark_request_cancelled(request_id)
+            if kind == 'question':
+                self.send_button.setEnabled(True)
+            else:
+                self.side_menu_window.reactivate_buttons()
+        self.chat_requests.clear()
+        self.stop_button.hide()
+
+    def mark_request_cancelled(self, request_id):
+        """
+        Indica no chat que a requisição foi cancelada, mantendo o que já tinha chegado em streaming.
+        """
+        streaming_bubble = self.streaming_bubbles.pop(request_id, None)
+        self.remove_progress_bubble(request_id)
+        if streaming_bubble is not None:
+            streaming_bubble.append_text("\n\n[Cancelado]")
+        else:
+            info_bubble = ChatBubble("Requisição cancelada", sender='system')
+            self.chat_layout.insertWidget(self.chat_layout.count() - 1, info_bubble)
+        self.autoscroll_chat()
+
+    def update_response(self, request_id, answer, copy_to_clipboard=False):
+        """
+        Exibe a resposta da requisição 'request_id' na área de chat.
+        """
+        # Finalizar a bolha criada durante o streaming, se houver
+        streaming_bubble = self.streaming_bubbles.pop(request_id, None)
+        self.remove_progress_bubble(request_id)
 
         if answer.startswith("Erro:"):
             show_custom_message('Alerta', answer)
-            #Reativar botoes do sidemenu
-            self.side_menu_window.reactivate_buttons()
             return
 
         # Exibir a resposta na área de chat
-        assistant_bubble = ChatBubble(answer, sender='assistant')
-        self.chat_layout.insertWidget(self.chat_layout.count() - 1, assistant_bubble)
+        if streaming_bubble is not None:
+            streaming_bubble.set_text(answer)
+        else:
+            assistant_bubble = ChatBubble(answer, sender='assistant')
+            self.chat_layout.insertWidget(self.chat_layout.count() - 1, assistant_bubble)
         # Copiar para o clipboard se setado para tal
-        if self.is_to_copy:
+        if copy_to_clipboard:
             clipboard = QApplication.clipboard()
+            # A resposta do próprio Echo no clipboard não deve disparar uma antecipação
+            get_speculation_store().ignore(answer)
             clipboard.setText(answer)
-            self.is_to_copy = False  # Resetar a flag
 
-        #Reativar botoes do sidemenu
-        self.side_menu_window.reactivate_buttons()
         # Autoscroll para a última mensagem
         self.autoscroll_chat()
 
+        # Resumir em segundo plano as conversas que já saíram da janela de contexto
+        schedule_compaction(self)
+
+
+    def update_response_chunk(self, request_id, chunk):
+        """
+        Exibe os trechos de uma resposta em streaming, criando a bolha do assistente no primeiro trecho.
+        """
+        bubble = self.streaming_bubbles.get(request_id)
+        if bubble is None:
+            bubble = ChatBubble(chunk, sender='assistant')
+            self.streaming_bubbles[request_id] = bubble
+            self.chat_layout.insertWidget(self.chat_layout.count() - 1, bubble)
+        else:
+            bubble.append_text(chunk)
+        self.autoscroll_chat()
+
+    def update_request_progress(self, request_id, message):
+        """
+        Exibe o progresso de uma requisição em várias etapas em uma bolha do sistema, atualizada a cada etapa.
+        """
+        bubble = self.progress_bubbles.get(request_id)
+        if bubble is None:
+            bubble = ChatBubble(message, sender='system')
+            self.progress_bubbles[request_id] = bubble
+            self.chat_layout.insertWidget(self.chat_layout.count() - 1, bubble)
+            self.autoscroll_chat()
+        else:
+            bubble.set_text(message)
 
+    def remove_progress_bubble(self, request_id):
+        bubble = self.progress_bubbles.pop(request_id, None)
+        if bubble is not None:
+            bubble.deleteLater()
 
     #limpa o chat das bubbles e também a lista de conversas
     def clear_chat(self):
         """
         Limpa a área de chat e o histórico de conversas.
         """
-        with self.conversation_lock:
-            # Limpar o histórico de conversas
-            self.conversation_history.clear()
+        # Começar uma nova sessão; as anteriores continuam salvas para busca
+        self.conversation_store.clear()
+        self.conversation_summary = None
+        self.history_cursor = None
+        self.history_exhausted = False
+        self.history_top_session = None
+        self.history_top_header = None
+        # As bolhas em streaming serão removidas junto com as demais
+        self.streaming_bubbles.clear()
+        self.progress_bubbles.clear()
+        self.pending_captures.clear()
         
         # Remover todas as mensagens da área de chat (exceto o widget de espaçamento)
         while self.chat_layout.count() > 1:
@@ -478,6 +658,68 @@ class MainWindow(QFrame):
         self.chat_layout.insertWidget(self.chat_layout.count() - 1, info_bubble)
         self.autoscroll_chat()
 
+    def on_chat_scrolled(self, value):
+        if value == 0 and not self.history_exhausted and self.chat_scroll.verticalScrollBar().maximum() > 0:
+            self.load_older_messages()
+
+    def load_older_messages(self):
+        """
+        Insere no topo do chat a próxima página de mensagens das conversas anteriores,
+        mantendo a posição de leitura. As mensagens são lidas do banco só quando necessário.
+        """
+        rows = self.conversation_store.load_before(self.history_cursor)
+        if not rows:
+            self.history_exhausted = True
+            return
+        self.history_cursor = rows[0]["id"]
+
+        # A conversa que estava no topo continua nesta página: o cabeçalho dela sobe junto
+        if rows[-1]["session_id"] == self.history_top_session and self.history_top_header is not None:
+            self.history_top_header.deleteLater()
+            self.history_top_header = None
+
+        scrollbar = self.chat_scroll.verticalScrollBar()
+        distance_from_bottom = scrollbar.maximum() - scrollbar.value()
+        position = 0
+        session_id = None
+        for row in rows:
+            if row["session_id"] != session_id:
+                session_id = row["session_id"]
+                started = time.strftime('%d/%m/%Y %H:%M', time.localtime(row["created"]))
+                header = ChatBubble(f"Conversa de {started}", sender='system')
+                self.chat_layout.insertWidget(position, header)
+                position += 1
+                if position == 1:
+                    self.history_top_header = header
+            sender = row["role"] if row["role"] in ('user', 'assistant') else 'system'
+            self.chat_layout.insertWidget(position, ChatBubble(row["text"], sender=sender))
+            position += 1
+        self.history_top_session = rows[0]["session_id"]
+
+        # Manter na tela as mesmas mensagens depois que o layout crescer
+        QTimer.singleShot(0, lambda: scrollbar.setValue(scrollbar.maximum() - distance_from_bottom))
+
+    def search_history(self):
+        """
+        Busca um texto em todas as conversas salvas e exibe os resultados no chat.
+        """
+        query, ok = QInputDialog.getText(self, 'Buscar no histórico', 'Texto a buscar:')
+        if not ok or not query.strip():
+            return
+        results = self.conversation_store.search(query)
+        if not results:
+            text = f"Nada encontrado para \"{query}\""
+        else:
+            lines = [f"Resultados para \"{query}\":"]
+            for result in results:
+                when = time.strftime('%d/%m/%Y %H:%M', time.localtime(result["created"]))
+                speaker = "Você" if result["role"] == 'user' else "Echo"
+                lines.append(f"{when} - {speaker}: {result['text']}")
+            text = "\n\n".join(lines)
+        info_bubble = ChatBubble(text, sender='system')
+        self.chat_layout.insertWidget(self.chat_layout.count() - 1, info_bubble)
+        self.autoscroll_chat()
+
     def autoscroll_chat(self):
         """
         Força o chat a rolar para o final quando uma nova mensagem é adicionada.
@@ -548,6 +790,7 @@ class MainWindow(QFrame):
             self.content_container.setGeometry(0, 0, self.width(), self.height())
 
     def close_application(self):
+        self.conversation_store.close()
         QApplication.instance().quit()
 
     def minimize_to_tray(self):
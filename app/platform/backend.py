@@ -0,0 +1,48 @@
+# app/platform/backend.py
+
+import os
+import sys
+import threading
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name=None):
+    """
+    Cria o backend da plataforma: 'windows', 'linux' ou 'fake'. Sem nome, usa a variável
+    de ambiente ECHO_PLATFORM ou o sistema atual.
+    """
+    name = name or os.environ.get("ECHO_PLATFORM")
+    if not name:
+        name = "windows" if sys.platform == "win32" else "linux" if sys.platform.startswith("linux") else "fake"
+    if name == "windows":
+        from app.platform.windows import WindowsBackend
+        return WindowsBackend()
+    if name == "linux":
+        from app.platform.linux import LinuxBackend
+        return LinuxBackend()
+    if name == "fake":
+        from app.platform.fake import FakeBackend
+        return FakeBackend()
+    raise ValueError(f"Backend de plataforma desconhecido: {name}")
+
+
+def get_backend():
+    """
+    Retorna o backend da plataforma, escolhido na primeira chamada.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+
+def set_backend(backend):
+    """
+    Troca o backend em uso (por exemplo, pelo FakeBackend nos testes).
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,81 @@
+# app/platform/base.py
+
+import time
+from app.utils import metrics
+
+
+class PlatformBackend:
+    """
+    Interface com o sistema operacional usada pelo fluxo de copiar/colar e pelas janelas:
+    janela em primeiro plano, injeção de teclas e número de sequência do clipboard.
+    Os métodos públicos medem a latência de cada operação (métrica 'platform.<backend>.<operação>');
+    as implementações sobrescrevem os métodos com '_'.
+    Teclas são nomes simples: 'ctrl', 'backspace', 'c', 'v'.
+    """
+    name = "base"
+
+    def _measure(self, operation, function, *args):
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            metrics.record_latency(f"platform.{self.name}.{operation}", time.perf_counter() - started)
+
+    def set_app_id(self, app_id):
+        """Identifica o processo para o sistema (ícone na barra de tarefas)."""
+        return self._measure("set_app_id", self._set_app_id, app_id)
+
+    def foreground_window(self):
+        """Handle da janela em primeiro plano, ou None."""
+        return self._measure("foreground_window", self._foreground_window)
+
+    def activate_window(self, handle):
+        """Traz a janela para o primeiro plano. Retorna se conseguiu."""
+        return self._measure("activate_window", self._activate_window, handle)
+
+    def window_process(self, handle):
+        """Nome do processo dono da janela (usado para aprender o tempo de cópia de cada aplicativo)."""
+        return self._measure("window_process", self._window_process, handle)
+
+    def key_event(self, key, down):
+        """Pressiona (down=True) ou solta uma tecla."""
+        return self._measure("key_event", self._key_event, key, down)
+
+    def send_copy(self):
+        """Injeta Ctrl+C na janela em primeiro plano."""
+        return self._measure("send_copy", self._send_copy)
+
+    def clipboard_sequence_number(self):
+        """Número que muda a cada alteração do clipboard, ou None se não houver suporte."""
+        return self._measure("clipboard_sequence", self._clipboard_sequence_number)
+
+    def set_no_activate(self, widget):
+        """Impede que a janela do widget roube o foco ao ser clicada."""
+        return self._measure("set_no_activate", self._set_no_activate, widget)
+
+    def _set_app_id(self, app_id):
+        pass
+
+    def _foreground_window(self):
+        return None
+
+    def _activate_window(self, handle):
+        return False
+
+    def _window_process(self, handle):
+        return "desconhecido"
+
+    def _key_event(self, key, down):
+        pass
+
+    def _send_copy(self):
+        self._key_event("ctrl", True)
+        self._key_event("c", True)
+        self._key_event("c", False)
+        self._key_event("ctrl", False)
+
+    def _clipboard_sequence_number(self):
+        return None
+
+    def _set_no_activate(self, widget):
+        pass
@@ -0,0 +1,45 @@
+# app/platform/fake.py
+
+from PyQt5.QtWidgets import QApplication
+from app.platform.base import PlatformBackend
+
+
+class FakeBackend(PlatformBackend):
+    """
+    Implementação em memória, para testes e CI: simula janelas, seleção de texto e teclas.
+    Ctrl+C copia 'selection' para o clipboard do Qt; Ctrl+V registra o texto do clipboard em 'pasted'.
+    """
+    name = "fake"
+
+    def __init__(self):
+        self.foreground = 1
+        self.selection = ""
+        self.events = []   # (tecla, pressionada)
+        self.pasted = []
+        self.sequence = 0
+        self._pressed = set()
+
+    def _foreground_window(self):
+        return self.foreground
+
+    def _activate_window(self, handle):
+        self.foreground = handle
+        return True
+
+    def _window_process(self, handle):
+        return f"fake-{handle}"
+
+    def _key_event(self, key, down):
+        self.events.append((key, down))
+        if not down:
+            self._pressed.discard(key)
+            return
+        self._pressed.add(key)
+        if "ctrl" in self._pressed and key == "c" and self.selection:
+            QApplication.clipboard().setText(self.selection)
+            self.sequence += 1
+        elif "ctrl" in self._pressed and key == "v":
+            self.pasted.append(QApplication.clipboard().text())
+
+    def _clipboard_sequence_number(self):
+        return self.sequence
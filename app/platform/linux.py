@@ -0,0 +1,73 @@
+# app/platform/linux.py
+
+import shutil
+import subprocess
+from PyQt5.QtCore import Qt
+from app.platform.base import PlatformBackend
+
+# Tempo máximo de uma chamada ao xdotool (segundos)
+XDOTOOL_TIMEOUT = 1.0
+
+
+class LinuxBackend(PlatformBackend):
+    """
+    Implementação para Linux: janelas via xdotool (X11) e teclas via pynput, que usa o X11
+    ou o uinput (PYNPUT_BACKEND=uinput, para Wayland). Sem xdotool, a janela de origem
+    não é controlada e a colagem vai para a janela em primeiro plano.
+    """
+    name = "linux"
+
+    def __init__(self):
+        self._xdotool = shutil.which("xdotool")
+        self._keyboard = None
+        self._keys = {}
+        try:
+            from pynput.keyboard import Controller, Key
+            self._keyboard = Controller()
+            self._keys = {"ctrl": Key.ctrl, "backspace": Key.backspace, "c": "c", "v": "v"}
+        except Exception as e:
+            print(f"Injeção de teclas indisponível: {e}")
+
+    def _run_xdotool(self, *args):
+        if not self._xdotool:
+            return None
+        try:
+            result = subprocess.run(
+                [self._xdotool, *args], capture_output=True, text=True, timeout=XDOTOOL_TIMEOUT
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def _foreground_window(self):
+        output = self._run_xdotool("getactivewindow")
+        return int(output) if output and output.isdigit() else None
+
+    def _activate_window(self, handle):
+        return self._run_xdotool("windowactivate", str(handle)) is not None
+
+    def _window_process(self, handle):
+        pid = self._run_xdotool("getwindowpid", str(handle))
+        if not pid or not pid.isdigit():
+            return "desconhecido"
+        try:
+            with open(f"/proc/{pid}/comm", encoding="utf-8") as file:
+                return file.read().strip()
+        except OSError:
+            return "desconhecido"
+
+    def _key_event(self, key, down):
+        if self._keyboard is None:
+            return
+        if down:
+            self._keyboard.press(self._keys[key])
+        else:
+            self._keyboard.release(self._keys[key])
+
+    def _set_no_activate(self, widget):
+        visible = widget.isVisible()
+        widget.setAttribute(Qt.WA_ShowWithoutActivating)
+        widget.setWindowFlag(Qt.WindowDoesNotAcceptFocus, True)
+        if visible:
+            # Trocar as flags esconde a janela
+            widget.show()
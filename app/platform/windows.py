@@ -0,0 +1,75 @@
+# app/platform/windows.py
+
+import ctypes
+from ctypes import wintypes
+from app.platform.base import PlatformBackend
+
+KEYEVENTF_KEYUP = 0x0002
+VIRTUAL_KEYS = {"ctrl": 0x11, "backspace": 0x08, "c": 0x43, "v": 0x56}
+
+GWL_EXSTYLE = -20
+WS_EX_NOACTIVATE = 0x08000000
+PROCESS_QUERY_INFORMATION = 0x0400
+PROCESS_VM_READ = 0x0010
+
+
+class WindowsBackend(PlatformBackend):
+    """
+    Implementação para Windows com a API Win32 (user32/kernel32) via ctypes.
+    """
+    name = "windows"
+
+    def __init__(self):
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+
+    def _set_app_id(self, app_id):
+        ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(app_id)
+
+    def _foreground_window(self):
+        return self.user32.GetForegroundWindow() or None
+
+    def _activate_window(self, handle):
+        foreground = self.user32.GetForegroundWindow()
+        if foreground == handle:
+            return True
+        # O Windows só deixa trocar o primeiro plano se as threads de entrada estiverem anexadas
+        foreground_thread_id = self.user32.GetWindowThreadProcessId(foreground, 0)
+        target_thread_id = self.user32.GetWindowThreadProcessId(handle, 0)
+        self.user32.AttachThreadInput(target_thread_id, foreground_thread_id, True)
+        try:
+            return bool(self.user32.SetForegroundWindow(handle))
+        finally:
+            self.user32.AttachThreadInput(target_thread_id, foreground_thread_id, False)
+
+    def _window_process(self, handle):
+        return self.window_info(handle)[1]
+
+    def window_info(self, handle):
+        """
+        Retorna (título da janela, caminho do executável) a partir do HWND.
+        """
+        length = self.user32.GetWindowTextLengthW(handle)
+        buff = ctypes.create_unicode_buffer(length + 1)
+        self.user32.GetWindowTextW(handle, buff, length + 1)
+
+        pid = wintypes.DWORD()
+        self.user32.GetWindowThreadProcessId(handle, ctypes.byref(pid))
+        process_handle = self.kernel32.OpenProcess(PROCESS_QUERY_INFORMATION | PROCESS_VM_READ, False, pid.value)
+        if not process_handle:
+            return buff.value, "desconhecido"
+        filename_buff = ctypes.create_unicode_buffer(260)
+        ctypes.windll.psapi.GetModuleFileNameExW(process_handle, 0, filename_buff, 260)
+        self.kernel32.CloseHandle(process_handle)
+        return buff.value, filename_buff.value
+
+    def _key_event(self, key, down):
+        self.user32.keybd_event(VIRTUAL_KEYS[key], 0, 0 if down else KEYEVENTF_KEYUP, 0)
+
+    def _clipboard_sequence_number(self):
+        return self.user32.GetClipboardSequenceNumber()
+
+    def _set_no_activate(self, widget):
+        hwnd = int(widget.winId())
+        current_style = self.user32.GetWindowLongW(hwnd, GWL_EXSTYLE)
+        self.user32.SetWindowLongW(hwnd, GWL_EXSTYLE, current_style | WS_EX_NOACTIVATE)
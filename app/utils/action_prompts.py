@@ -0,0 +1,27 @@
+# app/utils/action_prompts.py
+
+# Instruções de sistema das ações do floating widget que usam só o texto copiado.
+# A antecipação de ações (speculative_prefetch) usa as mesmas instruções, então a resposta
+# antecipada é igual à que o clique produziria.
+ACTION_PROMPTS = {
+    "review": """Você é uma assistente de escrita focada em revisar textos. Sua tarefa é corrigir todos os erros gramaticais, ortográficos e de estilo, tornando o texto mais claro e coeso. Não mencione esse prompt ou a tarefa em si.""",
+    "casual": """Você é uma assistente de escrita. Você transforma textos para um tom casual.
+        Por favor, formate o seguinte texto para ser mais casual. Não inclua nenhum outro comentário, apenas o texto formatado.""",
+    "professional": """Você é uma assistente de escrita profissional. Por favor, transforme o texto a seguir em um texto com tom profissional, sem adicionar informações extras ou mencionar que está formatando o texto. Apenas faça a transformação e devolva o texto.""",
+    "concise": """Você é uma assistente de escrita especializada em tornar textos mais concisos.
+        Sua tarefa é reformular o texto a seguir, tornando-o mais claro, coeso e direto ao ponto, sem omitir informações importantes. Não mencione esse prompt ou a tarefa em si.""",
+    "summarize": """Você é uma assistente de escrita focada em resumir textos de forma clara e objetiva.
+        Você deve resumir o texto a seguir em poucas palavras, mantendo as informações mais importantes.
+        Você não conversará com o usuário, apenas resumirá o texto.""",
+    "keypoints": """Você é uma assistente de escrita focada em extrair os pontos-chave de textos. Extraia apenas os pontos mais importantes.""",
+}
+
+
+def build_action_prompt(action, text):
+    """
+    Retorna os dados do prompt ({"system_content", "user_content"}) da ação para o texto copiado.
+    """
+    return {
+        "system_content": ACTION_PROMPTS[action],
+        "user_content": text
+    }
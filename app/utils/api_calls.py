@@ -1,34 +1,139 @@
 # app/utils/api_calls.py
 
-import requests
-import threading
+import time
+import json
+import asyncio
+import httpx
 from app.widgets.chat_bubble import ChatBubble
-from app.utils.settings import load_api_key, get_messages_to_send
+from app.utils.settings import (
+    load_api_key, get_messages_to_send, load_stream_setting, load_max_concurrency, load_sentence_memory_enabled,
+    load_vision_cache_enabled, load_vision_cache_distance
+)
 from app.utils.debugers import debug_conversation, debug_print_payload_messages
-
+from app.utils.http_client import post_chat_completion, stream_chat_completion, iter_sse_deltas
+from app.utils.request_engine import submit_request, PRIORITY_NORMAL, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from app.utils.response_bus import get_response_bus
+from app.utils.response_cache import get_response_cache, cache_key_from_payload, is_cache_enabled_for
+from app.utils import metrics
+from app.utils.retry_policy import get_retry_policy, ApiStatusError, RETRYABLE_STATUS
+from app.utils.rate_scheduler import get_rate_scheduler
+from app.utils.tokens import estimate_payload_tokens, estimate_text_tokens
+from app.utils.text_chunking import split_text, split_sentences
+from app.utils.image_store import materialize_images
+from app.utils.vision_cache import get_vision_cache, make_question_key
+from app.utils.sentence_memory import get_sentence_memory, make_sentence_key
+from app.utils.speculative_prefetch import get_speculation_store
+from app.utils.action_prompts import build_action_prompt
+
+# Intervalo mínimo (segundos) entre atualizações da interface durante o streaming
+STREAM_UPDATE_INTERVAL = 0.05
+
+# Requisições idênticas em andamento (usado apenas dentro do loop do engine):
+# chave do payload -> {"task": tarefa compartilhada, "stream": SharedStream dos interessados}
+_inflight_requests = {}
+
+# Resumo em partes (map-reduce) para textos longos
+SUMMARY_ACTIONS = {'resume', 'synthesis', 'custom_reading', 'summarize'}
+SUMMARY_CHUNK_TOKENS = 3000     # tamanho máximo de cada parte do texto
+SUMMARY_PART_MAX_TOKENS = 500   # limite do resumo de cada parte
+SUMMARY_MAX_TOKENS = 1000       # limite do resumo final
+
+SUMMARY_PART_PROMPT = """Você é uma assistente que resume partes de um documento longo.
+O texto a seguir é a parte {index} de {total} do documento. Resuma-o de forma fiel e objetiva,
+preservando fatos, números, nomes e conclusões importantes. Não inclua nenhum outro comentário."""
+
+SUMMARY_REDUCE_NOTE = """
+O texto a seguir é composto pelos resumos parciais, em ordem, das partes de um documento longo.
+Combine-os em um único resultado coeso, seguindo as instruções acima."""
+
+# Reescrita em partes (correção, tom, concisão) para textos longos
+REWRITE_ACTIONS = {'correction', 'casual', 'formal', 'concise', 'review', 'professional'}
+REWRITE_SINGLE_TOKENS = 250     # acima disso a resposta não cabe em max_tokens: 300
+REWRITE_CHUNK_TOKENS = 800      # tamanho máximo de cada parte do texto
+
+REWRITE_PART_NOTE = """
+O texto a seguir pode ser apenas um trecho de um texto maior. Reescreva somente este trecho,
+sem acrescentar introduções, conclusões ou comentários."""
+
+# Memória de frases: só as frases novas ou editadas vão para a API
+SENTENCE_MEMORY_ACTIONS = {'review', 'casual', 'professional'}
+SENTENCE_BATCH_TOKENS = 800     # tamanho máximo de cada lote de frases enviado
+
+SENTENCE_MEMORY_NOTE = """
+Você receberá um JSON no formato {"sentences": [...]} com frases de um texto, em ordem.
+Aplique as instruções acima a cada frase e responda apenas com um JSON no mesmo formato,
+com o mesmo número de itens e na mesma ordem: cada item é a frase correspondente reescrita."""
 
 
 def sidemenu_action(window, data):
     """
-    Recebe os dados do botão clicado no menu lateral e emite um sinal para o processamento.
+    Recebe os dados do botão clicado no menu lateral e envia a requisição correspondente.
+    Retorna o ID da requisição (ou None se a ação não existir).
     """
     action, prompt, copied_text = data  # Separar o prompt completo e o texto copiado
+    prompt = dict(prompt, action=action)  # A ação acompanha o prompt (usada pelo cache)
     if action == 'casual':
-        send_casual_prompt(window, (prompt, copied_text))
+        return send_casual_prompt(window, (prompt, copied_text))
     if action == 'formal':
-        send_formal_prompt(window, (prompt, copied_text))
+        return send_formal_prompt(window, (prompt, copied_text))
     if action == 'correction':
-        send_correction_prompt(window, (prompt, copied_text))
+        return send_correction_prompt(window, (prompt, copied_text))
     if action == 'concise':
-        send_concise_prompt(window, (prompt, copied_text))
+        return send_concise_prompt(window, (prompt, copied_text))
     if action == 'rewrite':
-        send_rewrite_prompt(window, (prompt, copied_text))
+        return send_rewrite_prompt(window, (prompt, copied_text))
     if action == 'resume':
-        send_resume_prompt(window, (prompt, copied_text))
+        return send_resume_prompt(window, (prompt, copied_text))
     if action == 'synthesis':
-        send_synthesis_prompt(window, (prompt, copied_text))
+        return send_synthesis_prompt(window, (prompt, copied_text))
     if action == 'custom_reading':
-        send_synthesis_prompt(window, (prompt, copied_text))
+        return send_synthesis_prompt(window, (prompt, copied_text))
+    return None
+
+
+def start_request(process, window, data, on_response, name="request", priority=PRIORITY_NORMAL):
+    """
+    Registra a requisição no barramento de respostas, envia a corrotina 'process' ao engine
+    e retorna o ID da requisição. Apenas 'on_response' recebe a resposta; os trechos em
+    streaming são exibidos no chat da janela principal.
+    """
+    bus = get_response_bus()
+    request_id = bus.register(on_response, window.update_response_chunk, window.update_request_progress)
+    future = submit_request(process(window, data, request_id), name=name, priority=priority)
+    bus.track(request_id, future)
+    return request_id
+
+
+def cancel_request(request_id):
+    """
+    Cancela uma requisição em andamento. A conexão HTTP é abortada, a vaga no engine é liberada
+    e nenhuma resposta é entregue. Retorna False se a requisição já tinha terminado.
+    """
+    return get_response_bus().cancel(request_id)
+
+
+def _remove_user_message(window, content):
+    """
+    Remove do histórico a mensagem do usuário de uma requisição cancelada, que ficaria sem resposta.
+    """
+    window.conversation_store.remove_last("user", content)
+
+
+def vision_cache_key(model, content_list, context):
+    """
+    Retorna (chave da pergunta, hash da captura) para consultar o cache de imagens, ou None
+    se o cache estiver desativado ou a mensagem não tiver exatamente uma captura.
+    'context' são as mensagens enviadas antes da pergunta: a mesma pergunta em outra conversa
+    pode ter outra resposta, então elas fazem parte da chave.
+    """
+    if not load_vision_cache_enabled():
+        return None
+    images = [part["image_ref"] for part in content_list if part.get("type") == "image_ref"]
+    if len(images) != 1 or not images[0].get("phash"):
+        return None
+    question = " ".join(part.get("text", "") for part in content_list if part.get("type") == "text")
+    context = [[message["role"], message["content"]] for message in context]
+    return make_question_key(model, question, context), images[0]["phash"]
 
 
 #Formata o texto casual para ser enviado para a API 
@@ -41,11 +146,7 @@ def send_casual_prompt(window, data):
     user_bubble = ChatBubble(f"Formando texto casual:\n\n {copied_text}", sender='user')  # Exibir apenas o texto copiado
     window.chat_layout.insertWidget(window.chat_layout.count() - 1, user_bubble)
     window.autoscroll_chat()
-    window.is_to_copy = True
-    # Adicionar o prompt completo ao histórico como mensagem do usuário
-    with window.conversation_lock:
-        window.conversation_history.append({"role": "user", "content": prompt["user_content"]})
-    threading.Thread(target=process_prompt, args=(window, prompt), daemon=True).start()  # Enviar o prompt completo para a API
+    return start_request(process_prompt, window, prompt, window.handle_sidemenu_response, name="sidemenu")  # Enviar o prompt completo para a API
 
 
 #Formata o texto formal para ser enviado para a API
@@ -59,11 +160,7 @@ def send_formal_prompt(window, data):
     user_bubble = ChatBubble(f"Formalizando Texto:\n\n {copied_text}", sender='user')  # Exibir apenas o texto copiado
     window.chat_layout.insertWidget(window.chat_layout.count() - 1, user_bubble)
     window.autoscroll_chat()
-    window.is_to_copy = True
-    # Adicionar o prompt completo ao histórico como mensagem do usuário
-    with window.conversation_lock:
-        window.conversation_history.append({"role": "user", "content": prompt["user_content"]})
-    threading.Thread(target=process_prompt, args=(window, prompt), daemon=True).start()  # Enviar o prompt completo para a API
+    return start_request(process_prompt, window, prompt, window.handle_sidemenu_response, name="sidemenu")  # Enviar o prompt completo para a API
 
 #Formata o texto casual para ser enviado para a API 
 def send_correction_prompt(window, data):
@@ -76,11 +173,7 @@ def send_correction_prompt(window, data):
     user_bubble = ChatBubble(f"Corrigindo texto:\n\n {copied_text}", sender='user')  # Exibir apenas o texto copiado
     window.chat_layout.insertWidget(window.chat_layout.count() - 1, user_bubble)
     window.autoscroll_chat()
-    window.is_to_copy = True
-    # Adicionar o prompt completo ao histórico como mensagem do usuário
-    with window.conversation_lock:
-        window.conversation_history.append({"role": "user", "content": prompt["user_content"]})
-    threading.Thread(target=process_prompt, args=(window, prompt), daemon=True).start()  # Enviar o prompt completo para a API
+    return start_request(process_prompt, window, prompt, window.handle_sidemenu_response, name="sidemenu")  # Enviar o prompt completo para a API
 
 #Formata o texto casual para ser enviado para a API 
 def send_concise_prompt(window, data):
@@ -93,11 +186,7 @@ def send_concise_prompt(window, data):
     user_bubble = ChatBubble(f"Tornando texto conciso:\n\n {copied_text}", sender='user')  # Exibir apenas o texto copiado
     window.chat_layout.insertWidget(window.chat_layout.count() - 1, user_bubble)
     window.autoscroll_chat()
-    window.is_to_copy = True
-    # Adicionar o prompt completo ao histórico como mensagem do usuário
-    with window.conversation_lock:
-        window.conversation_history.append({"role": "user", "content": prompt["user_content"]})
-    threading.Thread(target=process_prompt, args=(window, prompt), daemon=True).start()  # Enviar o prompt completo para a API
+    return start_request(process_prompt, window, prompt, window.handle_sidemenu_response, name="sidemenu")  # Enviar o prompt completo para a API
 
 #Formata o texto casual para ser enviado para a API 
 def send_rewrite_prompt(window, data):
@@ -110,11 +199,7 @@ def send_rewrite_prompt(window, data):
     user_bubble = ChatBubble(f"Formatando o texto com as instruções:\n\n {copied_text}", sender='user')  # Exibir apenas o texto copiado
     window.chat_layout.insertWidget(window.chat_layout.count() - 1, user_bubble)
     window.autoscroll_chat()
-    window.is_to_copy = True
-    # Adicionar o prompt completo ao histórico como mensagem do usuário
-    with window.conversation_lock:
-        window.conversation_history.append({"role": "user", "content": prompt["user_content"]})
-    threading.Thread(target=process_prompt, args=(window, prompt), daemon=True).start()  # Enviar o prompt completo para a API
+    return start_request(process_prompt, window, prompt, window.handle_sidemenu_response, name="sidemenu")  # Enviar o prompt completo para a API
 
 
 #Formata o texto de resumo para ser enviado para a API
@@ -128,11 +213,7 @@ def send_resume_prompt(window, data):
     user_bubble = ChatBubble(f"Resumindo Texto:\n\n {copied_text}", sender='user')  # Exibir apenas o texto copiado
     window.chat_layout.insertWidget(window.chat_layout.count() - 1, user_bubble)
     window.autoscroll_chat()
-    window.is_to_copy = True
-    # Adicionar o prompt completo ao histórico como mensagem do usuário
-    with window.conversation_lock:
-        window.conversation_history.append({"role": "user", "content": prompt["user_content"]})
-    threading.Thread(target=process_prompt, args=(window, prompt), daemon=True).start()  # Enviar o prompt completo para a API
+    return start_request(process_prompt, window, prompt, window.handle_sidemenu_response, name="sidemenu")  # Enviar o prompt completo para a API
 
 #Formata o texto de resumo para ser enviado para a API
 def send_synthesis_prompt(window, data):
@@ -145,11 +226,7 @@ def send_synthesis_prompt(window, data):
     user_bubble = ChatBubble(f"Resumindo texto:\n\n {copied_text}", sender='user')  # Exibir apenas o texto copiado
     window.chat_layout.insertWidget(window.chat_layout.count() - 1, user_bubble)
     window.autoscroll_chat()
-    window.is_to_copy = True
-    # Adicionar o prompt completo ao histórico como mensagem do usuário
-    with window.conversation_lock:
-        window.conversation_history.append({"role": "user", "content": prompt["user_content"]})
-    threading.Thread(target=process_prompt, args=(window, prompt), daemon=True).start()  # Enviar o prompt completo para a API
+    return start_request(process_prompt, window, prompt, window.handle_sidemenu_response, name="sidemenu")  # Enviar o prompt completo para a API
 
 #Formata o texto de resumo com instrucoes para ser enviado para a API
 def send_synthesis_prompt(window, data):
@@ -162,27 +239,450 @@ def send_synthesis_prompt(window, data):
     user_bubble = ChatBubble(f"Resumindo texto com instruções:\n\n {copied_text}", sender='user')  # Exibir apenas o texto copiado
     window.chat_layout.insertWidget(window.chat_layout.count() - 1, user_bubble)
     window.autoscroll_chat()
-    window.is_to_copy = True
-    # Adicionar o prompt completo ao histórico como mensagem do usuário
-    with window.conversation_lock:
-        window.conversation_history.append({"role": "user", "content": prompt["user_content"]})
-    threading.Thread(target=process_prompt, args=(window, prompt), daemon=True).start()  # Enviar o prompt completo para a API
+    return start_request(process_prompt, window, prompt, window.handle_sidemenu_response, name="sidemenu")  # Enviar o prompt completo para a API
+
+
+class SharedStream:
+    """
+    Destino dos trechos em streaming de uma requisição compartilhada (veja fetch_answer_coalesced):
+    cada trecho é entregue a todos os interessados, e quem chega depois recebe primeiro o texto
+    que já tinha chegado. Usado apenas dentro do loop do engine.
+    """
+
+    def __init__(self):
+        self.request_ids = []
+        self._parts = []
+
+    def join(self, request_id):
+        if self._parts:
+            get_response_bus().deliver_chunk(request_id, ''.join(self._parts))
+        self.request_ids.append(request_id)
+
+    def leave(self, request_id):
+        self.request_ids.remove(request_id)
+
+    def deliver(self, chunk):
+        self._parts.append(chunk)
+        for request_id in self.request_ids:
+            get_response_bus().deliver_chunk(request_id, chunk)
+
+
+def _deliver_chunk(target, chunk):
+    # 'target' é o ID de uma requisição ou o SharedStream de uma requisição compartilhada
+    if isinstance(target, SharedStream):
+        target.deliver(chunk)
+    else:
+        get_response_bus().deliver_chunk(target, chunk)
+
+
+def _api_error(response):
+    """
+    Monta a mensagem de erro da resposta. Erros temporários (429, 5xx) viram ApiStatusError
+    para que a política de retentativas possa repetir a requisição.
+    """
+    try:
+        error_message = response.json().get('error', {}).get('message', 'Erro desconhecido')
+    except ValueError:
+        # Alguns erros (ex.: 502 do proxy) não vêm em JSON
+        error_message = f"HTTP {response.status_code}"
+    if response.status_code in RETRYABLE_STATUS:
+        raise ApiStatusError(response.status_code, response.headers, error_message)
+    return f"Erro ao consultar a API: {error_message}", False
+
+
+async def _fetch_once(window, payload, request_id, timeout, stream):
+    """
+    Faz uma única tentativa de envio do payload. Veja fetch_answer.
+    """
+    scheduler = get_rate_scheduler()
+    # Aguarda a vez da requisição dentro dos limites de RPM/TPM antes de enviar
+    await scheduler.acquire(estimate_payload_tokens(payload))
+
+    if not stream:
+        response = await post_chat_completion(window.api_key, payload, timeout=timeout)
+        scheduler.update_from_headers(response.headers)
+        if response.status_code != 200:
+            return _api_error(response)
+        return response.json()['choices'][0]['message']['content'], True
+
+    async with stream_chat_completion(window.api_key, payload, timeout=timeout) as response:
+        scheduler.update_from_headers(response.headers)
+        if response.status_code != 200:
+            await response.aread()
+            return _api_error(response)
+
+        parts = []
+        pending = []
+        last_emit = 0.0
+        try:
+            async for delta in iter_sse_deltas(response):
+                parts.append(delta)
+                pending.append(delta)
+                now = time.monotonic()
+                if now - last_emit >= STREAM_UPDATE_INTERVAL:
+                    _deliver_chunk(request_id, ''.join(pending))
+                    pending.clear()
+                    last_emit = now
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            # Depois que a resposta começou a aparecer não é possível repetir sem duplicar o texto
+            if parts:
+                return f"Erro ao consultar a API: a conexão foi interrompida ({e})", False
+            raise
+        # Enviar o que sobrou no buffer
+        if pending:
+            _deliver_chunk(request_id, ''.join(pending))
+
+    return ''.join(parts), True
+
+
+async def fetch_answer(window, payload, request_id, stream=None):
+    """
+    Envia o payload para a API e retorna a tupla (resposta, sucesso).
+    Com o streaming ativado (ou 'stream' = True), os trechos da resposta são entregues pelo barramento à requisição
+    'request_id' (ou a todos os interessados, se for um SharedStream) conforme chegam, agrupados para não
+    sobrecarregar o loop de eventos do Qt.
+    Timeouts, erros de conexão, 429 e 5xx são repetidos conforme a política de retentativas.
+    Cada tentativa passa antes pelo agendador de limites (RPM/TPM), na prioridade da requisição.
+    """
+    if stream is None:
+        stream = load_stream_setting()
+    try:
+        return await get_retry_policy().run(lambda timeout: _fetch_once(window, payload, request_id, timeout, stream))
+    except ApiStatusError as error:
+        return f"Erro ao consultar a API: {error.message}", False
+
+
+async def fetch_answer_coalesced(window, payload, request_id, key, stream=None):
+    """
+    Igual a fetch_answer, mas se um payload idêntico (mesma chave) já estiver em andamento,
+    aguarda a mesma requisição em vez de enviar outra. Todos os interessados recebem a mesma resposta
+    e os mesmos trechos em streaming, mesmo que quem iniciou a requisição desista;
+    a requisição compartilhada só é cancelada quando o último interessado desiste.
+    """
+    entry = _inflight_requests.get(key)
+    if entry is None:
+        shared_stream = SharedStream()
+        task = asyncio.ensure_future(fetch_answer(window, payload, shared_stream, stream))
+        entry = {"task": task, "stream": shared_stream}
+        _inflight_requests[key] = entry
+
+        def _forget(_task, key=key, entry=entry):
+            if _inflight_requests.get(key) is entry:
+                del _inflight_requests[key]
+
+        task.add_done_callback(_forget)
+    else:
+        metrics.increment("coalesce.joined")
+
+    entry["stream"].join(request_id)
+    try:
+        # shield: cancelar um interessado não cancela a requisição dos demais
+        return await asyncio.shield(entry["task"])
+    finally:
+        entry["stream"].leave(request_id)
+        if not entry["stream"].request_ids and not entry["task"].done():
+            entry["task"].cancel()
+
+
+def _use_cache(prompt_data):
+    return prompt_data.get("use_cache", True) and is_cache_enabled_for(prompt_data.get("action"))
+
+
+async def fetch_answer_cached(window, payload, request_id, prompt_data, stream=None):
+    """
+    Igual a fetch_answer, mas consulta antes o cache de respostas e junta requisições idênticas em andamento.
+    O cache é ignorado se estiver desativado, se a ação foi excluída nas configurações
+    ou se o prompt trouxer "use_cache": False.
+    """
+    key = cache_key_from_payload(payload)
+    use_cache = _use_cache(prompt_data)
+
+    if use_cache:
+        cached_answer = get_response_cache().get(key)
+        if cached_answer is not None:
+            return cached_answer, True
+
+    answer, ok = await fetch_answer_coalesced(window, payload, request_id, key, stream)
+    if ok and use_cache:
+        get_response_cache().put(key, answer)
+    return answer, ok
+
+
+async def gather_limited(coroutines, limit):
+    """
+    Executa as corrotinas em paralelo, no máximo 'limit' por vez, e retorna os resultados na ordem original.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(_run(coroutine) for coroutine in coroutines))
+
+
+def is_long_summary(prompt_data):
+    """
+    Verifica se o prompt é um resumo de texto longo demais para uma única chamada.
+    """
+    return (prompt_data.get("action") in SUMMARY_ACTIONS
+            and estimate_text_tokens(prompt_data.get("user_content") or "") > SUMMARY_CHUNK_TOKENS)
+
+
+async def _summarize_parts(window, text, request_id, prompt_data):
+    """
+    Etapa "map": divide o texto em partes e resume todas em paralelo.
+    Retorna (resumos parciais em ordem, None) ou (None, mensagem de erro).
+    """
+    chunks = split_text(text, SUMMARY_CHUNK_TOKENS)
+    total = len(chunks)
+    done = 0
+    bus = get_response_bus()
+    bus.deliver_progress(request_id, f"Texto longo: resumindo em {total} partes...")
+
+    async def _summarize_part(index, chunk):
+        nonlocal done
+        payload = {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {"role": "system", "content": SUMMARY_PART_PROMPT.format(index=index + 1, total=total)},
+                {"role": "user", "content": chunk}
+            ],
+            "max_tokens": SUMMARY_PART_MAX_TOKENS
+        }
+        result = await fetch_answer_cached(window, payload, request_id, prompt_data, stream=False)
+        done += 1
+        bus.deliver_progress(request_id, f"Resumindo o texto: {done} de {total} partes concluídas")
+        return result
+
+    results = await gather_limited(
+        [_summarize_part(index, chunk) for index, chunk in enumerate(chunks)], load_max_concurrency()
+    )
+    for answer, ok in results:
+        if not ok:
+            return None, answer
+    return [answer for answer, _ in results], None
+
+
+async def summarize_map_reduce(window, payload, request_id, prompt_data):
+    """
+    Resume textos longos em partes: as partes são resumidas em paralelo ("map") e os resumos
+    parciais são combinados em uma chamada final ("reduce"), que segue o prompt original da ação.
+    Retorna a tupla (resposta, sucesso), como fetch_answer.
+    """
+    text = prompt_data.get("user_content")
+    # Se os resumos parciais ainda não couberem em uma chamada, resumir de novo
+    while estimate_text_tokens(text) > SUMMARY_CHUNK_TOKENS:
+        partials, error = await _summarize_parts(window, text, request_id, prompt_data)
+        if error is not None:
+            return error, False
+        text = "\n\n".join(partials)
+
+    get_response_bus().deliver_progress(request_id, "Combinando os resumos das partes...")
+    reduce_payload = {
+        "model": payload.get("model"),
+        "messages": [
+            {"role": "system", "content": prompt_data.get("system_content") + SUMMARY_REDUCE_NOTE},
+            {"role": "user", "content": text}
+        ],
+        "max_tokens": SUMMARY_MAX_TOKENS
+    }
+    return await fetch_answer(window, reduce_payload, request_id)
+
+
+def _keep_spacing(original, rewritten):
+    """
+    Aplica ao texto reescrito os espaços e quebras de linha do início e do fim do trecho original.
+    """
+    leading = original[:len(original) - len(original.lstrip())]
+    trailing = original[len(original.rstrip()):]
+    return leading + rewritten.strip() + trailing
+
+
+def is_long_rewrite(prompt_data):
+    """
+    Verifica se o prompt é uma reescrita de texto longo demais para caber em uma única resposta.
+    """
+    return (prompt_data.get("action") in REWRITE_ACTIONS
+            and estimate_text_tokens(prompt_data.get("user_content") or "") > REWRITE_SINGLE_TOKENS)
+
+
+async def rewrite_in_chunks(window, payload, request_id, prompt_data):
+    """
+    Reescreve textos longos em partes: o texto é dividido entre parágrafos, as partes são enviadas
+    em paralelo (no máximo load_max_concurrency() por vez) e os resultados são juntados na ordem original,
+    mantendo os espaços e quebras de linha entre as partes. Retorna a tupla (resposta, sucesso).
+    """
+    chunks = split_text(prompt_data.get("user_content"), REWRITE_CHUNK_TOKENS)
+    total = len(chunks)
+    done = 0
+    bus = get_response_bus()
+    if total > 1:
+        bus.deliver_progress(request_id, f"Texto longo: processando em {total} partes...")
+
+    async def _rewrite_part(chunk):
+        nonlocal done
+        body = chunk.strip()
+        if not body:
+            return chunk, True
+        part_payload = {
+            "model": payload.get("model"),
+            "messages": [
+                {"role": "system", "content": prompt_data.get("system_content") + REWRITE_PART_NOTE},
+                {"role": "user", "content": body}
+            ],
+            # A reescrita tem mais ou menos o tamanho do original; deixar folga
+            "max_tokens": max(payload.get("max_tokens") or 0, int(estimate_text_tokens(body) * 1.5) + 50)
+        }
+        answer, ok = await fetch_answer_cached(window, part_payload, request_id, prompt_data, stream=False)
+        done += 1
+        if total > 1:
+            bus.deliver_progress(request_id, f"Processando o texto: {done} de {total} partes concluídas")
+        if not ok:
+            return answer, False
+        return _keep_spacing(chunk, answer), True
+
+    results = await gather_limited([_rewrite_part(chunk) for chunk in chunks], load_max_concurrency())
+    for answer, ok in results:
+        if not ok:
+            return answer, False
+    return ''.join(answer for answer, _ in results), True
 
 
-def process_prompt(window, data):
+def uses_sentence_memory(prompt_data):
+    return prompt_data.get("action") in SENTENCE_MEMORY_ACTIONS and load_sentence_memory_enabled()
+
+
+async def _rewrite_sentences(window, payload, request_id, prompt_data, sentences):
+    """
+    Envia um lote de frases em JSON e retorna (frases reescritas na mesma ordem, None),
+    (None, mensagem de erro) se a chamada falhar, ou (None, None) se a resposta vier fora do formato.
+    """
+    content = json.dumps({"sentences": sentences}, ensure_ascii=False)
+    sentence_payload = {
+        "model": payload.get("model"),
+        "messages": [
+            {"role": "system", "content": prompt_data.get("system_content") + SENTENCE_MEMORY_NOTE},
+            {"role": "user", "content": content}
+        ],
+        "max_tokens": int(estimate_text_tokens(content) * 1.5) + 50,
+        "response_format": {"type": "json_object"}
+    }
+    answer, ok = await fetch_answer_cached(window, sentence_payload, request_id, prompt_data, stream=False)
+    if not ok:
+        return None, answer
+    try:
+        rewritten = json.loads(answer).get("sentences")
+    except (ValueError, AttributeError):
+        return None, None
+    if (not isinstance(rewritten, list) or len(rewritten) != len(sentences)
+            or not all(isinstance(sentence, str) for sentence in rewritten)):
+        return None, None
+    return rewritten, None
+
+
+async def rewrite_with_sentence_memory(window, payload, request_id, prompt_data):
+    """
+    Reescreve o texto frase a frase, consultando antes a memória de frases: as frases que não mudaram
+    desde a última vez vêm da memória e só as novas ou editadas são enviadas, em lotes paralelos.
+    Retorna a tupla (resposta, sucesso), ou None se a API não responder no formato esperado
+    (nesse caso o texto deve ser enviado inteiro, como de costume).
+    """
+    memory = get_sentence_memory()
+    action = prompt_data.get("action")
+    system_content = prompt_data.get("system_content")
+    units = split_sentences(prompt_data.get("user_content"))
+    parts = list(units)
+
+    # Separar as frases já conhecidas das que precisam ir para a API
+    missing = []  # (posição, frase, chave)
+    for index, unit in enumerate(units):
+        body = unit.strip()
+        if not body:
+            continue
+        key = make_sentence_key(action, payload.get("model"), system_content, body)
+        remembered = memory.get(key)
+        if remembered is None:
+            missing.append((index, body, key))
+        else:
+            parts[index] = _keep_spacing(unit, remembered)
+
+    if missing:
+        # Agrupar as frases em lotes dentro do limite de tokens
+        batches = [[]]
+        batch_tokens = 0
+        for item in missing:
+            tokens = estimate_text_tokens(item[1])
+            if batches[-1] and batch_tokens + tokens > SENTENCE_BATCH_TOKENS:
+                batches.append([])
+                batch_tokens = 0
+            batches[-1].append(item)
+            batch_tokens += tokens
+
+        results = await gather_limited(
+            [_rewrite_sentences(window, payload, request_id, prompt_data, [body for _, body, _ in batch])
+             for batch in batches],
+            load_max_concurrency()
+        )
+        learned = []
+        for batch, (rewritten, error) in zip(batches, results):
+            if error is not None:
+                return error, False
+            if rewritten is None:
+                metrics.increment("sentence_memory.fallback")
+                return None
+            for (index, _, key), sentence in zip(batch, rewritten):
+                parts[index] = _keep_spacing(units[index], sentence)
+                learned.append((key, sentence.strip()))
+        memory.put_many(learned)
+
+    return ''.join(parts), True
+
+
+async def fetch_answer_for_prompt(window, payload, request_id, prompt_data):
+    """
+    Envia o prompt de uma ação (menu lateral ou floating widget) e retorna a tupla (resposta, sucesso).
+    Textos longos de resumo ou de reescrita são processados em partes; o resultado final
+    também vai para o cache, com a mesma chave que teria a chamada única.
+    """
+    if is_long_summary(prompt_data):
+        pipeline = summarize_map_reduce
+    elif is_long_rewrite(prompt_data):
+        pipeline = rewrite_in_chunks
+    else:
+        return await fetch_answer_cached(window, payload, request_id, prompt_data)
+
+    key = cache_key_from_payload(payload)
+    use_cache = _use_cache(prompt_data)
+    if use_cache:
+        cached_answer = get_response_cache().get(key)
+        if cached_answer is not None:
+            return cached_answer, True
+
+    answer, ok = await pipeline(window, payload, request_id, prompt_data)
+    if ok and use_cache:
+        get_response_cache().put(key, answer)
+    return answer, ok
+
+
+async def process_prompt(window, data, request_id):
     """
     Processa o envio do prompt para a API do ChatGPT, incluindo a mensagem do 'system'.
+    Retorna a resposta, que é entregue pelo barramento a quem fez a requisição.
     """
     window.api_key = load_api_key()
     if not window.api_key:
-        window.response_received.emit("Erro: Chave da API não está configurada.")
-        return
+        return "Erro: Chave da API não está configurada."
 
     # Extrair os conteúdos do sistema e do usuário
     system_content = data.get("system_content")
     user_content = data.get("user_content")
 
     try:
+        # Adicionar o prompt completo ao histórico como mensagem do usuário. Isso acontece só quando a
+        # requisição começa a rodar: se ela for cancelada ainda na fila, nada fica no histórico
+        window.conversation_store.append({"role": "user", "content": user_content})
+
         # Construir as mensagens para a API, incluindo a mensagem 'system'
         messages = [
             {"role": "system", "content": system_content},
@@ -195,39 +695,32 @@ def process_prompt(window, data):
             "max_tokens": 300
         }
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {window.api_key}"
-        }
+        answer, ok = await fetch_answer_for_prompt(window, payload, request_id, data)
 
-        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
-        response_json = response.json()
-
-        if response.status_code != 200:
-            error_message = response_json.get('error', {}).get('message', 'Erro desconhecido')
-            answer = f"Erro ao consultar a API: {error_message}"
-        else:
-            answer = response_json['choices'][0]['message']['content']
+        if ok:
             # Adicionar a resposta do assistente ao histórico da conversa
-            with window.conversation_lock:
-                window.conversation_history.append({"role": "assistant", "content": answer})
+            window.conversation_store.append({"role": "assistant", "content": answer})
 
+    except asyncio.CancelledError:
+        _remove_user_message(window, user_content)
+        raise
     except Exception as e:
         answer = f"Erro ao consultar a API: {e}"
 
-    window.response_received.emit(answer)
+    return answer
 
 #Chamada da api para a sidebar e para o chat
-def process_question(window, question):
+async def process_question(window, data, request_id):
     """
-    Processa a pergunta enviada pelo usuário, incluindo o tratamento de imagens e o histórico da conversa.
+    Processa a pergunta enviada pelo usuário ('data' = (texto, referência da imagem capturada ou None)),
+    incluindo o tratamento de imagens e o histórico da conversa.
+    Retorna a resposta, que é entregue pelo barramento a quem fez a requisição.
     """
+    question, image_part = data
     window.api_key = load_api_key()
     if not window.api_key:
-        # Emitir sinal para mostrar mensagem de erro na thread principal
-        window.response_received.emit("Erro: Chave da API não está configurada.")
-        window.send_button.setEnabled(True)
-        return
+        # A mensagem de erro é exibida na thread principal, que também reabilita o botão "Enviar"
+        return "Erro: Chave da API não está configurada."
 
     try:
         # Construir o conteúdo da mensagem do usuário
@@ -240,101 +733,172 @@ def process_question(window, question):
             })
 
         # Verificar se há uma imagem capturada
-        if hasattr(window, 'image_data_base64'):
-            base64_image = window.image_data_base64
-            content_list.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/png;base64,{base64_image}"
-                }
-            })
-            # Limpar a imagem após o envio
-            del window.image_data_base64
-            del window.captured_image
+        if image_part is not None:
+            # O histórico guarda só a referência; a data URL é montada no envio
+            content_list.append(image_part)
 
         if not content_list:
-            answer = "Nenhuma mensagem ou imagem para enviar."
-            # Emitir o sinal com a resposta
-            window.response_received.emit(answer)
-            return
+            return "Nenhuma mensagem ou imagem para enviar."
 
         # Adicionar a mensagem do usuário ao histórico da conversa
-        with window.conversation_lock:
-            window.conversation_history.append({
-                "role": "user",
-                "content": content_list  # 'content' pode incluir texto e imagens
-            })
-
-        # Obter as mensagens a serem enviadas
-        messages = get_messages_to_send(window)
-
-        # Construir o payload para a API
-        payload = {
-            "model": "gpt-4o-mini",  # Certifique-se de que o modelo está correto
-            "messages": messages,
-            "max_tokens": 300
-        }
+        window.conversation_store.append({
+            "role": "user",
+            "content": content_list  # 'content' pode incluir texto e imagens
+        })
 
-        # Construir os headers da requisição
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {window.api_key}"
-        }
+        # Mensagens a serem enviadas (a última é a pergunta; as anteriores, o contexto)
+        messages_to_send = get_messages_to_send(window)
 
-        # Enviar a requisição para a API
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        #debug
-        # print("Payload: ", payload)
-        response_json = response.json()
+        # A mesma pergunta, no mesmo contexto, sobre a mesma captura é respondida pelo cache de imagens
+        model = "gpt-4o-mini"  # Certifique-se de que o modelo está correto
+        vision_key = vision_cache_key(model, content_list, messages_to_send[:-1])
+        cached = get_vision_cache().get(*vision_key, load_vision_cache_distance()) if vision_key else None
 
-        if response.status_code != 200:
-            # Obter a mensagem de erro da resposta
-            error_message = response_json.get('error', {}).get('message', 'Erro desconhecido')
-            answer = f"Erro ao consultar a API: {error_message}"
+        if cached is not None:
+            answer, ok = cached, True
         else:
-            # Obter a resposta do assistente
-            answer = response_json['choices'][0]['message']['content']
-
+            # Converter as imagens das mensagens em data URLs
+            messages = materialize_images(messages_to_send)
+
+            # Construir o payload para a API
+            payload = {
+                "model": model,
+                "messages": messages,
+                "max_tokens": 300
+            }
+
+            # Enviar a requisição para a API
+            answer, ok = await fetch_answer(window, payload, request_id)
+            #debug
+            # print("Payload: ", payload)
+            if ok and vision_key:
+                get_vision_cache().put(*vision_key, answer)
+
+        if ok:
             # Adicionar a resposta do assistente ao histórico da conversa
-            with window.conversation_lock:
-                window.conversation_history.append({
-                    "role": "assistant",
-                    "content": answer  # A resposta do assistente é uma string
-                })
-
+            window.conversation_store.append({
+                "role": "assistant",
+                "content": answer  # A resposta do assistente é uma string
+            })
 
+    except asyncio.CancelledError:
+        _remove_user_message(window, content_list)
+        raise
     except Exception as e:
         answer = f"Erro ao consultar a API: {e}"
 
     #Debug - print do historico de conversas
-    # debug_conversation(window.conversation_history)
-    # Emitir o sinal com a resposta para atualizar a interface
-    window.response_received.emit(answer)
+    # debug_conversation(window.conversation_store.messages())
+    # A resposta é entregue pelo barramento para atualizar a interface
+    return answer
 
 
 #definicoes da floating widget
-def floating_widget_action(window, data):
+def floating_widget_payload(system_content, user_content):
+    """
+    Payload das ações do floating widget, com mensagens 'system' e 'user'.
+    """
+    return {
+        "model": "gpt-4o-mini",  # Certifique-se de que o modelo está correto
+        "messages": [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": user_content}
+        ],
+        "max_tokens": 300
+    }
+
+
+async def fetch_floating_widget_answer(window, payload, request_id, prompt_data):
+    """
+    Retorna a tupla (resposta, sucesso) de uma ação do floating widget.
+    """
+    # Frases que não mudaram desde o último envio vêm da memória de frases
+    result = None
+    if uses_sentence_memory(prompt_data):
+        result = await rewrite_with_sentence_memory(window, payload, request_id, prompt_data)
+    # Enviar a requisição para a API
+    if result is None:
+        result = await fetch_answer_for_prompt(window, payload, request_id, prompt_data)
+    return result
+
+
+def speculate_action(window, text):
+    """
+    Antecipa em segundo plano a ação mais usada do floating widget para o texto recém-copiado.
+    A requisição passa pelo agendador de limites na prioridade de segundo plano, então nunca
+    atrasa as requisições do usuário. Retorna a ação antecipada, ou None se não valer a pena.
+    """
+    store = get_speculation_store()
+    if not store.should_speculate(text) or not load_api_key():
+        return None
+    action = store.predicted_action()
+    prompt_data = dict(build_action_prompt(action, text), action=action)
+    store.start(action, text, lambda entry: submit_request(
+        process_speculation(window, prompt_data, entry),
+        name="speculation", priority=PRIORITY_BACKGROUND
+    ))
+    return action
+
+
+async def process_speculation(window, prompt_data, entry):
+    """
+    Calcula a resposta antecipada exatamente como o clique calcularia (mesmo payload, cache e memória de frases).
+    Nada vai para o histórico nem para a interface: o ID da requisição não está registrado no barramento.
+    """
+    window.api_key = load_api_key()
+    payload = floating_widget_payload(prompt_data["system_content"], prompt_data["user_content"])
+    get_speculation_store().mark_started(entry, estimate_payload_tokens(payload))
+    answer, ok = await fetch_floating_widget_answer(window, payload, f"speculation-{entry['hash']}", prompt_data)
+    if ok:
+        get_speculation_store().add_cost(entry, estimate_text_tokens(answer))
+    return answer, ok
+
+
+async def take_speculation(prompt_data):
+    """
+    Retorna a tupla (resposta, sucesso) da antecipação desta ação para o mesmo texto, esperando
+    se ela ainda estiver em andamento, ou None se não houver (ou se ela tiver falhado).
+    """
+    future = get_speculation_store().claim(prompt_data.get("action"), prompt_data.get("user_content") or "")
+    if future is None:
+        return None
+    # shield: cancelar esta requisição não cancela a antecipação, e dá para saber qual das duas foi cancelada
+    speculation = asyncio.wrap_future(future)
+    try:
+        answer, ok = await asyncio.shield(speculation)
+    except asyncio.CancelledError:
+        if speculation.cancelled():
+            # A antecipação foi cancelada (não esta requisição): segue pelo caminho normal
+            return None
+        raise
+    except Exception:
+        return None
+    return (answer, ok) if ok else None
+
+
+def floating_widget_action(window, data, on_response):
     """
     Recebe os dados do botão clicado no floating widget e processa a requisição.
+    Retorna o ID da requisição (ou None se a ação não existir); a resposta é entregue em 'on_response'.
     """
     action, prompt, copied_text = data
+    prompt = dict(prompt, action=action)  # A ação acompanha o prompt (usada pelo cache)
     if action in ['casual', 'professional', 'concise', 'review', 'rewrite', 'keypoints', 'summarize']:
-        threading.Thread(target=process_prompt_floating_widget, args=(window, prompt), daemon=True).start()
+        return start_request(
+            process_prompt_floating_widget, window, prompt, on_response,
+            name="floating_widget", priority=PRIORITY_INTERACTIVE
+        )
     else:
         print(f"Ação '{action}' não está implementada.")
+        return None
 
-def process_prompt_floating_widget(window, prompt_data):
+async def process_prompt_floating_widget(window, prompt_data, request_id):
     """
-    Envia o prompt para a API do ChatGPT e emite a resposta através de sinais.
+    Envia o prompt para a API do ChatGPT e retorna a resposta, que é entregue pelo barramento.
     """
     window.api_key = load_api_key()
     if not window.api_key:
-        window.response_received.emit("Erro: Chave da API não está configurada.")
-        return
+        return "Erro: Chave da API não está configurada."
 
     try:
         # Extrair os conteúdos do sistema e do usuário
@@ -342,58 +906,37 @@ def process_prompt_floating_widget(window, prompt_data):
         user_content = prompt_data.get("user_content")
 
         # Adicionar a mensagem do usuário ao histórico
-        with window.conversation_lock:
-            window.conversation_history.append({
-                "role": "user",
-                "content": user_content
-            })
+        window.conversation_store.append({
+            "role": "user",
+            "content": user_content
+        })
 
         # Configurar o payload para a API com mensagens 'system' e 'user'
-        payload = {
-            "model": "gpt-4o-mini",  # Certifique-se de que o modelo está correto
-            "messages": [
-                {"role": "system", "content": system_content},
-                {"role": "user", "content": user_content}
-            ],
-            "max_tokens": 300
-        }
+        payload = floating_widget_payload(system_content, user_content)
         #debug
         # print("Payload: ", payload)
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {window.api_key}"
-        }
 
-        # Enviar a requisição para a API
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
+        # Se a ação já foi antecipada para este texto, a resposta vem de lá
+        result = await take_speculation(prompt_data)
+        if result is None:
+            result = await fetch_floating_widget_answer(window, payload, request_id, prompt_data)
+        answer, ok = result
         #Debug
         # debug_print_payload_messages(payload)
 
-
-        response_json = response.json()
-
-        if response.status_code != 200:
-            # Obter a mensagem de erro da resposta
-            error_message = response_json.get('error', {}).get('message', 'Erro desconhecido')
-            answer = f"Erro ao consultar a API: {error_message}"
-        else:
-            # Obter a resposta do assistente
-            answer = response_json['choices'][0]['message']['content']
-
+        if ok:
             # Adicionar a resposta do assistente ao histórico da conversa
-            with window.conversation_lock:
-                window.conversation_history.append({
-                    "role": "assistant",
-                    "content": answer
-                })
+            window.conversation_store.append({
+                "role": "assistant",
+                "content": answer
+            })
 
+    except asyncio.CancelledError:
+        _remove_user_message(window, prompt_data.get("user_content"))
+        raise
     except Exception as e:
         answer = f"Erro ao consultar a API: {e}"
 
-    # Emitir o sinal com a resposta para atualizar a interface
-    window.response_received.emit(answer)
+    # A resposta é entregue pelo barramento para atualizar a interface
+    return answer
 
@@ -0,0 +1,97 @@
+# app/utils/clipboard_capture.py
+
+import time
+from PyQt5.QtCore import QEventLoop, QTimer
+from app.utils import metrics
+from app.platform.backend import get_backend
+
+# Limites do tempo de espera pela cópia (em milissegundos)
+DEFAULT_TIMEOUT_MS = 300
+MIN_TIMEOUT_MS = 80
+MAX_TIMEOUT_MS = 1500
+# Intervalo da verificação do número de sequência do clipboard
+POLL_INTERVAL_MS = 10
+# Peso da nova medição na média móvel de cada aplicativo
+SMOOTHING = 0.25
+
+
+class CopyTimeouts:
+    """
+    Aprende, por aplicativo de origem, quanto tempo a cópia (Ctrl+C) costuma levar e calcula
+    o tempo de espera: média + 4 desvios, dentro dos limites. Aplicativos lentos ganham mais
+    tempo e os rápidos não pagam uma espera fixa.
+    """
+
+    def __init__(self):
+        self._stats = {}  # aplicativo -> (média, desvio) em ms
+
+    def timeout_for(self, app):
+        stats = self._stats.get(app)
+        if stats is None:
+            return DEFAULT_TIMEOUT_MS
+        average, deviation = stats
+        return int(min(MAX_TIMEOUT_MS, max(MIN_TIMEOUT_MS, average + 4 * deviation)))
+
+    def record(self, app, elapsed_ms):
+        """
+        Registra quanto tempo a cópia levou no aplicativo.
+        """
+        stats = self._stats.get(app)
+        if stats is None:
+            self._stats[app] = (elapsed_ms, elapsed_ms / 2)
+            return
+        average, deviation = stats
+        deviation += SMOOTHING * (abs(elapsed_ms - average) - deviation)
+        average += SMOOTHING * (elapsed_ms - average)
+        self._stats[app] = (average, deviation)
+
+    def record_timeout(self, app, timeout_ms):
+        """
+        A cópia não chegou a tempo (aplicativo lento ou nada selecionado): espera um pouco mais da próxima vez.
+        """
+        average, deviation = self._stats.get(app, (DEFAULT_TIMEOUT_MS / 2, DEFAULT_TIMEOUT_MS / 8))
+        self._stats[app] = (max(average, timeout_ms * 0.5), max(deviation, timeout_ms * 0.2))
+
+
+def wait_for_clipboard_change(clipboard, sequence_before, timeout_ms):
+    """
+    Aguarda (sem bloquear a interface) até o clipboard mudar ou o tempo acabar.
+    A mudança é detectada pelo sinal dataChanged do Qt e, quando disponível, pelo número
+    de sequência do clipboard informado pelo backend da plataforma. Retorna (mudou, tempo em ms).
+    """
+    started = time.perf_counter()
+    loop = QEventLoop()
+    state = {"changed": False}
+
+    def _check():
+        # O aplicativo esvazia o clipboard antes de gravar: só conta quando o texto já está lá
+        if state["changed"]:
+            return
+        if sequence_before is not None and get_backend().clipboard_sequence_number() == sequence_before:
+            return
+        if clipboard.text():
+            state["changed"] = True
+            loop.quit()
+
+    clipboard.dataChanged.connect(_check)
+    poll_timer = QTimer()
+    if sequence_before is not None:
+        poll_timer.timeout.connect(_check)
+        poll_timer.start(POLL_INTERVAL_MS)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    _check()
+    if not state["changed"]:
+        loop.exec_()
+    poll_timer.stop()
+    clipboard.dataChanged.disconnect(_check)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    metrics.record_latency("clipboard.copy", elapsed_ms / 1000)
+    return state["changed"], elapsed_ms
+
+
+_timeouts = CopyTimeouts()
+
+
+def get_copy_timeouts():
+    return _timeouts
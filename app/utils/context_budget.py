@@ -0,0 +1,140 @@
+# app/utils/context_budget.py
+
+from app.utils.tokens import (
+    estimate_message_tokens, estimate_text_tokens, CHARS_PER_TOKEN, MESSAGE_OVERHEAD, IMAGE_TOKENS
+)
+
+# Texto que substitui as imagens de mensagens antigas no contexto
+OMITTED_IMAGE_TEXT = "[imagem enviada anteriormente]"
+# Marcador colocado no lugar do trecho cortado de mensagens grandes demais
+OMITTED_TEXT_MARK = "\n[...] (trecho omitido)\n"
+# Abaixo disso não vale a pena encurtar uma mensagem antiga para caber no contexto
+MIN_MESSAGE_TOKENS = 64
+# Início da mensagem de sistema com o resumo das conversas antigas
+CONVERSATION_SUMMARY_PREFIX = "Resumo da conversa anterior com o usuário (mensagens antigas que não estão abaixo):\n"
+
+
+def summary_message(summary_text):
+    """
+    Monta a mensagem de sistema sintética que leva o resumo das conversas antigas para a API.
+    """
+    return {"role": "system", "content": CONVERSATION_SUMMARY_PREFIX + summary_text}
+
+
+def truncate_text(text, max_tokens):
+    """
+    Encurta o texto para caber em 'max_tokens', mantendo o início e o fim e cortando o meio.
+    """
+    if estimate_text_tokens(text) <= max_tokens:
+        return text
+    keep = max(0, int((max_tokens - estimate_text_tokens(OMITTED_TEXT_MARK) - 1) * CHARS_PER_TOKEN))
+    head = text[:keep * 2 // 3]
+    tail = text[len(text) - keep // 3:] if keep // 3 else ""
+    return head + OMITTED_TEXT_MARK + tail
+
+
+def without_images(message):
+    """
+    Troca as imagens da mensagem por um texto curto (imagens antigas não voltam para a API).
+    """
+    content = message.get("content")
+    if isinstance(content, str) or not any(part.get("type") != "text" for part in content or []):
+        return message
+    parts = [
+        part if part.get("type") == "text" else {"type": "text", "text": OMITTED_IMAGE_TEXT}
+        for part in content
+    ]
+    return dict(message, content=parts)
+
+
+def shrink_message(message, max_tokens):
+    """
+    Reduz a mensagem para caber em 'max_tokens', cortando o meio dos textos. Imagens são mantidas.
+    """
+    if estimate_message_tokens(message) <= max_tokens:
+        return message
+    content = message.get("content")
+    available = max_tokens - MESSAGE_OVERHEAD
+    if isinstance(content, str):
+        return dict(message, content=truncate_text(content, available))
+
+    text_indexes = []
+    for index, part in enumerate(content):
+        if part.get("type") == "text":
+            text_indexes.append(index)
+        else:
+            detail = part.get(part.get("type"), {}).get("detail", "auto")
+            available -= IMAGE_TOKENS.get(detail, IMAGE_TOKENS["auto"])
+
+    # Dividir o espaço entre os textos: os menores ficam inteiros e os maiores dividem o resto
+    text_indexes.sort(key=lambda index: estimate_text_tokens(content[index].get("text", "")))
+    left = max(0, available)
+    limits = {}
+    for position, index in enumerate(text_indexes):
+        share = left // (len(text_indexes) - position)
+        limits[index] = min(estimate_text_tokens(content[index].get("text", "")), share)
+        left -= limits[index]
+
+    parts = [
+        dict(part, text=truncate_text(part.get("text", ""), limits[index])) if index in limits else part
+        for index, part in enumerate(content)
+    ]
+    return dict(message, content=parts)
+
+
+def select_context(conversation, budget, max_pairs):
+    """
+    Escolhe as mensagens do histórico que vão para a API dentro de um orçamento de tokens.
+    A última mensagem do usuário (ainda sem resposta) sempre entra; depois entram os pares
+    usuário/assistente mais recentes primeiro, até 'max_pairs' pares ou até o orçamento acabar.
+    Mensagens antigas perdem as imagens e, se forem grandes demais, são encurtadas.
+    Retorna as mensagens em ordem cronológica.
+    """
+    messages = []
+    used = 0
+    index = len(conversation) - 1
+
+    # Incluir a última mensagem do usuário que ainda não foi respondida
+    if index >= 0 and conversation[index]['role'] == 'user':
+        latest = shrink_message(conversation[index], budget)
+        messages.append(latest)
+        used += estimate_message_tokens(latest)
+        index -= 1
+
+    pairs_collected = 0
+    while index >= 0 and pairs_collected < max_pairs:
+        # Coletar a mensagem do assistente
+        if conversation[index]['role'] != 'assistant':
+            index -= 1
+            continue
+        assistant_message = conversation[index]
+        index -= 1
+
+        # Coletar a mensagem do usuário
+        if index < 0 or conversation[index]['role'] != 'user':
+            break
+        user_message = conversation[index]
+        index -= 1
+
+        pair = [without_images(assistant_message), without_images(user_message)]
+        cost = sum(estimate_message_tokens(message) for message in pair)
+        remaining = budget - used
+        if cost > remaining:
+            # Par grande demais: encurtar para caber no que resta, se ainda valer a pena
+            if remaining < 2 * MIN_MESSAGE_TOKENS:
+                break
+            # A menor das duas fica inteira se couber; a maior fica com o resto
+            small, large = sorted(range(2), key=lambda position: estimate_message_tokens(pair[position]))
+            pair[small] = shrink_message(pair[small], remaining // 2)
+            pair[large] = shrink_message(pair[large], remaining - estimate_message_tokens(pair[small]))
+            cost = sum(estimate_message_tokens(message) for message in pair)
+            if cost > remaining:
+                break
+
+        messages.extend(pair)
+        used += cost
+        pairs_collected += 1
+
+    # Reverter a lista para restaurar a ordem cronológica
+    messages.reverse()
+    return messages
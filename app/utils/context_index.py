@@ -0,0 +1,140 @@
+# app/utils/context_index.py
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+# Parâmetros usuais do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r'\w+')
+# Palavras muito comuns que não ajudam a encontrar conversas relacionadas
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de do da dos das em no na nos nas por pelo pela pelos pelas para pra
+com sem sob sobre entre ate e ou mas se que como quando onde qual quais quem porque pois entao
+eu tu ele ela nos vos eles elas voce voces me te lhe nos seu sua seus suas meu minha meus minhas
+este esta estes estas esse essa esses essas isto isso aquilo aquele aquela ao aos
+ser estar ter haver foi era sao esta estao tem tinha fazer faz pode posso mais menos muito ja nao sim
+the of and to in is it for on that this with be are was what how
+""".split())
+
+
+def tokenize(text):
+    """
+    Converte o texto em termos para o índice: minúsculas, sem acentos e sem palavras muito comuns.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [word for word in _WORD.findall(text) if len(word) > 1 and word not in STOPWORDS]
+
+
+def message_text(message):
+    """
+    Retorna apenas o texto de uma mensagem do histórico (as imagens são ignoradas).
+    """
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get("text", "") for part in content or [] if part.get("type") == "text")
+
+
+class ConversationIndex:
+    """
+    Índice BM25 em memória sobre os pares de conversa de toda a sessão atual, inclusive os que já
+    foram resumidos ou saíram da memória (lidos do ConversationStore).
+    É atualizado de forma incremental: a cada consulta, só as mensagens gravadas depois da última
+    indexada são lidas; o índice só é refeito quando uma nova sessão começa (chat limpo).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, session_id):
+        self._session_id = session_id
+        self._last_id = 0
+        self._pending_user = None  # Última mensagem do usuário ainda sem resposta
+        self._pairs = []
+        self._documents = []  # Counter de termos de cada par
+        self._lengths = []
+        self._document_frequency = Counter()
+        self._total_length = 0
+
+    def _add(self, pair):
+        terms = Counter(tokenize(message_text(pair[0]) + "\n" + message_text(pair[1])))
+        self._pairs.append(pair)
+        self._documents.append(terms)
+        self._lengths.append(sum(terms.values()))
+        self._document_frequency.update(terms.keys())
+        self._total_length += self._lengths[-1]
+
+    def _sync(self, store):
+        session_id, messages = store.messages_since(self._last_id, self._session_id)
+        if session_id != self._session_id:
+            self._reset(session_id)
+        for message_id, message in messages:
+            self._last_id = message_id
+            if message["role"] == "user":
+                self._pending_user = message
+            elif message["role"] == "assistant" and self._pending_user is not None:
+                self._add((self._pending_user, message))
+                self._pending_user = None
+
+    def _score(self, document, length, query_terms, average_length):
+        count = len(self._documents)
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term)
+            if not frequency:
+                continue
+            df = self._document_frequency[term]
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            norm = frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+            score += idf * frequency * (BM25_K1 + 1) / norm
+        return score
+
+    def relevant_pairs(self, store, query, limit):
+        """
+        Atualiza o índice com as mensagens novas do histórico e retorna (pares relevantes, último par):
+        até 'limit' pares anteriores ao último mais relevantes para 'query', em ordem cronológica,
+        e o par mais recente (que não entra no ranking). Sem pares, retorna ([], None).
+        """
+        query_terms = set(tokenize(query))
+        with self._lock:
+            self._sync(store)
+            if not self._pairs:
+                return [], None
+            last_pair = self._pairs[-1]
+            candidates = len(self._pairs) - 1
+            if limit <= 0 or candidates <= 0 or not query_terms:
+                return [], last_pair
+            average_length = max(1.0, self._total_length / len(self._documents))
+            scored = []
+            for position in range(candidates):
+                score = self._score(self._documents[position], self._lengths[position], query_terms, average_length)
+                if score > 0:
+                    scored.append((score, position))
+            # Empate: a conversa mais recente ganha
+            scored.sort(key=lambda item: (-item[0], -item[1]))
+            chosen = sorted(position for _, position in scored[:limit])
+            return [self._pairs[position] for position in chosen], last_pair
+
+
+def relevant_context(index, store, conversation, max_pairs):
+    """
+    Monta um histórico reduzido com os pares de toda a sessão mais relevantes para a última pergunta
+    do usuário (inclusive os já resumidos), mais o último par e a própria pergunta, em ordem cronológica
+    (pronto para select_context). Sem pergunta pendente, retorna o histórico sem mudanças.
+    """
+    if not conversation or conversation[-1]["role"] != "user" or max_pairs <= 0:
+        return conversation
+    question = conversation[-1]
+    selected, last_pair = index.relevant_pairs(store, message_text(question), max_pairs - 1)
+    if last_pair is None:
+        return conversation
+    selected.append(last_pair)
+    messages = [message for pair in selected for message in pair]
+    messages.append(question)
+    return messages
@@ -0,0 +1,104 @@
+# app/utils/conversation_compactor.py
+
+from app.utils.settings import load_api_key, load_context_setting, load_context_summary_enabled, load_max_context
+from app.utils.context_budget import truncate_text
+from app.utils.request_engine import submit_request, PRIORITY_BACKGROUND
+from app.utils.api_calls import fetch_answer
+
+# Só resume quando houver pelo menos esta quantidade de mensagens antigas ainda fora do resumo
+COMPACT_MIN_MESSAGES = 4
+# Limite de cada mensagem antiga enviada para o resumo
+COMPACT_MESSAGE_TOKENS = 1500
+# Limite do resumo gerado
+SUMMARY_MAX_TOKENS = 400
+
+COMPACT_PROMPT = """Você mantém o resumo de uma conversa entre um usuário e uma assistente.
+Atualize o resumo atual incluindo as novas mensagens. Preserve fatos, nomes, números, decisões,
+preferências do usuário e pendências; descarte cumprimentos e repetições.
+Responda apenas com o resumo atualizado, em no máximo 200 palavras."""
+
+# Evita duas compactações simultâneas (usado apenas dentro do loop do engine)
+_compacting = set()
+
+
+def _message_text(message):
+    """
+    Converte uma mensagem do histórico em texto simples para o resumo (imagens viram um marcador).
+    """
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+    return " ".join(
+        part.get("text", "") if part.get("type") == "text" else "[imagem]"
+        for part in content or []
+    )
+
+
+async def compact_conversation(window):
+    """
+    Resume as conversas antigas que já saíram da janela de contexto, junto com o resumo anterior,
+    em um único resumo que get_messages_to_send envia como mensagem de sistema.
+    As últimas conversas (a janela de 'Manter contexto') continuam sendo enviadas na íntegra.
+    """
+    if id(window) in _compacting:
+        return
+    keep = 2 * load_max_context()
+
+    # As posições são contadas desde o início da sessão. O trecho ainda não resumido é lido do
+    # ConversationStore (e não só da memória): mensagens que já saíram da memória também entram no resumo
+    summary = window.conversation_summary
+    covered = summary["covered"] if summary else 0
+    session_id, items = window.conversation_store.messages_since(
+        summary["last_id"] if summary else 0, summary["session"] if summary else None
+    )
+    if summary and session_id != summary["session"]:
+        return
+    end = covered + len(items) - keep
+    # O trecho resumido termina sempre em uma resposta da assistente, sem cortar um par ao meio
+    while end > covered and items[end - 1 - covered][1]["role"] != "assistant":
+        end -= 1
+    if end - covered < COMPACT_MIN_MESSAGES:
+        return
+    pending = [message for _, message in items[:end - covered]]
+    last_id = items[end - 1 - covered][0]
+
+    api_key = load_api_key()
+    if not api_key:
+        return
+    window.api_key = api_key
+
+    lines = []
+    for message in pending:
+        speaker = "Usuário" if message["role"] == "user" else "Assistente"
+        lines.append(f"{speaker}: {truncate_text(_message_text(message), COMPACT_MESSAGE_TOKENS)}")
+    current_summary = summary["text"] if summary else "(vazio)"
+    payload = {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": COMPACT_PROMPT},
+            {"role": "user", "content": f"Resumo atual:\n{current_summary}\n\nNovas mensagens:\n" + "\n\n".join(lines)}
+        ],
+        "max_tokens": SUMMARY_MAX_TOKENS
+    }
+
+    _compacting.add(id(window))
+    try:
+        answer, ok = await fetch_answer(window, payload, "", stream=False)
+    finally:
+        _compacting.discard(id(window))
+    if not ok:
+        print(f"Não foi possível resumir a conversa: {answer}")
+        return
+
+    # Descartar o resumo se o chat foi limpo ou outro resumo foi gravado enquanto a API respondia
+    if window.conversation_summary is summary and window.conversation_store.session_id == session_id:
+        window.conversation_summary = {"text": answer.strip(), "covered": end, "last_id": last_id,
+                                       "session": session_id}
+
+
+def schedule_compaction(window):
+    """
+    Agenda a compactação do histórico em segundo plano, se o contexto e o resumo estiverem ativados.
+    """
+    if load_context_setting() and load_context_summary_enabled():
+        submit_request(compact_conversation(window), name="compaction", priority=PRIORITY_BACKGROUND)
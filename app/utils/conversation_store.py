@@ -0,0 +1,224 @@
+# app/utils/conversation_store.py
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from app.utils.settings import app_data_dir
+
+# Mensagens da sessão atual mantidas em memória; as mais antigas ficam só no banco
+MEMORY_TAIL = 200
+# Quantas mensagens saem da memória de uma vez (evita reconstruir o índice a cada mensagem)
+EVICT_BATCH = 50
+# Mensagens carregadas por vez ao rolar o chat para cima
+PAGE_SIZE = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages(session_id, id);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def message_text(content):
+    """
+    Texto pesquisável de uma mensagem: o próprio texto ou as partes de texto (imagens viram um marcador).
+    """
+    if isinstance(content, str):
+        return content
+    return " ".join(
+        part.get("text", "") if part.get("type") == "text" else "[Imagem]"
+        for part in content or []
+    )
+
+
+def _fts_query(query):
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada palavra vira um termo entre aspas.
+    """
+    words = [word.replace('"', '') for word in query.split()]
+    return " ".join(f'"{word}"' for word in words if word)
+
+
+class ConversationStore:
+    """
+    Histórico de conversas persistido em SQLite (modo WAL), com índice FTS5 sobre o texto.
+    Cada execução do aplicativo (ou limpeza do chat) é uma sessão; só o fim da sessão atual
+    fica em memória. As sessões antigas são lidas sob demanda (paginação e busca).
+    Todos os métodos podem ser chamados de qualquer thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        try:
+            self._connection.executescript(_FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite sem FTS5: a busca cai para LIKE
+            self.has_fts = False
+        self._tail = []      # [(id, mensagem)] da sessão atual em memória
+        self._offset = 0     # Mensagens da sessão atual que já saíram da memória
+        self.session_id = self._new_session()
+
+    def _new_session(self):
+        with self._connection:
+            cursor = self._connection.execute("INSERT INTO sessions(started) VALUES (?)", (time.time(),))
+        return cursor.lastrowid
+
+    def append(self, message):
+        """
+        Adiciona uma mensagem ({"role", "content"}) à sessão atual e retorna o seu ID.
+        """
+        content = message["content"]
+        with self._lock:
+            with self._connection:
+                cursor = self._connection.execute(
+                    "INSERT INTO messages(session_id, role, content, text, created) VALUES (?, ?, ?, ?, ?)",
+                    (self.session_id, message["role"], json.dumps(content, ensure_ascii=False),
+                     message_text(content), time.time())
+                )
+            self._tail.append((cursor.lastrowid, message))
+            if len(self._tail) > MEMORY_TAIL + EVICT_BATCH:
+                evicted = len(self._tail) - MEMORY_TAIL
+                del self._tail[:evicted]
+                self._offset += evicted
+            return cursor.lastrowid
+
+    def messages(self):
+        """
+        Retorna uma cópia das mensagens da sessão atual que estão em memória, em ordem cronológica.
+        """
+        with self._lock:
+            return [message for _, message in self._tail]
+
+    def snapshot(self):
+        """
+        Retorna (offset, mensagens): 'offset' é a posição na sessão da primeira mensagem em memória.
+        """
+        with self._lock:
+            return self._offset, [message for _, message in self._tail]
+
+    def messages_since(self, after_id, session_id=None):
+        """
+        Retorna (ID da sessão atual, [(id, mensagem)]) com as mensagens da sessão atual posteriores
+        a 'after_id', inclusive as que já saíram da memória. Se 'session_id' não for a sessão atual
+        (o chat foi limpo), retorna todas as mensagens da sessão atual.
+        """
+        with self._lock:
+            if session_id != self.session_id:
+                after_id = 0
+            if self._offset == 0 or (self._tail and after_id >= self._tail[0][0]):
+                return self.session_id, [(message_id, message) for message_id, message in self._tail
+                                         if message_id > after_id]
+            rows = self._connection.execute(
+                "SELECT id, role, content FROM messages WHERE session_id = ? AND id > ? ORDER BY id",
+                (self.session_id, after_id)
+            ).fetchall()
+            return self.session_id, [
+                (row[0], {"role": row[1], "content": json.loads(row[2])}) for row in rows
+            ]
+
+    def remove_last(self, role, content):
+        """
+        Remove a última mensagem da sessão com o papel e o conteúdo informados. Retorna se encontrou.
+        """
+        with self._lock:
+            for index in range(len(self._tail) - 1, -1, -1):
+                message_id, message = self._tail[index]
+                if message["role"] == role and message["content"] == content:
+                    del self._tail[index]
+                    with self._connection:
+                        self._connection.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+                    return True
+            return False
+
+    def clear(self):
+        """
+        Começa uma nova sessão vazia. As mensagens anteriores continuam no banco para busca e paginação.
+        """
+        with self._lock:
+            self._tail = []
+            self._offset = 0
+            self.session_id = self._new_session()
+
+    def load_before(self, before_id=None, limit=PAGE_SIZE):
+        """
+        Lê até 'limit' mensagens de sessões anteriores à atual, anteriores à mensagem 'before_id'
+        (ou as últimas, se None). Retorna dicionários {id, session_id, role, text, created} em ordem cronológica.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, session_id, role, text, created FROM messages "
+                "WHERE session_id < ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (self.session_id, before_id if before_id is not None else 2 ** 62, limit)
+            ).fetchall()
+        rows.reverse()
+        return [
+            {"id": row[0], "session_id": row[1], "role": row[2], "text": row[3], "created": row[4]}
+            for row in rows
+        ]
+
+    def search(self, query, limit=20):
+        """
+        Busca no texto de todas as mensagens já gravadas. Retorna dicionários
+        {id, session_id, role, text, created}, dos mais relevantes para os menos.
+        """
+        if not query.strip():
+            return []
+        with self._lock:
+            if self.has_fts:
+                rows = self._connection.execute(
+                    "SELECT m.id, m.session_id, m.role, snippet(messages_fts, 0, '', '', '…', 16), m.created "
+                    "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+                    "WHERE messages_fts MATCH ? ORDER BY bm25(messages_fts) LIMIT ?",
+                    (_fts_query(query), limit)
+                ).fetchall()
+            else:
+                rows = self._connection.execute(
+                    "SELECT id, session_id, role, text, created FROM messages "
+                    "WHERE text LIKE ? ORDER BY id DESC LIMIT ?",
+                    (f"%{query.strip()}%", limit)
+                ).fetchall()
+        return [
+            {"id": row[0], "session_id": row[1], "role": row[2], "text": row[3], "created": row[4]}
+            for row in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def open_conversation_store():
+    """
+    Abre o histórico de conversas no diretório de dados do aplicativo.
+    """
+    return ConversationStore(os.path.join(app_data_dir(), "conversations.db"))
@@ -0,0 +1,63 @@
+# app/utils/deferred_writer.py
+
+import os
+import json
+import threading
+
+# Espera (segundos) antes de gravar, para juntar várias alterações seguidas em uma só gravação
+DEFAULT_DELAY = 1.0
+
+
+class DeferredJsonWriter:
+    """
+    Grava um arquivo JSON fora da thread de quem chama (em especial, fora do loop do engine).
+    Várias chamadas a schedule() dentro de 'delay' segundos resultam em uma única gravação.
+    'snapshot' é chamado na hora de gravar e deve retornar uma cópia dos dados (tirada sob o lock do dono).
+    A gravação pendente não é perdida ao fechar o aplicativo: a thread do timer não é daemon.
+    """
+
+    def __init__(self, path, snapshot, description, delay=DEFAULT_DELAY):
+        self.path = path
+        self.snapshot = snapshot
+        self.description = description
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # flush() e o timer nunca gravam ao mesmo tempo
+        self._timer = None
+
+    def schedule(self):
+        """
+        Agenda a gravação do arquivo (se ainda não houver uma agendada).
+        """
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.delay, self._run)
+            self._timer.name = f"DeferredJsonWriter({os.path.basename(self.path)})"
+            self._timer.start()
+
+    def flush(self):
+        """
+        Grava imediatamente se houver uma gravação pendente.
+        """
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+            self._write()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+        self._write()
+
+    def _write(self):
+        with self._write_lock:
+            data = self.snapshot()
+            temp_path = f"{self.path}.tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                print(f"Erro ao gravar {self.description}: {e}")
@@ -0,0 +1,108 @@
+# app/utils/http_client.py
+
+import json
+import httpx
+from app.utils.settings import load_pool_size
+
+# Endereços da API da OpenAI
+API_BASE_URL = "https://api.openai.com/v1"
+CHAT_COMPLETIONS_URL = f"{API_BASE_URL}/chat/completions"
+
+# Tempo que uma conexão ociosa permanece aberta no pool (segundos)
+KEEPALIVE_EXPIRY = 120.0
+
+# Cliente compartilhado - pertence ao loop do RequestEngine e só deve ser usado dentro dele
+_client = None
+
+
+def _create_client(pool_size):
+    """
+    Cria o cliente HTTP com pool de conexões persistentes.
+    Todas as conexões do pool compartilham o mesmo contexto TLS, então os certificados
+    são carregados uma única vez e as conexões abertas são reaproveitadas entre requisições.
+    """
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+    # timeout=None mantém o comportamento anterior (sem limite de tempo)
+    return httpx.AsyncClient(limits=limits, timeout=None)
+
+
+def get_client():
+    """
+    Retorna o cliente HTTP compartilhado por todas as chamadas da API, criando-o na primeira vez.
+    """
+    global _client
+    if _client is None:
+        _client = _create_client(load_pool_size())
+    return _client
+
+
+def build_headers(api_key):
+    """
+    Monta os headers padrão das requisições para a API.
+    """
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+
+
+async def post_chat_completion(api_key, payload, timeout=None):
+    """
+    Envia o payload para o endpoint de chat usando o cliente compartilhado.
+    """
+    return await get_client().post(CHAT_COMPLETIONS_URL, headers=build_headers(api_key), json=payload, timeout=timeout)
+
+
+def stream_chat_completion(api_key, payload, timeout=None):
+    """
+    Abre uma requisição em modo streaming (server-sent events).
+    Deve ser usada como gerenciador de contexto: `async with stream_chat_completion(...) as response:`
+    """
+    stream_payload = dict(payload, stream=True)
+    return get_client().stream(
+        "POST", CHAT_COMPLETIONS_URL, headers=build_headers(api_key), json=stream_payload, timeout=timeout
+    )
+
+
+async def iter_sse_deltas(response):
+    """
+    Lê os eventos SSE da resposta e retorna, um a um, os trechos de texto gerados pelo modelo.
+    """
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        chunk = json.loads(data)
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        delta = choices[0].get("delta", {}).get("content")
+        if delta:
+            yield delta
+
+
+async def warm_up_client():
+    """
+    Abre uma conexão com a API (DNS, TCP e TLS) para que a primeira ação
+    do usuário já encontre uma conexão pronta no pool.
+    """
+    try:
+        await get_client().head(API_BASE_URL, timeout=10.0)
+    except httpx.HTTPError as e:
+        print(f"Falha ao pré-aquecer a conexão com a API: {e}")
+
+
+async def close_client():
+    """
+    Fecha o cliente compartilhado e todas as conexões abertas do pool.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
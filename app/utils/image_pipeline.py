@@ -0,0 +1,65 @@
+# app/utils/image_pipeline.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageGrab
+from app.utils.image_store import get_image_store, image_ref
+from app.utils.image_prep import prepare_image
+from app.utils.vision_cache import capture_hash
+
+# Largura da miniatura exibida no chat
+THUMBNAIL_WIDTH = 200
+# Captura, codificação e miniatura rodam fora da thread da interface
+IMAGE_WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_image_executor():
+    """
+    Retorna o pool de threads usado para processar as imagens.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+        return _executor
+
+
+def make_thumbnail(image, width=THUMBNAIL_WIDTH):
+    """
+    Gera a miniatura direto da captura (sem decodificar o PNG de novo).
+    Retorna (bytes RGBA, largura, altura), prontos para montar um QImage na thread da interface.
+    """
+    height = max(1, round(image.height * width / image.width))
+    thumbnail = image.convert("RGBA").resize((width, height), Image.BILINEAR, reducing_gap=2.0)
+    return thumbnail.tobytes("raw", "RGBA"), width, height
+
+
+def capture_screenshot(bbox):
+    """
+    Captura a área da tela, prepara a versão de envio (veja image_prep), grava no armazenamento
+    de imagens, calcula o hash da captura (para o cache de imagens) e gera a miniatura.
+    Roda no pool de imagens; retorna {"image", "ref", "thumbnail"}.
+    """
+    image = ImageGrab.grab(bbox=bbox)
+    prepared = prepare_image(image)
+    key = get_image_store().put(prepared["data"], prepared["mime"])
+    reference = image_ref(key, prepared["mime"], prepared["detail"], capture_hash(image))
+    return {"image": image, "ref": reference, "thumbnail": make_thumbnail(image)}
+
+
+def submit_capture(bbox, signal, *args):
+    """
+    Processa a captura no pool de imagens e emite o resultado no sinal do Qt, precedido de 'args'.
+    Em caso de erro, o sinal recebe a exceção no lugar do resultado.
+    """
+    future = get_image_executor().submit(capture_screenshot, bbox)
+
+    def _on_done(done_future):
+        error = done_future.exception()
+        signal.emit(*args, error if error is not None else done_future.result())
+
+    future.add_done_callback(_on_done)
+    return future
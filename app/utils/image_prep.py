@@ -0,0 +1,124 @@
+# app/utils/image_prep.py
+
+import io
+from PIL import Image, ImageStat, features
+from app.utils.settings import (
+    load_image_max_edge, load_image_byte_budget, load_image_format,
+    load_image_grayscale_text, load_image_detail
+)
+
+# Faixa da busca de qualidade para JPEG/WebP
+MIN_QUALITY = 35
+MAX_QUALITY = 90
+# Redução aplicada quando nem a menor qualidade cabe no orçamento de bytes
+DOWNSCALE_STEP = 0.75
+MAX_DOWNSCALES = 4
+# Com o detalhe 'low' a API reduz a imagem para caber em 512x512
+LOW_DETAIL_EDGE = 512
+# Saturação média (0-255) abaixo da qual a captura é considerada só texto, sem cores relevantes
+TEXT_SATURATION = 12
+
+MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def load_image_policy():
+    """
+    Lê das configurações a política de preparo das imagens enviadas para a API.
+    """
+    return {
+        "max_edge": load_image_max_edge(),
+        "byte_budget": load_image_byte_budget(),
+        "format": load_image_format(),
+        "grayscale_text": load_image_grayscale_text(),
+        "detail": load_image_detail(),
+    }
+
+
+def is_text_capture(image):
+    """
+    Indica se a captura parece ser só texto (quase sem cores), analisando uma versão reduzida.
+    """
+    sample = image.convert("RGB")
+    sample.thumbnail((128, 128))
+    saturation = sample.convert("HSV").getchannel("S")
+    return ImageStat.Stat(saturation).mean[0] < TEXT_SATURATION
+
+
+def _encode(image, image_format, quality=None):
+    buffer = io.BytesIO()
+    if image_format == "png":
+        image.save(buffer, format="PNG", optimize=True)
+    elif image_format == "jpeg":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    else:
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def _search_quality(image, image_format, byte_budget):
+    """
+    Busca binária pela maior qualidade que cabe no orçamento. Retorna os bytes ou None se nem a menor couber.
+    """
+    best = None
+    low, high = MIN_QUALITY, MAX_QUALITY
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(image, image_format, quality)
+        if len(data) <= byte_budget:
+            best = data
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best
+
+
+def _resize(image, scale):
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.LANCZOS)
+
+
+def prepare_image(image, policy=None):
+    """
+    Prepara a captura para o envio: reduz o maior lado, converte capturas de texto para tons de cinza
+    e escolhe formato e qualidade para caber no orçamento de bytes (reduzindo a imagem se preciso).
+    Retorna {"data", "mime", "detail", "size"}.
+    """
+    policy = policy or load_image_policy()
+    text_capture = is_text_capture(image)
+
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    if policy["grayscale_text"] and text_capture:
+        image = image.convert("L")
+    max_edge = policy["max_edge"]
+    if max_edge and max(image.size) > max_edge:
+        image = _resize(image, max_edge / max(image.size))
+
+    image_format = policy["format"]
+    if image_format == "webp" and not features.check("webp"):
+        image_format = "jpeg"
+    budget = policy["byte_budget"]
+
+    for _ in range(MAX_DOWNSCALES + 1):
+        data, chosen = None, image_format
+        if image_format in ("png", "auto"):
+            # PNG costuma ser o menor formato para texto e não perde nitidez
+            data = _encode(image, "png")
+            chosen = "png"
+            if budget and len(data) > budget and image_format == "auto":
+                data, chosen = _search_quality(image, "jpeg", budget), "jpeg"
+        elif budget:
+            data = _search_quality(image, image_format, budget)
+        else:
+            data = _encode(image, image_format, MAX_QUALITY)
+        if data is not None and (not budget or len(data) <= budget):
+            break
+        image = _resize(image, DOWNSCALE_STEP)
+    if data is None:
+        data, chosen = _encode(image, "jpeg", MIN_QUALITY), "jpeg"
+
+    detail = policy["detail"]
+    if detail == "auto" and max(image.size) <= LOW_DETAIL_EDGE:
+        # A imagem já cabe no detalhe 'low': mesma qualidade com bem menos tokens
+        detail = "low"
+    return {"data": data, "mime": MIME_TYPES[chosen], "detail": detail, "size": image.size}
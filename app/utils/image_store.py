@@ -0,0 +1,128 @@
+# app/utils/image_store.py
+
+import os
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from app.utils.settings import app_data_dir
+
+# Extensão dos arquivos por tipo de imagem
+EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+# Data URLs mantidas prontas em memória (as imagens das últimas mensagens costumam ser reenviadas)
+DATA_URL_CACHE_SIZE = 4
+
+
+class ImageStore:
+    """
+    Armazena as imagens uma única vez em disco, endereçadas pelo hash SHA-256 do conteúdo.
+    O histórico guarda só a chave ({"type": "image_ref", "image_ref": {"key": ...}}); a data URL
+    em base64 é montada apenas quando a mensagem vai de fato para a API (veja materialize_images).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._data_urls = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, mime):
+        return os.path.join(self.directory, key[:2], key + EXTENSIONS.get(mime, ".png"))
+
+    def put(self, data, mime="image/png"):
+        """
+        Grava os bytes da imagem (se ainda não existirem) e retorna a chave da imagem.
+        """
+        key = hashlib.sha256(data).hexdigest()
+        path = self._path(key, mime)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        return key
+
+    def get(self, key, mime="image/png"):
+        """
+        Retorna os bytes da imagem ou None se ela não existir mais.
+        """
+        try:
+            with open(self._path(key, mime), 'rb') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def data_url(self, key, mime="image/png"):
+        """
+        Monta a data URL (base64) da imagem, reaproveitando as mais recentes.
+        """
+        with self._lock:
+            if key in self._data_urls:
+                self._data_urls.move_to_end(key)
+                return self._data_urls[key]
+        data = self.get(key, mime)
+        if data is None:
+            return None
+        url = f"data:{mime};base64," + base64.b64encode(data).decode('utf-8')
+        with self._lock:
+            self._data_urls[key] = url
+            while len(self._data_urls) > DATA_URL_CACHE_SIZE:
+                self._data_urls.popitem(last=False)
+        return url
+
+
+def image_ref(key, mime="image/png", detail=None, phash=None):
+    """
+    Parte de conteúdo que referencia uma imagem do ImageStore ('phash' é o hash da captura, veja vision_cache.capture_hash).
+    """
+    reference = {"key": key, "mime": mime}
+    if detail:
+        reference["detail"] = detail
+    if phash:
+        reference["phash"] = phash
+    return {"type": "image_ref", "image_ref": reference}
+
+
+def materialize_images(messages):
+    """
+    Troca as referências de imagem das mensagens pelas data URLs esperadas pela API.
+    As mensagens originais não são alteradas. Imagens que sumiram do disco viram um aviso em texto.
+    """
+    store = get_image_store()
+    result = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str) or not any(part.get("type") == "image_ref" for part in content or []):
+            result.append(message)
+            continue
+        parts = []
+        for part in content:
+            if part.get("type") != "image_ref":
+                parts.append(part)
+                continue
+            url = store.data_url(part["image_ref"]["key"], part["image_ref"].get("mime", "image/png"))
+            if url is None:
+                parts.append({"type": "text", "text": "[Imagem indisponível]"})
+                continue
+            image_url = {"url": url}
+            if "detail" in part["image_ref"]:
+                image_url["detail"] = part["image_ref"]["detail"]
+            parts.append({"type": "image_url", "image_url": image_url})
+        result.append({**message, "content": parts})
+    return result
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_image_store():
+    """
+    Retorna o armazenamento de imagens compartilhado.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ImageStore(os.path.join(app_data_dir(), "images"))
+        return _store
@@ -0,0 +1,48 @@
+# app/utils/metrics.py
+
+import threading
+
+# Métricas simples em memória (contadores e tempos), compartilhadas entre as threads
+_lock = threading.Lock()
+_counters = {}
+_latencies = {}
+
+
+def increment(name, value=1):
+    """
+    Incrementa o contador 'name'.
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def record_latency(name, seconds):
+    """
+    Registra uma medição de tempo (em segundos) para 'name'.
+    Guarda apenas o total, o número de amostras e o maior valor observado.
+    """
+    with _lock:
+        total, count, maximum = _latencies.get(name, (0.0, 0, 0.0))
+        _latencies[name] = (total + seconds, count + 1, max(maximum, seconds))
+
+
+def snapshot():
+    """
+    Retorna uma cópia das métricas atuais no formato:
+    {"counters": {nome: valor}, "latencies": {nome: {"count", "avg", "max"}}}
+    """
+    with _lock:
+        latencies = {
+            name: {"count": count, "avg": total / count if count else 0.0, "max": maximum}
+            for name, (total, count, maximum) in _latencies.items()
+        }
+        return {"counters": dict(_counters), "latencies": latencies}
+
+
+def reset():
+    """
+    Zera todas as métricas.
+    """
+    with _lock:
+        _counters.clear()
+        _latencies.clear()
@@ -0,0 +1,112 @@
+# app/utils/paste_back.py
+
+import time
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from app.utils import metrics
+from app.platform.backend import get_backend
+
+# Apaga a seleção e cola (Backspace, Ctrl+V): uma tecla (pressionada ou solta) por passo do timer
+PASTE_SEQUENCE = (
+    ("backspace", True),
+    ("backspace", False),
+    ("ctrl", True),
+    ("v", True),
+    ("v", False),
+    ("ctrl", False),
+)
+# Intervalo entre as teclas e entre as verificações de foco (ms)
+KEY_INTERVAL_MS = 15
+FOCUS_POLL_MS = 10
+# Tempo máximo esperando a janela de destino ficar em primeiro plano
+FOCUS_TIMEOUT_MS = 1000
+
+
+class PasteBack(QObject):
+    """
+    Cola o clipboard de volta na janela de origem sem bloquear a interface.
+    Máquina de estados dirigida por um QTimer: espera a janela ficar em primeiro plano
+    (verificando a cada 10 ms, até 1 s) e injeta as teclas uma por passo, sem time.sleep.
+    Emite 'finished(bool)' com True se as teclas foram injetadas.
+    """
+    finished = pyqtSignal(bool)
+
+    def __init__(self, hwnd=None, parent=None):
+        super().__init__(parent)
+        self.hwnd = hwnd
+        self._step = 0
+        self._started = None
+        self._pressed = []  # Teclas pressionadas e ainda não soltas, na ordem em que foram pressionadas
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._wait_focus)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._timer.start(FOCUS_POLL_MS)
+        self._wait_focus()
+
+    def _wait_focus(self):
+        if self.hwnd is None or get_backend().foreground_window() == self.hwnd:
+            metrics.record_latency("paste_back.focus", time.perf_counter() - self._started)
+            self._timer.stop()
+            self._timer.timeout.disconnect(self._wait_focus)
+            self._timer.timeout.connect(self._inject_next)
+            self._inject_next()
+            self._timer.start(KEY_INTERVAL_MS)
+            return
+        if (time.perf_counter() - self._started) * 1000 > FOCUS_TIMEOUT_MS:
+            # A janela não voltou ao primeiro plano: não colar em outro lugar
+            print("A janela de origem não ficou em primeiro plano; texto mantido no clipboard.")
+            metrics.increment("paste_back.focus_timeout")
+            self._finish(False)
+
+    def _inject_next(self):
+        if self._step >= len(PASTE_SEQUENCE):
+            metrics.record_latency("paste_back.total", time.perf_counter() - self._started)
+            self._finish(True)
+            return
+        key, down = PASTE_SEQUENCE[self._step]
+        self._step += 1
+        if down:
+            # Registrada antes do envio: se a injeção falhar no meio, a tecla também é solta
+            self._pressed.append(key)
+        try:
+            get_backend().key_event(key, down)
+        except Exception as e:
+            print(f"Erro ao tentar colar o texto: {e}")
+            self._release_pressed()
+            self._finish(False)
+            return
+        if not down:
+            self._pressed.remove(key)
+
+    def _release_pressed(self):
+        """
+        Solta as teclas que ficaram pressionadas (ex.: Ctrl) para não travá-las no aplicativo de destino.
+        """
+        while self._pressed:
+            key = self._pressed.pop()
+            try:
+                get_backend().key_event(key, False)
+            except Exception as e:
+                print(f"Erro ao soltar a tecla {key}: {e}")
+
+    def _finish(self, ok):
+        self._timer.stop()
+        self._started = None
+        _active_jobs.discard(self)
+        self.finished.emit(ok)
+        self.deleteLater()
+
+
+# Mantém os jobs vivos até terminarem, mesmo sem um QObject pai
+_active_jobs = set()
+
+
+def paste_back(hwnd=None, parent=None):
+    """
+    Inicia a colagem na janela 'hwnd' (ou na janela em primeiro plano, se None) e retorna o job.
+    """
+    job = PasteBack(hwnd, parent)
+    _active_jobs.add(job)
+    job.start()
+    return job
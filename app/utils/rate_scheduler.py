@@ -0,0 +1,180 @@
+# app/utils/rate_scheduler.py
+
+import time
+import heapq
+import asyncio
+import itertools
+from app.utils import metrics
+from app.utils.settings import load_rate_limit_rpm, load_rate_limit_tpm
+from app.utils.request_engine import get_engine, current_priority
+
+# Limites usados até a API informar os reais nos headers (gpt-4o-mini, tier 1)
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200000
+
+
+class TokenBucket:
+    """
+    Balde de fichas reabastecido continuamente: 'capacity' fichas por minuto.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = float(capacity)
+        self.available = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount):
+        """
+        Segundos até haver 'amount' fichas disponíveis (0 se já houver).
+        """
+        self._refill()
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing * 60.0 / self.capacity)
+
+    def consume(self, amount):
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+    def set_capacity(self, capacity):
+        self._refill()
+        self.capacity = float(capacity)
+        self.available = min(self.available, self.capacity)
+
+    def sync_remaining(self, remaining):
+        """
+        Ajusta as fichas disponíveis ao saldo informado pela API, se ele for menor.
+        """
+        self._refill()
+        self.available = min(self.available, float(remaining))
+
+
+class RateScheduler:
+    """
+    Controle de admissão das requisições à API, antes do envio: respeita os limites de
+    requisições por minuto (RPM) e tokens por minuto (TPM) e enfileira localmente o que excede.
+    A fila é ordenada por prioridade, então ações interativas passam na frente de trabalho em segundo plano.
+    Deve ser usado apenas dentro do loop do RequestEngine.
+    """
+
+    def __init__(self, rpm=0, tpm=0):
+        self.requests = TokenBucket(DEFAULT_RPM)
+        self.tokens = TokenBucket(DEFAULT_TPM)
+        self._manual_rpm = 0
+        self._manual_tpm = 0
+        self._queue = []  # (prioridade, ordem, custo, future)
+        self._order = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher = None
+        self.configure(rpm, tpm)
+
+    def configure(self, rpm, tpm):
+        """
+        Define limites manuais. Zero significa usar os limites informados pela API.
+        """
+        self._manual_rpm = rpm
+        self._manual_tpm = tpm
+        if rpm:
+            self.requests.set_capacity(rpm)
+        if tpm:
+            self.tokens.set_capacity(tpm)
+        self._wakeup.set()
+
+    def update_from_headers(self, headers):
+        """
+        Aprende os limites e o saldo atual a partir dos headers x-ratelimit-* da resposta.
+        """
+        try:
+            limit_requests = headers.get("x-ratelimit-limit-requests")
+            limit_tokens = headers.get("x-ratelimit-limit-tokens")
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if limit_requests and not self._manual_rpm:
+                self.requests.set_capacity(int(limit_requests))
+            if limit_tokens and not self._manual_tpm:
+                self.tokens.set_capacity(int(limit_tokens))
+            if remaining_requests:
+                self.requests.sync_remaining(int(remaining_requests))
+            if remaining_tokens:
+                self.tokens.sync_remaining(int(remaining_tokens))
+        except ValueError:
+            pass
+
+    def _wait_time(self, cost):
+        return max(self.requests.wait_time(1), self.tokens.wait_time(cost))
+
+    def _admit(self, cost):
+        self.requests.consume(1)
+        self.tokens.consume(cost)
+
+    async def acquire(self, cost, priority=None):
+        """
+        Aguarda até a requisição de custo estimado 'cost' (tokens) poder ser enviada.
+        """
+        if priority is None:
+            priority = current_priority.get()
+
+        if not self._queue and self._wait_time(cost) <= 0:
+            self._admit(cost)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._order), cost, future))
+        metrics.increment("scheduler.queued")
+        queued_at = time.monotonic()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        else:
+            # Uma requisição mais prioritária pode ter entrado na frente da fila
+            self._wakeup.set()
+        await future
+        metrics.record_latency("scheduler.wait", time.monotonic() - queued_at)
+
+    async def _dispatch(self):
+        """
+        Libera as requisições da fila, em ordem de prioridade, conforme os baldes se reabastecem.
+        """
+        while self._queue:
+            priority, order, cost, future = self._queue[0]
+            if future.done():
+                # Requisição cancelada enquanto esperava
+                heapq.heappop(self._queue)
+                continue
+            wait = self._wait_time(cost)
+            if wait <= 0:
+                heapq.heappop(self._queue)
+                self._admit(cost)
+                future.set_result(None)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+
+_scheduler = None
+
+
+def get_rate_scheduler():
+    """
+    Retorna o agendador compartilhado (deve ser chamado dentro do loop do engine).
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RateScheduler(load_rate_limit_rpm(), load_rate_limit_tpm())
+    return _scheduler
+
+
+def apply_rate_limit_settings():
+    """
+    Aplica os limites salvos nas configurações ao agendador, a partir de qualquer thread.
+    """
+    def _apply():
+        get_rate_scheduler().configure(load_rate_limit_rpm(), load_rate_limit_tpm())
+
+    get_engine().loop.call_soon_threadsafe(_apply)
@@ -0,0 +1,189 @@
+# app/utils/request_engine.py
+
+import heapq
+import asyncio
+import itertools
+import threading
+import time
+import contextvars
+from app.utils import metrics
+from app.utils.settings import load_max_concurrency
+from app.utils.http_client import close_client
+
+# Prioridades das requisições (menor valor = atendida primeiro)
+PRIORITY_INTERACTIVE = 0  # ações do floating widget, com o usuário esperando para colar
+PRIORITY_NORMAL = 1       # chat e menu lateral
+PRIORITY_BACKGROUND = 2   # trabalho em lote ou em segundo plano
+
+# Prioridade da requisição em execução; vale para a corrotina enviada e as tarefas criadas por ela
+current_priority = contextvars.ContextVar("current_priority", default=PRIORITY_NORMAL)
+
+
+class PrioritySemaphore:
+    """
+    Semáforo do asyncio que libera as vagas por ordem de prioridade (e de chegada, no empate).
+    """
+
+    def __init__(self, value):
+        self._value = value
+        self._waiters = []  # (prioridade, ordem, future)
+        self._order = itertools.count()
+
+    async def acquire(self, priority):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # A vaga pode ter sido entregue no mesmo instante do cancelamento
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+
+class RequestEngine:
+    """
+    Loop asyncio dedicado, rodando em uma thread própria, que executa todas as requisições da API.
+    As corrotinas são enviadas com submit() e executadas com concorrência limitada, por ordem de prioridade;
+    o retorno é uma concurrent.futures.Future que pode ser observada ou cancelada de qualquer thread.
+    """
+
+    def __init__(self, max_concurrency=4):
+        self.max_concurrency = max_concurrency
+        self.loop = asyncio.new_event_loop()
+        self._semaphore = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="RequestEngine", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        # Aguarda o loop estar rodando antes de aceitar corrotinas
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = PrioritySemaphore(self.max_concurrency)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _run_limited(self, coro, name, priority):
+        """
+        Executa a corrotina respeitando o limite de concorrência e registra os tempos de fila e total.
+        """
+        queued_at = time.monotonic()
+        current_priority.set(priority)
+        try:
+            await self._semaphore.acquire(priority)
+        except asyncio.CancelledError:
+            coro.close()
+            metrics.increment(f"{name}.cancelled")
+            raise
+        metrics.record_latency(f"{name}.queue", time.monotonic() - queued_at)
+        try:
+            result = await coro
+            metrics.increment(f"{name}.completed")
+            return result
+        except asyncio.CancelledError:
+            metrics.increment(f"{name}.cancelled")
+            raise
+        except Exception:
+            metrics.increment(f"{name}.failed")
+            raise
+        finally:
+            self._semaphore.release()
+            metrics.record_latency(name, time.monotonic() - queued_at)
+
+    def submit(self, coro, name="request", priority=PRIORITY_NORMAL):
+        """
+        Agenda a corrotina no loop do engine e retorna uma concurrent.futures.Future.
+        """
+        metrics.increment(f"{name}.submitted")
+        return asyncio.run_coroutine_threadsafe(self._run_limited(coro, name, priority), self.loop)
+
+    def stop(self, timeout=5.0):
+        """
+        Cancela as tarefas pendentes, fecha o cliente HTTP e encerra o loop.
+        """
+        if not self._thread.is_alive():
+            return
+
+        async def _shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await close_client()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), self.loop).result(timeout)
+        except Exception as e:
+            print(f"Erro ao encerrar o engine de requisições: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Retorna o engine de requisições compartilhado, iniciando-o na primeira chamada.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RequestEngine(max_concurrency=load_max_concurrency())
+            _engine.start()
+        return _engine
+
+
+def bridge_future(future, signal, *args):
+    """
+    Emite o resultado da future no sinal do Qt quando ela terminar, precedido de 'args'
+    (por exemplo, o ID da requisição). O sinal é emitido a partir da thread do engine;
+    o Qt entrega na thread da interface. Futures canceladas não emitem nada.
+    """
+    def _on_done(done_future):
+        if done_future.cancelled():
+            return
+        error = done_future.exception()
+        if error is not None:
+            signal.emit(*args, f"Erro ao consultar a API: {error}")
+        else:
+            signal.emit(*args, done_future.result())
+
+    future.add_done_callback(_on_done)
+
+
+def submit_request(coro, signal=None, name="request", priority=PRIORITY_NORMAL):
+    """
+    Envia a corrotina para o engine e, se informado, liga o resultado ao sinal do Qt.
+    """
+    future = get_engine().submit(coro, name, priority)
+    if signal is not None:
+        bridge_future(future, signal)
+    return future
+
+
+def shutdown_engine():
+    """
+    Encerra o engine compartilhado, se estiver rodando.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.stop()
+            _engine = None
@@ -0,0 +1,122 @@
+# app/utils/response_bus.py
+
+import uuid
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from app.utils.request_engine import bridge_future
+
+
+class ResponseBus(QObject):
+    """
+    Barramento que entrega cada resposta da API apenas a quem fez a requisição.
+    Cada requisição recebe um ID de correlação; os sinais carregam esse ID e o barramento
+    chama somente os callbacks registrados para ele, sempre na thread da interface.
+    """
+    response_ready = pyqtSignal(str, str)  # request_id, resposta completa
+    chunk_ready = pyqtSignal(str, str)     # request_id, trecho da resposta em streaming
+    progress_ready = pyqtSignal(str, str)  # request_id, mensagem de progresso
+
+    def __init__(self):
+        super().__init__()
+        self._response_handlers = {}
+        self._chunk_handlers = {}
+        self._progress_handlers = {}
+        self._futures = {}
+        self.response_ready.connect(self._dispatch_response)
+        self.chunk_ready.connect(self._dispatch_chunk)
+        self.progress_ready.connect(self._dispatch_progress)
+
+    def register(self, on_response, on_chunk=None, on_progress=None):
+        """
+        Registra os callbacks de uma nova requisição e retorna o seu ID.
+        Os callbacks recebem (request_id, texto).
+        """
+        request_id = uuid.uuid4().hex
+        self._response_handlers[request_id] = on_response
+        if on_chunk is not None:
+            self._chunk_handlers[request_id] = on_chunk
+        if on_progress is not None:
+            self._progress_handlers[request_id] = on_progress
+        return request_id
+
+    def track(self, request_id, future):
+        """
+        Entrega o resultado da future ao callback da requisição quando ela terminar.
+        """
+        self._futures[request_id] = future
+        bridge_future(future, self.response_ready, request_id)
+
+    def deliver(self, request_id, answer):
+        """
+        Entrega a resposta completa (pode ser chamado de qualquer thread).
+        """
+        self.response_ready.emit(request_id, answer)
+
+    def deliver_chunk(self, request_id, chunk):
+        """
+        Entrega um trecho da resposta em streaming (pode ser chamado de qualquer thread).
+        """
+        self.chunk_ready.emit(request_id, chunk)
+
+    def deliver_progress(self, request_id, message):
+        """
+        Entrega uma mensagem de progresso de uma requisição em várias etapas (pode ser chamado de qualquer thread).
+        """
+        self.progress_ready.emit(request_id, message)
+
+    def discard(self, request_id):
+        """
+        Remove os callbacks de uma requisição; respostas que chegarem depois são ignoradas.
+        """
+        self._response_handlers.pop(request_id, None)
+        self._chunk_handlers.pop(request_id, None)
+        self._progress_handlers.pop(request_id, None)
+        self._futures.pop(request_id, None)
+
+    def cancel(self, request_id):
+        """
+        Cancela a requisição: a tarefa no engine é interrompida (abortando a transferência HTTP)
+        e os callbacks são removidos. Retorna False se a requisição já tinha terminado.
+        """
+        future = self._futures.get(request_id)
+        pending = self.is_pending(request_id)
+        self.discard(request_id)
+        if future is not None:
+            future.cancel()
+        return pending
+
+    def is_pending(self, request_id):
+        return request_id in self._response_handlers
+
+    @pyqtSlot(str, str)
+    def _dispatch_response(self, request_id, answer):
+        handler = self._response_handlers.pop(request_id, None)
+        self._chunk_handlers.pop(request_id, None)
+        self._progress_handlers.pop(request_id, None)
+        self._futures.pop(request_id, None)
+        if handler is not None:
+            handler(request_id, answer)
+
+    @pyqtSlot(str, str)
+    def _dispatch_chunk(self, request_id, chunk):
+        handler = self._chunk_handlers.get(request_id)
+        if handler is not None:
+            handler(request_id, chunk)
+
+    @pyqtSlot(str, str)
+    def _dispatch_progress(self, request_id, message):
+        handler = self._progress_handlers.get(request_id)
+        if handler is not None:
+            handler(request_id, message)
+
+
+_bus = None
+
+
+def get_response_bus():
+    """
+    Retorna o barramento compartilhado. A primeira chamada deve acontecer na thread da interface.
+    """
+    global _bus
+    if _bus is None:
+        _bus = ResponseBus()
+    return _bus
@@ -0,0 +1,209 @@
+# app/utils/response_cache.py
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from app.utils import metrics
+from app.utils.settings import (
+    app_data_dir, load_cache_enabled, load_cache_ttl_hours, load_cache_excluded_actions
+)
+
+# Limites padrão do cache
+MAX_MEMORY_ENTRIES = 200
+MAX_DISK_BYTES = 20 * 1024 * 1024  # 20 MB
+
+
+def make_cache_key(model, system_content, user_content, max_tokens):
+    """
+    Gera a chave do cache a partir do modelo, das mensagens e do limite de tokens.
+    """
+    raw = json.dumps([model, system_content, user_content, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def cache_key_from_payload(payload):
+    """
+    Gera a chave do cache para um payload com mensagens 'system' + 'user'.
+    """
+    messages = payload.get("messages", [])
+    system_content = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user_content = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    return make_cache_key(payload.get("model"), system_content, user_content, payload.get("max_tokens"))
+
+
+class ResponseCache:
+    """
+    Cache de respostas da API em dois níveis: LRU em memória e arquivos em disco.
+    As entradas expiram após 'ttl' segundos; o disco é limitado a 'max_disk_bytes',
+    removendo primeiro os arquivos mais antigos.
+
+    As gravações e remoções em disco rodam em uma thread própria, para não travar o loop do engine
+    (put é chamado de dentro das requisições). O tamanho ocupado em disco é acompanhado a cada
+    gravação; o diretório só é listado uma vez, na primeira gravação.
+    """
+
+    def __init__(self, directory, ttl, max_memory_entries=MAX_MEMORY_ENTRIES, max_disk_bytes=MAX_DISK_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # chave -> (criado_em, resposta)
+        self._lock = threading.Lock()
+        # Usados apenas na thread de gravação
+        self._disk_files = None  # caminho -> (mtime, tamanho), do mais antigo para o mais novo
+        self._disk_bytes = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ResponseCacheWriter")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _expired(self, created_at):
+        return time.time() - created_at > self.ttl
+
+    def get(self, key):
+        """
+        Retorna a resposta guardada para a chave, ou None se não existir ou estiver expirada.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    metrics.increment("cache.hit")
+                    return entry[1]
+                del self._memory[key]
+
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+                metrics.increment("cache.hit")
+                metrics.increment("cache.hit_disk")
+                return entry[1]
+
+        metrics.increment("cache.miss")
+        return None
+
+    def put(self, key, answer):
+        """
+        Guarda a resposta nos dois níveis do cache. A gravação em disco acontece em segundo plano.
+        """
+        entry = (time.time(), answer)
+        with self._lock:
+            self._remember(key, entry)
+        self._writer.submit(self._store_on_disk, key, entry)
+
+    def clear(self):
+        """
+        Remove todas as entradas da memória e do disco.
+        """
+        with self._lock:
+            self._memory.clear()
+        self._writer.submit(self._clear_disk)
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(data.get("created_at", 0)):
+            # O arquivo é removido pela thread de gravação, que acompanha o tamanho do diretório
+            return None
+        return data["created_at"], data["answer"]
+
+    def _scan_disk(self):
+        """
+        Lista os arquivos do cache uma única vez (na thread de gravação), do mais antigo para o mais novo.
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path, stat.st_size))
+        files.sort()
+        self._disk_files = OrderedDict((path, (mtime, size)) for mtime, path, size in files)
+        self._disk_bytes = sum(size for _, _, size in files)
+
+    def _store_on_disk(self, key, entry):
+        if self._disk_files is None:
+            self._scan_disk()
+        path = self._path(key)
+        data = json.dumps({"created_at": entry[0], "answer": entry[1]}, ensure_ascii=False).encode('utf-8')
+        try:
+            with open(path, 'wb') as f:
+                f.write(data)
+        except OSError as e:
+            print(f"Erro ao gravar o cache de respostas: {e}")
+            return
+        previous = self._disk_files.pop(path, None)
+        if previous is not None:
+            self._disk_bytes -= previous[1]
+        self._disk_files[path] = (time.time(), len(data))
+        self._disk_bytes += len(data)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """
+        Remove arquivos expirados e, se o diretório passar do limite, os mais antigos.
+        """
+        now = time.time()
+        while self._disk_files:
+            path, (mtime, size) = next(iter(self._disk_files.items()))
+            if now - mtime <= self.ttl and self._disk_bytes <= self.max_disk_bytes:
+                break
+            del self._disk_files[path]
+            self._disk_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _clear_disk(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        self._disk_files = OrderedDict()
+        self._disk_bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Retorna o cache de respostas compartilhado, criando-o na primeira chamada.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            directory = os.path.join(app_data_dir(), "response_cache")
+            _cache = ResponseCache(directory, ttl=load_cache_ttl_hours() * 3600)
+        return _cache
+
+
+def is_cache_enabled_for(action):
+    """
+    Verifica se o cache está ativo e se a ação não foi excluída nas configurações.
+    """
+    return load_cache_enabled() and action not in load_cache_excluded_actions()
@@ -0,0 +1,185 @@
+# app/utils/retry_policy.py
+
+import re
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+import httpx
+from app.utils import metrics
+from app.utils.settings import load_request_timeout, load_max_retries
+
+# Status HTTP que valem uma nova tentativa
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Formato dos headers x-ratelimit-reset-*: "1s", "6m0s", "20ms", "1h2m3.5s"
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class ApiStatusError(Exception):
+    """
+    Resposta da API com status de erro que pode ser repetida (429 ou 5xx).
+    Guarda o status, os headers e a mensagem de erro devolvida pela API.
+    """
+
+    def __init__(self, status_code, headers, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers
+        self.message = message
+
+
+def parse_duration(value):
+    """
+    Converte durações no formato dos headers de rate limit ("6m0s", "20ms") para segundos.
+    Retorna None se o valor não puder ser interpretado.
+    """
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def parse_retry_after(headers):
+    """
+    Lê o tempo de espera indicado pela API em 'retry-after-ms' ou 'retry-after'
+    (em segundos ou como data HTTP). Retorna None se não houver indicação.
+    """
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate_limit_reset(headers):
+    """
+    Calcula quanto tempo falta para a cota esgotada ser renovada, usando os headers
+    x-ratelimit-remaining-* e x-ratelimit-reset-*. Retorna None se nenhuma cota estiver esgotada.
+    """
+    waits = []
+    for kind in ("requests", "tokens"):
+        remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+        reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+        if remaining is not None and reset is not None and remaining.strip() == "0":
+            waits.append(reset)
+    return max(waits) if waits else None
+
+
+class RetryBudget:
+    """
+    Orçamento de retentativas: cada requisição deposita 'ratio' fichas e cada retentativa gasta uma.
+    Evita que, com a API fora do ar, as retentativas multipliquem a carga.
+    """
+
+    def __init__(self, ratio=0.2, initial=3.0, maximum=10.0):
+        self.ratio = ratio
+        self.maximum = maximum
+        self._balance = initial
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._balance = min(self.maximum, self._balance + self.ratio)
+
+    def try_withdraw(self):
+        with self._lock:
+            if self._balance >= 1.0:
+                self._balance -= 1.0
+                return True
+            return False
+
+
+class RetryPolicy:
+    """
+    Política de retentativas usada por todas as chamadas da API:
+    timeout por requisição, backoff exponencial com jitter, respeito aos headers
+    Retry-After e x-ratelimit-* e um orçamento global de retentativas.
+    """
+
+    def __init__(self, timeout, max_retries=3, base_delay=0.5, max_delay=30.0, budget=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+
+    def retry_delay(self, attempt, error):
+        """
+        Retorna quantos segundos esperar antes da próxima tentativa, ou None se não deve repetir.
+        """
+        if attempt >= self.max_retries:
+            return None
+
+        if isinstance(error, ApiStatusError):
+            if error.status_code not in RETRYABLE_STATUS:
+                return None
+            server_delay = parse_retry_after(error.headers)
+            reset_delay = parse_rate_limit_reset(error.headers)
+            waits = [delay for delay in (server_delay, reset_delay) if delay is not None]
+            if waits:
+                delay = max(waits)
+                # Se a API pedir para esperar mais do que o limite, desistir e avisar o usuário
+                if delay > self.max_delay:
+                    return None
+                return delay + random.uniform(0, self.base_delay)
+        elif not isinstance(error, (httpx.TimeoutException, httpx.TransportError)):
+            return None
+
+        # Backoff exponencial com "full jitter"
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def run(self, attempt_fn):
+        """
+        Executa 'attempt_fn(timeout)' repetindo em caso de erros temporários.
+        Se as tentativas acabarem, relança o último erro.
+        """
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return await attempt_fn(self.timeout)
+            except (ApiStatusError, httpx.TimeoutException, httpx.TransportError) as error:
+                delay = self.retry_delay(attempt, error)
+                if delay is None or not self.budget.try_withdraw():
+                    metrics.increment("retry.gave_up")
+                    raise
+                metrics.increment("retry.attempt")
+                metrics.record_latency("retry.delay", delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+_policy = None
+
+
+def get_retry_policy():
+    """
+    Retorna a política de retentativas compartilhada, criada a partir das configurações.
+    """
+    global _policy
+    if _policy is None:
+        request_timeout = load_request_timeout()
+        timeout = httpx.Timeout(request_timeout, connect=10.0)
+        _policy = RetryPolicy(timeout, max_retries=load_max_retries())
+    return _policy
@@ -0,0 +1,106 @@
+# app/utils/sentence_memory.py
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from app.utils import metrics
+from app.utils.settings import app_data_dir
+from app.utils.deferred_writer import DeferredJsonWriter
+
+# Número máximo de frases guardadas
+MAX_ENTRIES = 5000
+
+
+def normalize_sentence(sentence):
+    """
+    Normaliza a frase para a comparação: remove espaços extras e quebras de linha.
+    """
+    return " ".join(sentence.split())
+
+
+def make_sentence_key(action, model, system_content, sentence):
+    """
+    Gera a chave da frase: a mesma frase só é reaproveitada para a mesma ação, modelo e prompt.
+    """
+    raw = json.dumps([action, model, system_content, normalize_sentence(sentence)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SentenceMemory:
+    """
+    Memória de frases já processadas: frase original (normalizada) -> frase reescrita.
+    Quando o usuário reenvia um texto com poucas alterações, só as frases novas ou editadas
+    precisam ir para a API. Fica em memória (LRU) e é gravada em um arquivo JSON
+    em segundo plano, algum tempo depois da última alteração.
+    """
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writer = DeferredJsonWriter(path, self._snapshot, "a memória de frases")
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, sentence in data.items():
+            self._entries[key] = sentence
+
+    def get(self, key):
+        """
+        Retorna a frase reescrita guardada para a chave, ou None.
+        """
+        with self._lock:
+            sentence = self._entries.get(key)
+            if sentence is None:
+                metrics.increment("sentence_memory.miss")
+                return None
+            self._entries.move_to_end(key)
+            metrics.increment("sentence_memory.hit")
+            return sentence
+
+    def put_many(self, pairs):
+        """
+        Guarda vários pares (chave, frase reescrita) e agenda a gravação do arquivo.
+        """
+        with self._lock:
+            for key, sentence in pairs:
+                self._entries[key] = sentence
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def _snapshot(self):
+        with self._lock:
+            return dict(self._entries)
+
+    def _save(self):
+        self._writer.schedule()
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_sentence_memory():
+    """
+    Retorna a memória de frases compartilhada, criando-a na primeira chamada.
+    """
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = SentenceMemory(os.path.join(app_data_dir(), "sentence_memory.json"))
+        return _memory
@@ -2,9 +2,13 @@
 
 import os
 import sys
+import json
 from PyQt5 import QtCore
 from PyQt5.QtGui import QFontDatabase
 from app.utils.decorators import measure_time
+from app.utils.context_budget import select_context, summary_message
+from app.utils.context_index import relevant_context
+from app.utils.tokens import estimate_message_tokens
 
 
 def load_name():
@@ -40,6 +44,31 @@ def save_hotkey(hotkey):
     settings = QtCore.QSettings("Echo", "Echo")
     settings.setValue("HOTKEY", hotkey)
 
+# Ações do floating widget que podem ser executadas direto por uma tecla de atalho
+DIRECT_ACTIONS = {
+    "review": "Revisar",
+    "casual": "Casual",
+    "professional": "Profissional",
+    "concise": "Conciso",
+    "summarize": "Resumir",
+    "keypoints": "Pontos-chave",
+}
+
+def load_action_hotkeys():
+    """Teclas de atalho das ações diretas: {ação: 'Ctrl+Alt+R'}."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    try:
+        value = json.loads(settings.value("ACTION_HOTKEYS", "{}"))
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(value, dict):
+        return {}
+    return {action: hotkey for action, hotkey in value.items() if action in DIRECT_ACTIONS and hotkey}
+
+def save_action_hotkeys(hotkeys):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("ACTION_HOTKEYS", json.dumps(hotkeys))
+
 def load_context_setting():
     settings = QtCore.QSettings("Echo", "Echo")
     value = settings.value("MAINTAIN_CONTEXT", True)
@@ -68,8 +97,286 @@ def load_max_context():
         return int(value)
     except (TypeError, ValueError):
         return 2  # Valor padrão
+
+def load_context_token_budget():
+    """Número máximo (estimado) de tokens das mensagens de contexto enviadas à API."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("CONTEXT_TOKEN_BUDGET", 6000)
+    try:
+        return max(500, int(value))
+    except (TypeError, ValueError):
+        return 6000  # Valor padrão
+
+def save_context_token_budget(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("CONTEXT_TOKEN_BUDGET", value)
+
+def load_context_summary_enabled():
+    """Resumir as conversas antigas em vez de simplesmente descartá-las do contexto."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    return _to_bool(settings.value("CONTEXT_SUMMARY_ENABLED", True), True)
+
+def save_context_summary_enabled(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("CONTEXT_SUMMARY_ENABLED", value)
+
+def load_context_retrieval_enabled():
+    """Escolher as conversas anteriores mais relevantes para a pergunta em vez das mais recentes."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    return _to_bool(settings.value("CONTEXT_RETRIEVAL_ENABLED", True), True)
+
+def save_context_retrieval_enabled(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("CONTEXT_RETRIEVAL_ENABLED", value)
+
+def load_stream_setting():
+    settings = QtCore.QSettings("Echo", "Echo")
+    return _to_bool(settings.value("STREAM_RESPONSES", True), True)
+
+def save_stream_setting(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("STREAM_RESPONSES", value)
+
+def save_pool_size(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("HTTP_POOL_SIZE", value)
+
+def load_pool_size():
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("HTTP_POOL_SIZE", 4)
+    # Converter o valor para inteiro
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 4  # Valor padrão
     
 
+def save_max_concurrency(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("MAX_CONCURRENT_REQUESTS", value)
+
+def load_max_concurrency():
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("MAX_CONCURRENT_REQUESTS", 4)
+    # Converter o valor para inteiro
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 4  # Valor padrão
+
+def _to_bool(value, default):
+    # QSettings pode devolver bool, str ou int dependendo da plataforma
+    if isinstance(value, bool):
+        return value
+    elif isinstance(value, str):
+        return value.lower() == 'true'
+    elif isinstance(value, int):
+        return bool(value)
+    else:
+        return default
+
+def _to_list(value):
+    # QSettings devolve None para listas vazias e str para listas de um item
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value else []
+    return list(value)
+
+def load_cache_enabled():
+    settings = QtCore.QSettings("Echo", "Echo")
+    return _to_bool(settings.value("RESPONSE_CACHE_ENABLED", True), True)
+
+def save_cache_enabled(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("RESPONSE_CACHE_ENABLED", value)
+
+def load_cache_ttl_hours():
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("RESPONSE_CACHE_TTL_HOURS", 24)
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 24  # Valor padrão
+
+def save_cache_ttl_hours(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("RESPONSE_CACHE_TTL_HOURS", value)
+
+def load_cache_excluded_actions():
+    """Ações que nunca usam o cache de respostas (ex.: ['rewrite'])."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    return _to_list(settings.value("RESPONSE_CACHE_EXCLUDED_ACTIONS", []))
+
+def save_cache_excluded_actions(actions):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("RESPONSE_CACHE_EXCLUDED_ACTIONS", list(actions))
+
+def load_request_timeout():
+    """Tempo máximo (segundos) sem resposta da API antes de desistir da tentativa."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("REQUEST_TIMEOUT", 60)
+    try:
+        return max(1.0, float(value))
+    except (TypeError, ValueError):
+        return 60.0  # Valor padrão
+
+def save_request_timeout(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("REQUEST_TIMEOUT", value)
+
+def load_max_retries():
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("MAX_RETRIES", 3)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 3  # Valor padrão
+
+def save_max_retries(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("MAX_RETRIES", value)
+
+def load_sentence_memory_enabled():
+    settings = QtCore.QSettings("Echo", "Echo")
+    return _to_bool(settings.value("SENTENCE_MEMORY_ENABLED", True), True)
+
+def save_sentence_memory_enabled(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("SENTENCE_MEMORY_ENABLED", value)
+
+def load_rate_limit_rpm():
+    """Limite de requisições por minuto; 0 = usar o limite informado pela API."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("RATE_LIMIT_RPM", 0)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0  # Valor padrão
+
+def save_rate_limit_rpm(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("RATE_LIMIT_RPM", value)
+
+def load_rate_limit_tpm():
+    """Limite de tokens por minuto; 0 = usar o limite informado pela API."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("RATE_LIMIT_TPM", 0)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0  # Valor padrão
+
+def save_rate_limit_tpm(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("RATE_LIMIT_TPM", value)
+
+def load_image_max_edge():
+    """Maior lado (em pixels) das imagens enviadas; 0 = sem redução."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("IMAGE_MAX_EDGE", 1536)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 1536  # Valor padrão
+
+def save_image_max_edge(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("IMAGE_MAX_EDGE", value)
+
+def load_image_byte_budget():
+    """Tamanho máximo (em bytes) de cada imagem enviada; 0 = sem limite."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("IMAGE_BYTE_BUDGET", 300000)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 300000  # Valor padrão
+
+def save_image_byte_budget(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("IMAGE_BYTE_BUDGET", value)
+
+def load_image_format():
+    """Formato das imagens enviadas: 'auto', 'png', 'jpeg' ou 'webp'."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("IMAGE_FORMAT", "auto")
+    return value if value in ("auto", "png", "jpeg", "webp") else "auto"
+
+def save_image_format(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("IMAGE_FORMAT", value)
+
+def load_image_grayscale_text():
+    """Converter para tons de cinza as capturas que são só texto."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    return _to_bool(settings.value("IMAGE_GRAYSCALE_TEXT", True), True)
+
+def save_image_grayscale_text(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("IMAGE_GRAYSCALE_TEXT", value)
+
+def load_image_detail():
+    """Nível de detalhe pedido à API para as imagens: 'auto', 'low' ou 'high'."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("IMAGE_DETAIL", "auto")
+    return value if value in ("auto", "low", "high") else "auto"
+
+def save_image_detail(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("IMAGE_DETAIL", value)
+
+def load_vision_cache_enabled():
+    """Responder perguntas repetidas sobre capturas quase idênticas a partir do cache."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    return _to_bool(settings.value("VISION_CACHE_ENABLED", True), True)
+
+def save_vision_cache_enabled(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("VISION_CACHE_ENABLED", value)
+
+def load_vision_cache_distance():
+    """Bits diferentes (de 256) aceitos entre os pHashes de duas capturas para considerá-las iguais."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("VISION_CACHE_PHASH_DISTANCE", 6)
+    try:
+        return min(256, max(0, int(value)))
+    except (TypeError, ValueError):
+        return 6  # Valor padrão
+
+def save_vision_cache_distance(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("VISION_CACHE_PHASH_DISTANCE", value)
+
+def load_speculative_prefetch_enabled():
+    """Antecipar a ação mais usada do floating widget quando um texto novo é copiado."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    return _to_bool(settings.value("SPECULATIVE_PREFETCH_ENABLED", False), False)
+
+def save_speculative_prefetch_enabled(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("SPECULATIVE_PREFETCH_ENABLED", value)
+
+def load_speculative_prefetch_max_chars():
+    """Tamanho máximo (caracteres) do texto copiado para antecipar a ação."""
+    settings = QtCore.QSettings("Echo", "Echo")
+    value = settings.value("SPECULATIVE_PREFETCH_MAX_CHARS", 2000)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 2000  # Valor padrão
+
+def save_speculative_prefetch_max_chars(value):
+    settings = QtCore.QSettings("Echo", "Echo")
+    settings.setValue("SPECULATIVE_PREFETCH_MAX_CHARS", value)
+
+def app_data_dir():
+    """Diretório de dados do aplicativo, ao lado do arquivo de configurações do Qt."""
+    settings = QtCore.QSettings(QtCore.QSettings.IniFormat, QtCore.QSettings.UserScope, "Echo", "Echo")
+    path = os.path.dirname(settings.fileName())
+    os.makedirs(path, exist_ok=True)
+    return path
+
 def resource_path(relative_path):
     """Obtenha o caminho absoluto para os recursos, funciona tanto no dev quanto no executável compilado"""
     try:
@@ -124,66 +431,45 @@ def set_global_font(app):
 
 def get_messages_to_send(self):
     """
-    Retorna a lista de mensagens a serem enviadas para a API, incluindo as últimas N conversas (pares de usuário e assistente)
-    e a última mensagem do usuário que ainda não foi respondida.
+    Retorna a lista de mensagens a serem enviadas para a API: a última mensagem do usuário
+    que ainda não foi respondida e, se 'maintain_context' for True, as últimas N conversas
+    (pares de usuário e assistente) que couberem no orçamento de tokens do contexto.
+    Se as conversas antigas já foram resumidas (veja conversation_compactor), o resumo
+    vai antes, como uma mensagem de sistema.
+
+    Com a busca por relevância ativada, as conversas enviadas são a última e as mais parecidas
+    com a pergunta atual em toda a sessão, inclusive as já resumidas (índice BM25 em context_index),
+    em vez das N mais recentes.
 
-    Se 'maintain_context' for True, inclui as últimas N conversas (2 * N mensagens) + 1 mensagem do usuário (se ainda não tiver sido respondida),
-    totalizando 2 * N + 1 mensagens.
+    As conversas são escolhidas das mais recentes para as mais antigas; mensagens antigas
+    perdem as imagens e as grandes demais são encurtadas, então o tamanho da requisição
+    fica limitado independentemente do que estiver no histórico.
 
     Se 'maintain_context' for False, retorna apenas a última mensagem do usuário.
     """
     # Carregar as configurações
     maintain_context = load_context_setting()
     max_context_pairs = load_max_context()  # Número de pares usuário-assistente
+    token_budget = load_context_token_budget()
+
+    offset, conversation = self.conversation_store.snapshot()
+    summary = getattr(self, 'conversation_summary', None)
+
+    if not maintain_context:
+        # Não manter contexto, enviar apenas a última mensagem do usuário
+        return select_context(conversation[-1:], token_budget, 0)
+
+    prefix = []
+    if summary and load_context_summary_enabled():
+        # As conversas já resumidas vão como uma única mensagem de sistema no início
+        prefix = [summary_message(summary["text"])]
+        token_budget -= estimate_message_tokens(prefix[0])
+        conversation = conversation[max(0, summary["covered"] - offset):]
+
+    index = getattr(self, 'context_index', None)
+    if index is not None and load_context_retrieval_enabled():
+        # Trocar as conversas recentes pelas mais relevantes para a pergunta (mais a última),
+        # buscadas em toda a sessão: as já resumidas também podem voltar na íntegra
+        conversation = relevant_context(index, self.conversation_store, conversation, max_context_pairs)
 
-    with self.conversation_lock:
-        if not maintain_context:
-            # Não manter contexto, enviar apenas a última mensagem do usuário
-            if self.conversation_history:
-                messages = [self.conversation_history[-1]]
-            else:
-                messages = []
-            return messages
-
-        # Manter contexto
-        messages = []
-        conversation = self.conversation_history.copy()
-        total_messages = len(conversation)
-
-        index = total_messages - 1
-        pairs_collected = 0
-
-        # Incluir a última mensagem do usuário que ainda não foi respondida
-        if index >= 0 and conversation[index]['role'] == 'user':
-            # Última mensagem do usuário não foi respondida ainda
-            messages.append(conversation[index])
-            index -= 1
-
-        # Coletar os últimos N pares de usuário e assistente
-        while index >= 0 and pairs_collected < max_context_pairs:
-            # Coletar a mensagem do assistente
-            if conversation[index]['role'] == 'assistant':
-                assistant_message = conversation[index]
-                index -= 1
-            else:
-                # Se não for uma mensagem do assistente, ignorar e continuar
-                index -= 1
-                continue
-
-            # Coletar a mensagem do usuário
-            if index >= 0 and conversation[index]['role'] == 'user':
-                user_message = conversation[index]
-                index -= 1
-            else:
-                # Se não houver mensagem do usuário correspondente, interromper
-                break
-
-            # Adicionar as mensagens à lista na ordem correta
-            messages.extend([assistant_message, user_message])
-
-            pairs_collected += 1
-
-        # Reverter a lista para restaurar a ordem cronológica
-        messages.reverse()
-
-        return messages
\ No newline at end of file
+    return prefix + select_context(conversation, token_budget, max_context_pairs)
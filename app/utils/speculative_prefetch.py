@@ -0,0 +1,216 @@
+# app/utils/speculative_prefetch.py
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+from app.utils import metrics
+from app.utils.deferred_writer import DeferredJsonWriter
+from app.utils.settings import (
+    app_data_dir, DIRECT_ACTIONS, load_speculative_prefetch_enabled, load_speculative_prefetch_max_chars
+)
+
+# Espera (ms) depois da última mudança do clipboard antes de antecipar (cópias seguidas disparam uma vez só)
+SPECULATION_DELAY_MS = 500
+# Tempo (segundos) que uma resposta antecipada continua valendo
+SPECULATION_TTL = 600
+# Textos muito curtos (nomes, links, números) raramente são revisados
+MIN_CHARS = 20
+# Ação antecipada enquanto ainda não há histórico de uso
+DEFAULT_ACTION = "review"
+
+
+def text_hash(text):
+    return hashlib.sha256(text.strip().encode('utf-8')).hexdigest()
+
+
+class SpeculationStore:
+    """
+    Guarda a ação antecipada para o último texto copiado e as estatísticas de uso.
+    Só existe uma antecipação por vez: um texto novo descarta (e cancela) a anterior.
+    As estatísticas (uso de cada ação, acertos, erros e descartes) ficam em um arquivo JSON
+    no diretório de dados do usuário, gravado em segundo plano, para medir se a antecipação
+    compensa os tokens gastos.
+    Todos os métodos podem ser chamados de qualquer thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entry = None              # {"action", "hash", "created", "started", "future", "tokens"}
+        self._ignored = deque(maxlen=8)  # Hashes de textos que o próprio Echo colocou no clipboard
+        self.stats = {"usage": {}, "fired": 0, "hits": 0, "misses": 0, "discarded": 0, "wasted_tokens": 0}
+        self._writer = DeferredJsonWriter(path, self._snapshot, "as estatísticas de antecipação")
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict):
+            self.stats.update(data)
+
+    def predicted_action(self):
+        """
+        Ação mais usada até agora (entre as que usam só o texto copiado).
+        """
+        with self._lock:
+            usage = {action: count for action, count in self.stats["usage"].items() if action in DIRECT_ACTIONS}
+        if not usage:
+            return DEFAULT_ACTION
+        return max(usage, key=usage.get)
+
+    def ignore(self, text):
+        """
+        Marca um texto que o Echo vai colocar no clipboard (resposta, texto copiado pelo clique),
+        para que a mudança do clipboard não dispare uma antecipação.
+        """
+        if text:
+            with self._lock:
+                self._ignored.append(text_hash(text))
+
+    def should_speculate(self, text):
+        """
+        Diz se vale antecipar a ação para o texto que acabou de ser copiado.
+        """
+        if not load_speculative_prefetch_enabled():
+            return False
+        if not MIN_CHARS <= len(text) <= load_speculative_prefetch_max_chars():
+            return False
+        key = text_hash(text)
+        with self._lock:
+            if key in self._ignored:
+                return False
+            return self._entry is None or self._entry["hash"] != key
+
+    def start(self, action, text, submit):
+        """
+        Registra a antecipação de 'action' para 'text', descartando a anterior.
+        'submit(entry)' envia a requisição e retorna a sua future.
+        """
+        entry = {"action": action, "hash": text_hash(text), "created": time.time(),
+                 "started": False, "future": None, "tokens": 0}
+        with self._lock:
+            self._discard_locked()
+            entry["future"] = submit(entry)
+            self._entry = entry
+            self.stats["fired"] += 1
+            self._save()
+        metrics.increment("speculation.fired")
+
+    def mark_started(self, entry, tokens):
+        """
+        Chamado pela requisição antecipada quando ela começa a rodar no engine; 'tokens' é a estimativa do custo.
+        """
+        with self._lock:
+            entry["started"] = True
+            entry["tokens"] = tokens
+
+    def add_cost(self, entry, tokens):
+        """
+        Soma os tokens da resposta ao custo estimado da antecipação.
+        """
+        with self._lock:
+            entry["tokens"] += tokens
+
+    def claim(self, action, text):
+        """
+        Chamado quando o usuário executa uma ação: conta o uso da ação e, se houver uma antecipação
+        dessa ação para o mesmo texto, retorna a sua future (que pode ainda estar em andamento).
+        Uma antecipação que ainda não começou a rodar é cancelada: esperar por ela, na prioridade
+        de segundo plano, seria mais lento que enviar a requisição normalmente. Outra ação sobre
+        o mesmo texto também descarta a antecipação, que não vai mais ser usada.
+        """
+        if action not in DIRECT_ACTIONS:
+            return None
+        enabled = load_speculative_prefetch_enabled()
+        with self._lock:
+            self.stats["usage"][action] = self.stats["usage"].get(action, 0) + 1
+            entry = self._entry
+            same_text = entry is not None and entry["hash"] == text_hash(text)
+            expired = entry is not None and time.time() - entry["created"] > SPECULATION_TTL
+            usable = (
+                enabled and same_text and not expired and entry["action"] == action
+                and (entry["started"] or entry["future"].done())
+            )
+            if usable:
+                self._entry = None
+                self.stats["hits"] += 1
+            else:
+                if enabled and entry is not None:
+                    # Havia uma antecipação, mas não serviu (outra ação, outro texto, expirada ou ainda na fila)
+                    self.stats["misses"] += 1
+                if not enabled or same_text or expired:
+                    self._discard_locked()
+            self._save()
+        if usable:
+            metrics.increment("speculation.hit")
+            return entry["future"]
+        if enabled and entry is not None:
+            metrics.increment("speculation.miss")
+        return None
+
+    def discard(self):
+        """
+        Descarta (e cancela, se ainda estiver rodando) a antecipação atual, por exemplo ao desativar o modo.
+        """
+        with self._lock:
+            self._discard_locked()
+            self._save()
+
+    def _discard_locked(self):
+        entry, self._entry = self._entry, None
+        if entry is None:
+            return
+        future = entry["future"]
+        if future.done():
+            # A resposta foi paga e não foi usada
+            self.stats["wasted_tokens"] += entry["tokens"]
+        elif entry["started"]:
+            # A requisição é abortada, mas o envio já pode ter sido cobrado
+            future.cancel()
+            self.stats["wasted_tokens"] += entry["tokens"]
+        else:
+            future.cancel()
+        self.stats["discarded"] += 1
+        metrics.increment("speculation.discarded")
+
+    def summary(self):
+        """
+        Resumo das estatísticas: quantas ações foram servidas pela antecipação e quanto foi descartado.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        used = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / used if used else 0.0
+        return (
+            f"Ações servidas pela antecipação: {stats['hits']} de {used} ({hit_rate:.0%}). "
+            f"Antecipações descartadas: {stats['discarded']} de {stats['fired']} "
+            f"(~{stats['wasted_tokens']} tokens)."
+        )
+
+    def _snapshot(self):
+        with self._lock:
+            return dict(self.stats, usage=dict(self.stats["usage"]))
+
+    def _save(self):
+        self._writer.schedule()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_speculation_store():
+    """
+    Retorna o registro de antecipações compartilhado, criando-o na primeira chamada.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SpeculationStore(os.path.join(app_data_dir(), "speculation_stats.json"))
+        return _store
@@ -0,0 +1,76 @@
+# app/utils/text_chunking.py
+
+import re
+from app.utils.tokens import estimate_text_tokens, CHARS_PER_TOKEN
+
+# Início de cada linha/parágrafo: as quebras de linha ficam no fim do trecho anterior
+_PARAGRAPH_SPLIT = re.compile(r'(?<=\n)(?=[^\n])')
+# Fim de frase (., !, ? ou reticências) seguido de espaço; o espaço é mantido na frase
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?…])(\s+)')
+# Início de cada palavra: o espaço fica no fim da palavra anterior
+_WORD_SPLIT = re.compile(r'(?<=\s)(?=\S)')
+
+
+def _split_sentences(text):
+    """
+    Divide um parágrafo em frases, mantendo o espaço depois de cada frase.
+    """
+    parts = _SENTENCE_SPLIT.split(text)
+    sentences = []
+    for index in range(0, len(parts), 2):
+        sentence = parts[index] + (parts[index + 1] if index + 1 < len(parts) else "")
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _split_unit(unit, max_tokens, level):
+    """
+    Divide um trecho grande demais no próximo nível: parágrafo -> frases -> palavras -> caracteres.
+    """
+    if estimate_text_tokens(unit) <= max_tokens:
+        return [unit]
+    if level == 0:
+        pieces = _split_sentences(unit)
+    elif level == 1:
+        pieces = _WORD_SPLIT.split(unit)
+    else:
+        size = max(1, int((max_tokens - 1) * CHARS_PER_TOKEN))
+        return [unit[i:i + size] for i in range(0, len(unit), size)]
+    if len(pieces) <= 1:
+        return _split_unit(unit, max_tokens, level + 1)
+    result = []
+    for piece in pieces:
+        result.extend(_split_unit(piece, max_tokens, level + 1))
+    return result
+
+
+def split_text(text, max_tokens):
+    """
+    Divide o texto em trechos de até 'max_tokens' tokens (estimados), cortando entre parágrafos
+    e, quando um parágrafo sozinho não cabe, entre frases. Nada se perde: ''.join(trechos) == text.
+    """
+    units = []
+    for paragraph in _PARAGRAPH_SPLIT.split(text):
+        units.extend(_split_unit(paragraph, max_tokens, 0))
+
+    chunks = []
+    current = ""
+    for unit in units:
+        if current and estimate_text_tokens(current + unit) > max_tokens:
+            chunks.append(current)
+            current = ""
+        current += unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_sentences(text):
+    """
+    Divide o texto em frases, mantendo os espaços e quebras de linha: ''.join(frases) == text.
+    """
+    sentences = []
+    for paragraph in _PARAGRAPH_SPLIT.split(text):
+        sentences.extend(_split_sentences(paragraph))
+    return sentences
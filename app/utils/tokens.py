@@ -0,0 +1,48 @@
+# app/utils/tokens.py
+
+# Aproximação usada para textos em português/inglês: ~3,5 caracteres por token
+CHARS_PER_TOKEN = 3.5
+# Custo fixo de cada mensagem no formato de chat (role, separadores)
+MESSAGE_OVERHEAD = 4
+# Custo aproximado de uma imagem enviada ao modelo de visão
+IMAGE_TOKENS = {"low": 85, "high": 765, "auto": 765}
+
+
+def estimate_text_tokens(text):
+    """
+    Estimativa rápida, sem tokenizador, do número de tokens de um texto.
+    """
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def estimate_content_tokens(content):
+    """
+    Estima os tokens do campo 'content' de uma mensagem (texto ou lista de partes texto/imagem).
+    """
+    if isinstance(content, str):
+        return estimate_text_tokens(content)
+    total = 0
+    for part in content or []:
+        if part.get("type") == "text":
+            total += estimate_text_tokens(part.get("text", ""))
+        else:
+            detail = part.get(part.get("type"), {}).get("detail", "auto")
+            total += IMAGE_TOKENS.get(detail, IMAGE_TOKENS["auto"])
+    return total
+
+
+def estimate_message_tokens(message):
+    """
+    Estima os tokens de uma mensagem do histórico, incluindo o custo fixo do formato de chat.
+    """
+    return MESSAGE_OVERHEAD + estimate_content_tokens(message.get("content"))
+
+
+def estimate_payload_tokens(payload):
+    """
+    Estima o custo total de uma requisição: tokens de entrada + limite de tokens de saída.
+    """
+    prompt_tokens = sum(estimate_message_tokens(message) for message in payload.get("messages", []))
+    return prompt_tokens + 3 + (payload.get("max_tokens") or 0)
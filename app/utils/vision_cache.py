@@ -0,0 +1,196 @@
+# app/utils/vision_cache.py
+
+import os
+import json
+import time
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageChops
+from app.utils import metrics
+from app.utils.settings import app_data_dir, load_cache_ttl_hours
+from app.utils.image_prep import is_text_capture
+from app.utils.deferred_writer import DeferredJsonWriter
+
+# Número máximo de respostas guardadas
+MAX_ENTRIES = 500
+
+
+# Lado da versão reduzida usada no pHash e lado do bloco de frequências baixas que vira o hash (16x16 = 256 bits)
+PHASH_SAMPLE = 64
+PHASH_SIZE = 16
+
+# Capturas de texto: grade do mapa de tinta (64x64 = 4096 bits), diferença mínima de cinza para contar
+# como tinta e bits diferentes tolerados (uma palavra trocada muda ~20 bits; a mesma página, 0)
+TEXT_GRID = 64
+TEXT_INK_THRESHOLD = 32
+TEXT_HASH_DISTANCE = 8
+
+# Cossenos da DCT-II: _DCT_TABLE[u][x] = cos((2x + 1) * u * pi / (2 * PHASH_SAMPLE))
+_DCT_TABLE = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * PHASH_SAMPLE)) for x in range(PHASH_SAMPLE)]
+    for u in range(PHASH_SIZE)
+]
+
+
+def phash(image):
+    """
+    Hash perceptual (pHash) de 256 bits: DCT de uma versão 64x64 em cinza; cada bit diz se uma das
+    16x16 frequências mais baixas está acima da mediana. Retorna o hash em hexadecimal.
+    """
+    sample = image.convert("L").resize((PHASH_SAMPLE, PHASH_SAMPLE), Image.LANCZOS)
+    pixels = list(sample.getdata())
+    rows = [pixels[y * PHASH_SAMPLE:(y + 1) * PHASH_SAMPLE] for y in range(PHASH_SAMPLE)]
+    # DCT separável: primeiro nas linhas, depois nas colunas (só as frequências baixas)
+    row_coefficients = [[sum(c * p for c, p in zip(cosines, row)) for cosines in _DCT_TABLE] for row in rows]
+    coefficients = [
+        sum(c * row_coefficients[y][u] for y, c in enumerate(cosines))
+        for cosines in _DCT_TABLE for u in range(PHASH_SIZE)
+    ]
+    median = sorted(coefficients)[len(coefficients) // 2]
+    value = 0
+    for coefficient in coefficients:
+        value = (value << 1) | (coefficient > median)
+    return f"{value:0{PHASH_SIZE * PHASH_SIZE // 4}x}"
+
+
+def text_hash(image):
+    """
+    Hash de capturas de texto: mapa de tinta normalizado. A captura é recortada no retângulo do conteúdo
+    (o que difere da cor de fundo), então seleções feitas à mão com margens diferentes resultam no mesmo
+    hash; o conteúdo é reduzido a uma grade de 64x64 e cada bit diz se a célula tem mais tinta que a média.
+    A grade é fina o bastante para que páginas diferentes com o mesmo layout não se confundam.
+    """
+    gray = image.convert("L")
+    histogram = gray.histogram()
+    background = histogram.index(max(histogram))
+    ink = ImageChops.difference(gray, Image.new("L", gray.size, background))
+    box = ink.point(lambda value: 255 if value > TEXT_INK_THRESHOLD else 0).getbbox()
+    if box is not None:
+        ink = ink.crop(box)
+    cells = list(ink.resize((TEXT_GRID, TEXT_GRID), Image.BOX).getdata())
+    mean = sum(cells) / len(cells)
+    value = 0
+    for cell in cells:
+        value = (value << 1) | (cell > mean)
+    return f"{value:0{TEXT_GRID * TEXT_GRID // 4}x}"
+
+
+def capture_hash(image):
+    """
+    Hash usado para reconhecer a mesma captura. Capturas de texto usam o mapa de tinta ('t:', veja
+    text_hash), comparado com uma tolerância pequena: páginas de texto diferentes com o mesmo layout têm
+    pHashes quase iguais. As demais usam o pHash ('p:'), que tolera pequenas diferenças.
+    """
+    if is_text_capture(image):
+        return f"t:{text_hash(image)}"
+    return f"p:{phash(image)}"
+
+
+def hash_distance(first, second):
+    """
+    Distância (bits diferentes) entre dois hashes de captura, ou None quando não são comparáveis
+    (tipos diferentes, como uma captura de texto e uma foto).
+    """
+    kind, _, first_value = first.partition(":")
+    other_kind, _, second_value = second.partition(":")
+    if kind != other_kind or not first_value or len(first_value) != len(second_value):
+        return None
+    return bin(int(first_value, 16) ^ int(second_value, 16)).count("1")
+
+
+def make_question_key(model, question, context=()):
+    """
+    Chave da pergunta: o mesmo modelo, o mesmo texto (sem diferenças de espaços e maiúsculas)
+    e as mesmas mensagens de contexto enviadas antes dela.
+    """
+    raw = json.dumps(
+        [model, " ".join(question.lower().split()), list(context)], ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class VisionCache:
+    """
+    Respostas de perguntas sobre capturas de tela, encontradas pela pergunta (com o contexto enviado)
+    e pela captura (veja capture_hash). Fica em memória (LRU) e é gravada em um arquivo JSON em
+    segundo plano; as entradas expiram junto com o cache de respostas.
+    """
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # chave da pergunta + hash -> {"question", "hash", "answer", "created"}
+        self._lock = threading.Lock()
+        self._writer = DeferredJsonWriter(path, self._snapshot, "o cache de imagens")
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, entry in data.items():
+            self._entries[key] = entry
+
+    def get(self, question_key, image_hash, max_distance):
+        """
+        Retorna a resposta da captura mais parecida para a mesma pergunta, se estiver a até
+        'max_distance' bits de diferença (TEXT_HASH_DISTANCE para capturas de texto), ou None.
+        """
+        ttl = load_cache_ttl_hours() * 3600
+        now = time.time()
+        if image_hash.startswith("t:"):
+            max_distance = TEXT_HASH_DISTANCE
+        with self._lock:
+            best_key, best_distance = None, max_distance + 1
+            for key, entry in self._entries.items():
+                if entry["question"] != question_key or now - entry["created"] > ttl:
+                    continue
+                distance = hash_distance(entry["hash"], image_hash)
+                if distance is not None and distance < best_distance:
+                    best_key, best_distance = key, distance
+            if best_key is None:
+                metrics.increment("vision_cache.miss")
+                return None
+            self._entries.move_to_end(best_key)
+            metrics.increment("vision_cache.hit")
+            return self._entries[best_key]["answer"]
+
+    def put(self, question_key, image_hash, answer):
+        with self._lock:
+            key = f"{question_key}:{image_hash}"
+            self._entries[key] = {"question": question_key, "hash": image_hash, "answer": answer, "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def _snapshot(self):
+        with self._lock:
+            return dict(self._entries)
+
+    def _save(self):
+        self._writer.schedule()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_vision_cache():
+    """
+    Retorna o cache de perguntas sobre imagens compartilhado, criando-o na primeira chamada.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = VisionCache(os.path.join(app_data_dir(), "vision_cache.json"))
+        return _cache
@@ -125,6 +125,19 @@ class ChatBubble(QtWidgets.QWidget):
         self.layout.addWidget(self.bubble, alignment=Qt.AlignCenter)
         self.layout.addStretch()
 
+    def set_text(self, text):
+        """
+        Substitui o texto exibido na bolha (usado ao finalizar uma resposta em streaming).
+        """
+        self.text = text
+        self.bubble.setText(self.text.replace('\n', '<br>'))
+
+    def append_text(self, chunk):
+        """
+        Acrescenta um trecho ao texto da bolha conforme a resposta chega em streaming.
+        """
+        self.set_text(self.text + chunk)
+
     def copy_text(self):
         clipboard = QtWidgets.QApplication.clipboard()
         clipboard.setText(self.text)
@@ -1,10 +1,7 @@
 # app/widgets/floating_widgets.py
 
-import sys
-import ctypes
-import time
-from ctypes import wintypes
-from app.utils.settings import load_theme, load_name
+from app.utils.settings import load_theme, load_name, DIRECT_ACTIONS
+from app.utils.action_prompts import ACTION_PROMPTS
 from app.utils.helpers import set_button_icon_with_hover, CustomTextEdit, show_custom_message
 from PyQt5.QtGui import QColor
 from PyQt5.QtCore import QPropertyAnimation, QParallelAnimationGroup, QSequentialAnimationGroup, QEasingCurve, pyqtSlot, QTimer, QRect, QEventLoop, QObject, QEvent, Qt, pyqtSignal
@@ -12,7 +9,11 @@ from PyQt5.QtWidgets import (
     QToolButton, QPushButton, QVBoxLayout, QHBoxLayout, QWidget, QFrame, QDialog, QApplication , QTextEdit,
     QGraphicsOpacityEffect
 )
-from app.utils.api_calls import floating_widget_action
+from app.utils.api_calls import floating_widget_action, cancel_request, speculate_action
+from app.utils.speculative_prefetch import get_speculation_store, SPECULATION_DELAY_MS
+from app.utils.paste_back import paste_back
+from app.platform.backend import get_backend
+from app.utils.clipboard_capture import get_copy_timeouts, wait_for_clipboard_change
 from app.widgets.chat_bubble import ChatBubble
 from app.utils.qt_waiting_spinner import QtWaitingSpinner
 
@@ -27,17 +28,20 @@ class FloatingWidget(QWidget):
         self.expanded = False  # Controle para saber se está expandido ou não
         self.current_action = None  # Ação atual selecionada - mostral modal ou não
         self.original_text = None  # Inicializa copied_text como None
-        self.waiting_for_response = False  # Controle para saber se está esperando uma resposta da API
+        self.pending_requests = {}  # Requisições em andamento: ID -> ação e janela de origem
         self.original_hwnd = None  # Handle da janela original
         self.init_ui()
 
+        # Antecipação da ação mais usada: dispara um pouco depois da última mudança do clipboard
+        self.speculation_timer = QTimer(self)
+        self.speculation_timer.setSingleShot(True)
+        self.speculation_timer.setInterval(SPECULATION_DELAY_MS)
+        self.speculation_timer.timeout.connect(self.speculate_on_clipboard)
+        QApplication.clipboard().dataChanged.connect(self.speculation_timer.start)
+
         # Aplica o tema ao widget flutuante
         self.apply_theme(load_theme())
 
-        # Conectar o sinal de resposta uma vez no __init__
-        if main_window:
-            main_window.response_received.connect(self.handle_api_response)
-
     def init_ui(self):
         # Seta a janela para ficar sempre no topo e com fundo transparente
         self.setWindowFlags(
@@ -87,6 +91,15 @@ class FloatingWidget(QWidget):
         self.spinner.setInnerRadius(10)
         self.spinner.setColor(QColor('#007BFF'))  # Ajuste conforme o tema
 
+        # Botão de cancelar no centro do spinner (aparece e some junto com ele)
+        self.spinner_cancel_button = QPushButton(self.spinner)
+        self.spinner_cancel_button.setObjectName("spinner_cancel_button")
+        self.spinner_cancel_button.setGeometry(10, 10, 20, 20)
+        self.spinner_cancel_button.setFlat(True)
+        self.spinner_cancel_button.setToolTip("Cancelar")
+        set_button_icon_with_hover(self.spinner_cancel_button, 'mdi.close', '#007BFF', '#171717', (14, 14))
+        self.spinner_cancel_button.clicked.connect(self.cancel_pending_requests)
+
 
         # Layout interno do background_widget
         self.inner_layout = QVBoxLayout()
@@ -399,16 +412,7 @@ class FloatingWidget(QWidget):
 
 
     def set_window_no_activate(self):
-        if sys.platform == 'win32':
-            hwnd = self.winId().__int__()  # Obter o HWND da janela
-            GWL_EXSTYLE = -20
-            WS_EX_NOACTIVATE = 0x08000000
-
-            # Obter o estilo estendido atual
-            current_style = ctypes.windll.user32.GetWindowLongW(hwnd, GWL_EXSTYLE)
-            # Adicionar WS_EX_NOACTIVATE ao estilo estendido
-            new_style = current_style | WS_EX_NOACTIVATE
-            ctypes.windll.user32.SetWindowLongW(hwnd, GWL_EXSTYLE, new_style)
+        get_backend().set_no_activate(self)
 
     # Eventos de mouse para permitir movimentar a janela
     def mousePressEvent(self, event):
@@ -449,6 +453,7 @@ class FloatingWidget(QWidget):
             """)
             #spinner
             self.spinner.setColor(QColor('#007BFF'))
+            set_button_icon_with_hover(self.spinner_cancel_button, 'mdi.close', '#007BFF', '#171717', (14, 14))
             #Botoes funcoes
             set_button_icon_with_hover(self.button1, 'fa.smile-o', '#171717', '#171717', (20, 20))
             set_button_icon_with_hover(self.button2, 'ri.briefcase-line', '#171717', '#171717', (20, 20))
@@ -532,6 +537,7 @@ class FloatingWidget(QWidget):
             """)
             #spinner
             self.spinner.setColor(QColor('#FFFFFF'))
+            set_button_icon_with_hover(self.spinner_cancel_button, 'mdi.close', '#FFFFFF', '#b4b4b4', (14, 14))
             #Botoes funcoes
             set_button_icon_with_hover(self.button1, 'fa.smile-o', '#b4b4b4', '#171717', (20, 20))
             set_button_icon_with_hover(self.button2, 'ri.briefcase-line', '#b4b4b4', '#171717', (20, 20))
@@ -601,6 +607,17 @@ class FloatingWidget(QWidget):
                     }
                 """)
 
+    def run_direct_action(self, action):
+        """
+        Executa uma ação pela tecla de atalho, sem expandir o widget: copia a seleção da janela
+        em primeiro plano, envia para a API e cola a resposta (ou mostra a modal) como no clique.
+        """
+        handler = getattr(self, f"handle_{action}_format", None)
+        if action not in DIRECT_ACTIONS or handler is None:
+            print(f"Ação direta desconhecida: {action}")
+            return
+        handler()
+
     def handle_casual_format(self):
         # 1. Copiar o texto
         copied_text = self.copy_text()
@@ -616,7 +633,7 @@ class FloatingWidget(QWidget):
             return
 
         # Captura a janela ativa antes de enviar a solicitação
-        self.original_hwnd = ctypes.windll.user32.GetForegroundWindow()
+        self.original_hwnd = get_backend().foreground_window()
 
         # Atualiza original_text e habilita o botão
         self.original_text = copied_text
@@ -626,8 +643,7 @@ class FloatingWidget(QWidget):
         self.current_action = 'casual'
 
         # Cria o system_content e user_content
-        system_content = """Você é uma assistente de escrita. Você transforma textos para um tom casual.
-        Por favor, formate o seguinte texto para ser mais casual. Não inclua nenhum outro comentário, apenas o texto formatado."""
+        system_content = ACTION_PROMPTS['casual']
 
         user_content = copied_text
 
@@ -637,10 +653,7 @@ class FloatingWidget(QWidget):
         self.main_window.autoscroll_chat()
 
         # Enviar o system_content e user_content para a API
-        floating_widget_action(self.main_window, ("casual", {"system_content": system_content, "user_content": user_content}, copied_text))
-
-        # Preparar para receber a resposta
-        self.waiting_for_response = True
+        self.send_action("casual", {"system_content": system_content, "user_content": user_content}, copied_text)
 
 
     def handle_professional_format(self):
@@ -655,7 +668,7 @@ class FloatingWidget(QWidget):
             self.reactivate_buttons()
             return
 
-        self.original_hwnd = ctypes.windll.user32.GetForegroundWindow()
+        self.original_hwnd = get_backend().foreground_window()
 
         self.original_text = copied_text
         self.bottom_button3.setEnabled(True)
@@ -665,7 +678,7 @@ class FloatingWidget(QWidget):
         name = load_name()
 
         # Conteúdo do sistema e do usuário
-        system_content = f"""Você é uma assistente de escrita profissional. Por favor, transforme o texto a seguir em um texto com tom profissional, sem adicionar informações extras ou mencionar que está formatando o texto. Apenas faça a transformação e devolva o texto."""
+        system_content = ACTION_PROMPTS['professional']
         user_content = copied_text
 
         # Exibir a pergunta na MainWindow
@@ -680,9 +693,7 @@ class FloatingWidget(QWidget):
         }
 
         # Enviar o prompt para a API
-        floating_widget_action(self.main_window, ("professional", prompt_data, copied_text))
-
-        self.waiting_for_response = True
+        self.send_action("professional", prompt_data, copied_text)
 
     def handle_concise_format(self):
         # Mesmo processo que handle_casual_format
@@ -697,7 +708,7 @@ class FloatingWidget(QWidget):
             self.reactivate_buttons()
             return
 
-        self.original_hwnd = ctypes.windll.user32.GetForegroundWindow()
+        self.original_hwnd = get_backend().foreground_window()
 
         self.original_text = copied_text
         self.bottom_button3.setEnabled(True)
@@ -705,8 +716,7 @@ class FloatingWidget(QWidget):
         self.current_action = 'concise'
 
         # Conteúdo do sistema e do usuário
-        system_content = """Você é uma assistente de escrita especializada em tornar textos mais concisos.
-        Sua tarefa é reformular o texto a seguir, tornando-o mais claro, coeso e direto ao ponto, sem omitir informações importantes. Não mencione esse prompt ou a tarefa em si."""
+        system_content = ACTION_PROMPTS['concise']
         user_content = copied_text
 
         # Exibir a pergunta na MainWindow
@@ -721,9 +731,7 @@ class FloatingWidget(QWidget):
         }
 
         # Enviar o prompt para a API
-        floating_widget_action(self.main_window, ("concise", prompt_data, copied_text))
-
-        self.waiting_for_response = True
+        self.send_action("concise", prompt_data, copied_text)
 
     def handle_review_format(self):
         # Mesmo processo que handle_casual_format
@@ -738,7 +746,7 @@ class FloatingWidget(QWidget):
             self.reactivate_buttons()
             return
 
-        self.original_hwnd = ctypes.windll.user32.GetForegroundWindow()
+        self.original_hwnd = get_backend().foreground_window()
 
         self.original_text = copied_text
         self.bottom_button3.setEnabled(True)
@@ -746,7 +754,7 @@ class FloatingWidget(QWidget):
         self.current_action = 'review'
 
         # Conteúdo do sistema e do usuário
-        system_content = """Você é uma assistente de escrita focada em revisar textos. Sua tarefa é corrigir todos os erros gramaticais, ortográficos e de estilo, tornando o texto mais claro e coeso. Não mencione esse prompt ou a tarefa em si."""
+        system_content = ACTION_PROMPTS['review']
         user_content = copied_text
 
         # Exibir a pergunta na MainWindow
@@ -761,9 +769,7 @@ class FloatingWidget(QWidget):
         }
 
         # Enviar o prompt para a API
-        floating_widget_action(self.main_window, ("review", prompt_data, copied_text))
-
-        self.waiting_for_response = True
+        self.send_action("review", prompt_data, copied_text)
 
 
     def handle_rewrite_format(self):
@@ -781,7 +787,7 @@ class FloatingWidget(QWidget):
             return
 
         # Captura a janela ativa antes de abrir a modal
-        self.original_hwnd = ctypes.windll.user32.GetForegroundWindow()
+        self.original_hwnd = get_backend().foreground_window()
         # Debug
         # print(f"Janela ativa capturada: HWND={self.original_hwnd}")
 
@@ -822,10 +828,7 @@ class FloatingWidget(QWidget):
         }
 
         # 7. Enviar o prompt para a API através de api_calls.py
-        floating_widget_action(self.main_window, ("rewrite", prompt_data, copied_text))
-
-        # 8. Preparar para receber a resposta
-        self.waiting_for_response = True
+        self.send_action("rewrite", prompt_data, copied_text)
 
 
 
@@ -945,7 +948,7 @@ class FloatingWidget(QWidget):
             dialog.close()
             # **Reativar a janela original após fechar a modal**
             if self.main_window:
-                ctypes.windll.user32.SetForegroundWindow(self.main_window.winId().__int__())
+                get_backend().activate_window(int(self.main_window.winId()))
                 self.main_window.activateWindow()
                 self.main_window.raise_()
 
@@ -983,9 +986,7 @@ class FloatingWidget(QWidget):
         self.current_action = 'summarize'
 
         # Criar o conteúdo do sistema e do usuário
-        system_content = """Você é uma assistente de escrita focada em resumir textos de forma clara e objetiva.
-        Você deve resumir o texto a seguir em poucas palavras, mantendo as informações mais importantes.
-        Você não conversará com o usuário, apenas resumirá o texto."""
+        system_content = ACTION_PROMPTS['summarize']
         user_content = copied_text
 
         # Exibir a pergunta na MainWindow
@@ -1000,9 +1001,7 @@ class FloatingWidget(QWidget):
         }
 
         # Enviar o prompt para a API através de api_calls.py
-        floating_widget_action(self.main_window, ("summarize", prompt_data, copied_text))
-
-        self.waiting_for_response = True
+        self.send_action("summarize", prompt_data, copied_text)
 
 
     def handle_keypoints_format(self):
@@ -1019,7 +1018,7 @@ class FloatingWidget(QWidget):
         self.current_action = 'keypoints'
 
         # Criar o conteúdo do sistema e do usuário
-        system_content = """Você é uma assistente de escrita focada em extrair os pontos-chave de textos. Extraia apenas os pontos mais importantes."""
+        system_content = ACTION_PROMPTS['keypoints']
         user_content = copied_text
 
         # Exibir a pergunta na MainWindow
@@ -1034,9 +1033,7 @@ class FloatingWidget(QWidget):
         }
 
         # Enviar o prompt para a API através de api_calls.py
-        floating_widget_action(self.main_window, ("keypoints", prompt_data, copied_text))
-
-        self.waiting_for_response = True
+        self.send_action("keypoints", prompt_data, copied_text)
 
 
     def show_response_modal(self, response_text):
@@ -1212,69 +1209,97 @@ class FloatingWidget(QWidget):
 
         dialog.exec_()
 
-    @pyqtSlot(str)
-    def handle_api_response(self, answer):
-        if self.waiting_for_response:
+    def speculate_on_clipboard(self):
+        """
+        Antecipa em segundo plano a ação mais usada para o texto que o usuário acabou de copiar
+        (se a antecipação estiver ativada). Textos que o próprio Echo colocou no clipboard são ignorados.
+        """
+        text = QApplication.clipboard().text().strip()
+        if text:
+            speculate_action(self.main_window, text)
+
+    def send_action(self, action, prompt_data, copied_text):
+        """
+        Envia a ação para a API e guarda o contexto da requisição (ação e janela de origem) pelo seu ID,
+        para que a resposta seja colada no lugar certo mesmo com outras requisições em andamento.
+        """
+        request_id = floating_widget_action(self.main_window, (action, prompt_data, copied_text), self.handle_api_response)
+        if request_id:
+            self.pending_requests[request_id] = {"action": action, "hwnd": self.original_hwnd}
+        else:
+            self.reactivate_buttons()
+
+        # O contexto já está guardado na requisição
+        self.current_action = None
+        self.original_hwnd = None
+
+    def handle_api_response(self, request_id, answer):
+        request = self.pending_requests.pop(request_id, None)
+        if request is None:
+            return
+
+        # Exibir a resposta no chat da janela principal
+        self.main_window.update_response(request_id, answer)
+
+        if not answer.startswith("Erro:"):
             # Define a resposta no clipboard
             clipboard = QApplication.clipboard()
+            get_speculation_store().ignore(answer)
             clipboard.setText(answer)
             #debug - print mensagem copiada
             # print(f"Texto copiado para o clipboard: {answer}")
-            # Verifica se a ação atual requer exibir a modal
-            if self.current_action in ['keypoints', 'summarize']:
+            # Verifica se a ação requer exibir a modal
+            if request["action"] in ['keypoints', 'summarize']:
                 self.show_response_modal(answer)
             else:
-                # Ativar a janela original
-                if self.original_hwnd:
-                    # #debug
-                    # window_title, process_name = get_window_info(self.original_hwnd)
-                    # print(f"Tentando ativar a janela: HWND={self.original_hwnd}, Título='{window_title}', Processo='{process_name}'")
-
-                    # Permitir que a janela original seja trazida para frente
-                    self.activate_window(self.original_hwnd)
-                    # ctypes.windll.user32.AllowSetForegroundWindow(-1)
-
-                    #debug
-                    # result = ctypes.windll.user32.SetForegroundWindow(self.original_hwnd)
-                    # print(f"SetForegroundWindow retornou: {result}")
-
-                    # Simular Ctrl+V após um pequeno atraso
-                    QTimer.singleShot(500, self.paste_text)
-                else:
-                    # Se não tiver HWND, apenas colar
-                    QTimer.singleShot(500, self.paste_text)
-
-            # Resetar flags
-            self.waiting_for_response = False
-            self.current_action = None
-            self.original_hwnd = None
-
-            # Reativar os botões
+                # Ativar a janela original e colar assim que ela estiver em primeiro plano
+                original_hwnd = request["hwnd"]
+                if original_hwnd:
+                    self.activate_window(original_hwnd)
+                self.paste_text(original_hwnd)
+
+        # Reativar os botões quando não houver mais requisições em andamento
+        if not self.pending_requests:
             self.reactivate_buttons()
 
+    def cancel_pending_requests(self):
+        """
+        Cancela as requisições em andamento (a transferência é abortada e nada é colado)
+        e reativa os botões imediatamente.
+        """
+        for request_id in list(self.pending_requests):
+            cancel_request(request_id)
+            self.main_window.mark_request_cancelled(request_id)
+        self.pending_requests.clear()
+        self.reactivate_buttons()
+
 
     def copy_text(self):
         """
         Copia o texto selecionado simulando Ctrl+C e retorna o texto copiado.
+        Retorna assim que o clipboard muda, com um tempo máximo aprendido para cada aplicativo.
         Exibe uma mensagem de aviso se nenhum texto estiver selecionado.
         """
+        # Aplicativo de origem, para usar o tempo de espera aprendido para ele
+        backend = get_backend()
+        source_app = backend.window_process(backend.foreground_window())
+        timeouts = get_copy_timeouts()
+        timeout_ms = timeouts.timeout_for(source_app)
+
         # Limpa o clipboard antes de copiar
         clipboard = QApplication.clipboard()
         clipboard.clear(mode=clipboard.Clipboard)
+        sequence_before = backend.clipboard_sequence_number()
 
         # Simula Ctrl+C
-        ctypes.windll.user32.keybd_event(0x11, 0, 0, 0)  # Pressiona Ctrl
-        ctypes.windll.user32.keybd_event(0x43, 0, 0, 0)  # Pressiona C
-        ctypes.windll.user32.keybd_event(0x43, 0, 2, 0)  # Solta C
-        ctypes.windll.user32.keybd_event(0x11, 0, 2, 0)  # Solta Ctrl
+        backend.send_copy()
 
-        # Processa eventos para permitir a cópia
-        QApplication.processEvents()
-
-        # Cria um loop de eventos para aguardar a atualização do clipboard
-        loop = QEventLoop()
-        QTimer.singleShot(300, loop.quit)  # Aguarda 300ms
-        loop.exec_()
+        # Aguarda o texto novo chegar ao clipboard, retornando assim que ele chegar
+        changed, elapsed_ms = wait_for_clipboard_change(clipboard, sequence_before, timeout_ms)
+        if changed:
+            timeouts.record(source_app, elapsed_ms)
+        else:
+            timeouts.record_timeout(source_app, timeout_ms)
 
         # Obtém o texto do clipboard após a cópia
         copied_text = clipboard.text().strip()
@@ -1287,60 +1312,16 @@ class FloatingWidget(QWidget):
             print("Nenhum texto selecionado para copiar.")
             return None
 
+        # O texto já vai ser enviado pelo clique: não antecipar outra ação para ele
+        get_speculation_store().ignore(copied_text)
         return copied_text
 
-    def paste_text(self):
-        try:
-            # Debug
-            # print("Iniciando a função paste_text...")
-            # Verificar qual janela está ativa antes
-            # active_hwnd = ctypes.windll.user32.GetForegroundWindow()
-            # print(f"Janela ativa antes de colar: HWND={active_hwnd}")
-
-            # Definir constantes
-            VK_CONTROL = 0x11
-            VK_V = 0x56
-            KEYEVENTF_KEYUP = 0x0002
-            KEYEVENTF_EXTENDEDKEY = 0x0001
-            VK_BACKSPACE = 0x08  # Tecla de apagar (Backspace)
-
-            #debug
-            # # Verificar o estado inicial das teclas Ctrl e V
-            # ctrl_state_before = ctypes.windll.user32.GetAsyncKeyState(VK_CONTROL)  # VK_CONTROL
-            # v_state_before = ctypes.windll.user32.GetAsyncKeyState(VK_V)           # VK_V
-            # print(f"Estado da tecla Ctrl antes: {ctrl_state_before}")
-            # print(f"Estado da tecla V antes: {v_state_before}")
-
-            # Simular a tecla Backspace para limpar antes de colar
-            ctypes.windll.user32.keybd_event(VK_BACKSPACE, 0, 0, 0)  # Pressionar Backspace
-            ctypes.windll.user32.keybd_event(VK_BACKSPACE, 0, KEYEVENTF_KEYUP, 0)  # Soltar Backspace
-
-            # Pressionar Ctrl (com flag extended key)
-            ctypes.windll.user32.keybd_event(VK_CONTROL, 0, KEYEVENTF_EXTENDEDKEY, 0)
-            time.sleep(0.05)
-
-            # Pressionar V
-            ctypes.windll.user32.keybd_event(VK_V, 0, 0, 0)
-            time.sleep(0.05)
-
-            # Soltar V
-            ctypes.windll.user32.keybd_event(VK_V, 0, KEYEVENTF_KEYUP, 0)
-            time.sleep(0.05)
-
-            # Soltar Ctrl (com flag extended key)
-            ctypes.windll.user32.keybd_event(VK_CONTROL, 0, KEYEVENTF_KEYUP | KEYEVENTF_EXTENDEDKEY, 0)
-            time.sleep(0.05)
-
-            #debug
-            # Verificar qual janela está ativa depois
-            # active_hwnd_after = ctypes.windll.user32.GetForegroundWindow()
-            # print(f"Janela ativa após colar: HWND={active_hwnd_after}")
-            
-            # if active_hwnd != active_hwnd_after:
-            #     print("Aviso: A janela ativa mudou durante a colagem.")
-
-        except Exception as e:
-            print(f"Erro ao tentar colar o texto: {e}")
+    def paste_text(self, hwnd=None):
+        """
+        Apaga a seleção e cola o clipboard na janela 'hwnd' sem bloquear a interface:
+        as teclas só são enviadas depois que a janela estiver em primeiro plano.
+        """
+        paste_back(hwnd, self)
 
 
     def bring_main_window(self):
@@ -1357,6 +1338,7 @@ class FloatingWidget(QWidget):
     def return_copied_text(self):
         if self.original_text:
             clipboard = QApplication.clipboard()
+            get_speculation_store().ignore(self.original_text)
             clipboard.setText(self.original_text)
             show_custom_message('Alerta', 'Texto copiado para o clipboard')
 
@@ -1377,35 +1359,7 @@ class FloatingWidget(QWidget):
     #Ativa a janela            
     def activate_window(self, hwnd):
         try:
-            #debug
-            # print(f"Ativando a janela com HWND={hwnd}")
-            # Obter a janela atualmente em primeiro plano
-            foreground_hwnd = ctypes.windll.user32.GetForegroundWindow()
-
-            #Debug
-            # print(f"Janela atualmente em primeiro plano: HWND={foreground_hwnd}")
-
-            if foreground_hwnd != hwnd:
-                # Obter IDs de thread
-                current_thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
-                foreground_thread_id = ctypes.windll.user32.GetWindowThreadProcessId(foreground_hwnd, 0)
-                target_thread_id = ctypes.windll.user32.GetWindowThreadProcessId(hwnd, 0)
-
-                # Anexar threads
-                ctypes.windll.user32.AttachThreadInput(target_thread_id, foreground_thread_id, True)
-
-                # Ativar janela
-                result = ctypes.windll.user32.SetForegroundWindow(hwnd)
-                #Debug
-                # print(f"SetForegroundWindow retornou: {result}")
-
-                # Desanexar threads
-                ctypes.windll.user32.AttachThreadInput(target_thread_id, foreground_thread_id, False)
-            else:
-                pass
-                #Debug
-                # print("A janela de destino já está em primeiro plano.")
-
+            get_backend().activate_window(hwnd)
         except Exception as e:
             print(f"Erro ao ativar a janela: {e}")
 
@@ -1433,52 +1387,3 @@ class FloatingWidget(QWidget):
                 self.click_timer.stop()  # Cancela o temporizador de clique após o clique ser processado
                 self.toggle_expand()  # Expande/Contrai se for um clique rápido
             event.accept()
-
-
-
-
-#Debug - Função para obter o título da janela e o nome do processo a partir do HWND   
-def get_window_info(hwnd):
-    """
-    Obtém o título da janela e o nome do processo a partir do HWND.
-    
-    Parâmetros:
-        hwnd (int): Handle da janela.
-    
-    Retorna:
-        tuple: (título_da_janela, nome_do_processo)
-    """
-    # Funções do user32 e kernel32
-    GetWindowTextLengthW = ctypes.windll.user32.GetWindowTextLengthW
-    GetWindowTextW = ctypes.windll.user32.GetWindowTextW
-    GetWindowThreadProcessId = ctypes.windll.user32.GetWindowThreadProcessId
-    OpenProcess = ctypes.windll.kernel32.OpenProcess
-    GetModuleFileNameExW = ctypes.windll.psapi.GetModuleFileNameExW
-    CloseHandle = ctypes.windll.kernel32.CloseHandle
-
-    # Obter o comprimento do título da janela
-    length = GetWindowTextLengthW(hwnd)
-    buff = ctypes.create_unicode_buffer(length + 1)
-    GetWindowTextW(hwnd, buff, length + 1)
-    window_title = buff.value
-
-    # Obter o ID do processo
-    pid = wintypes.DWORD()
-    GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
-    process_id = pid.value
-
-    # Definir as permissões para abrir o processo
-    PROCESS_QUERY_INFORMATION = 0x0400
-    PROCESS_VM_READ = 0x0010
-    process_handle = OpenProcess(PROCESS_QUERY_INFORMATION | PROCESS_VM_READ, False, process_id)
-
-    if process_handle:
-        # Obter o nome do módulo base (executável)
-        filename_buff = ctypes.create_unicode_buffer(260)
-        GetModuleFileNameExW(process_handle, 0, filename_buff, 260)
-        process_name = filename_buff.value
-        CloseHandle(process_handle)
-    else:
-        process_name = "Desconhecido"
-
-    return window_title, process_name
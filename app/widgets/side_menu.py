@@ -1,10 +1,10 @@
 # app/widgets/side_menu.py
-import ctypes
 from PyQt5.QtWidgets import QFrame, QLabel, QWidget, QDialog, QApplication, QVBoxLayout, QHBoxLayout, QPushButton
 from PyQt5.QtCore import pyqtSignal, QPropertyAnimation
 from app.utils.settings import load_theme, load_name, clear_all_settings, resource_path
 from app.utils.helpers import show_custom_message, set_button_icon_with_hover_svg, set_button_icon_with_hover, CustomTextEdit
 from app.widgets.chat_bubble import ChatBubble
+from app.platform.backend import get_backend
 from PyQt5.QtCore import Qt
 
 class SideMenuWindow(QWidget):
@@ -705,7 +705,7 @@ class SideMenuWindow(QWidget):
             dialog.close()
             # **Reativar a janela original após fechar a modal**
             if self.main_window:
-                ctypes.windll.user32.SetForegroundWindow(self.main_window.winId().__int__())
+                get_backend().activate_window(int(self.main_window.winId()))
                 self.main_window.activateWindow()
                 self.main_window.raise_()
 